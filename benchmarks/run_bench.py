@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+"""
+Reproducible benchmarks for the parser, router and API endpoints (in-process).
+
+Runs the Streamlit sample questions plus a seeded synthetic question corpus
+through parse_query, route_query and the FastAPI app via TestClient, and
+optionally routes against a synthetic crop APY file scaled to N rows. Each
+workload reports throughput and p50/p95/p99 latency; the run also records
+peak RSS. Results are written as JSON and can be compared to a stored
+baseline.
+
+Usage:
+  python -m benchmarks.run_bench --out bench.json
+  python -m benchmarks.run_bench --synthetic-rows 1000000 --out bench.json
+  python -m benchmarks.run_bench --baseline benchmarks/baseline.json --fail-on-regression
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import generate_crop_apy, question_corpus, synthetic_manifest  # noqa: E402
+
+# Mirrors the sample questions offered in ui/streamlit_app.py
+SAMPLE_QUESTIONS = [
+    "Show trend of rainfall in Kerala from 2009 to 2012",
+    "Show wheat yield trend in Maharashtra since 2005",
+    "Compare rainfall in Karnataka vs Kerala between 2012 and 2016",
+    "Compare rice yield across states in 2009",
+    "Top 5 states with highest rainfall in 2010",
+    "Top 5 rice-producing states in 2015",
+    "Which state had the highest rainfall in 2010",
+    "Average rainfall in Kerala over the last 5 years",
+    "Total wheat production in Punjab from 2012 to 2014",
+]
+
+
+def percentile(sorted_vals: Sequence[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, float]:
+    s = sorted(latencies)
+    return {
+        "n": len(s),
+        "wall_s": round(wall, 6),
+        "throughput_per_s": round(len(s) / wall, 3) if wall > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(s) * 1000, 4) if s else 0.0,
+        "p50_ms": round(percentile(s, 50) * 1000, 4),
+        "p95_ms": round(percentile(s, 95) * 1000, 4),
+        "p99_ms": round(percentile(s, 99) * 1000, 4),
+    }
+
+
+def measure(fn: Callable[[Any], Any], items: Sequence[Any], repeats: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        for it in items:
+            fn(it)
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for it in items:
+            t0 = time.perf_counter()
+            fn(it)
+            latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 2)
+
+
+def git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from src.core import dataset_registry, partitions
+    from src.core.query_parser import parse_query
+    from src.core.data_router import route_query
+
+    results: Dict[str, Dict[str, float]] = {}
+    corpus = question_corpus(args.corpus_size, seed=args.seed)
+
+    results["parse:samples"] = measure(parse_query, SAMPLE_QUESTIONS, args.repeats)
+    results["parse:synthetic"] = measure(parse_query, corpus, 1)
+
+    parsed_samples = [parse_query(q) for q in SAMPLE_QUESTIONS]
+    results["route:samples"] = measure(route_query, parsed_samples, args.repeats)
+
+    if not args.skip_api:
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+
+        client = TestClient(app)
+        results["api:/query"] = measure(lambda q: client.post("/query", json={"q": q}), SAMPLE_QUESTIONS, args.repeats)
+        results["api:/climate/state-annual"] = measure(
+            lambda p: client.get("/climate/state-annual", params=p), [{"limit": 100}, {"year": 2010}], args.repeats
+        )
+        results["api:/agriculture/crop-apy-state-year"] = measure(
+            lambda p: client.get("/agriculture/crop-apy-state-year", params=p), [{"limit": 100}, {"crop": "Rice"}], args.repeats
+        )
+
+    if args.synthetic_rows:
+        out_dir = ROOT / "data" / "synthetic" / f"agriculture_{args.synthetic_rows}"
+        if not (out_dir / "crop_apy_state_year" / partitions.MANIFEST_NAME).exists():
+            generate_crop_apy(out_dir, args.synthetic_rows, seed=args.seed)
+        # Point the manifest's crop APY entry at the scaled data for this workload only
+        saved = dataset_registry.MANIFEST_PATH
+        dataset_registry.MANIFEST_PATH = synthetic_manifest(out_dir)
+        try:
+            ag_questions = [pq for pq in parsed_samples if "rainfall" not in pq.metrics and pq.domain != "climate"]
+            results[f"route:synthetic_{args.synthetic_rows}"] = measure(route_query, ag_questions, 1, warmup=0)
+        finally:
+            dataset_registry.MANIFEST_PATH = saved
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_rev": git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "corpus_size": args.corpus_size,
+            "synthetic_rows": args.synthetic_rows,
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold_pct: float) -> List[str]:
+    """Print per-workload deltas vs. baseline; returns names whose p95 regressed past the threshold."""
+    regressions: List[str] = []
+    print(f"{'workload':45s} {'p50 ms':>10s} {'Δp50':>8s} {'p95 ms':>10s} {'Δp95':>8s} {'ops/s':>10s} {'Δops':>8s}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:45s} {cur['p50_ms']:10.3f} {'new':>8s} {cur['p95_ms']:10.3f} {'':>8s} {cur['throughput_per_s']:10.1f}")
+            continue
+
+        def pct(a: float, b: float) -> float:
+            return (a - b) / b * 100.0 if b else 0.0
+
+        d50 = pct(cur["p50_ms"], base["p50_ms"])
+        d95 = pct(cur["p95_ms"], base["p95_ms"])
+        dops = pct(cur["throughput_per_s"], base["throughput_per_s"])
+        print(f"{name:45s} {cur['p50_ms']:10.3f} {d50:+7.1f}% {cur['p95_ms']:10.3f} {d95:+7.1f}% {cur['throughput_per_s']:10.1f} {dops:+7.1f}%")
+        if d95 > threshold_pct:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark parser, router and API endpoints")
+    ap.add_argument("--repeats", type=int, default=20, help="Passes over the sample questions per workload")
+    ap.add_argument("--corpus-size", type=int, default=2000, help="Synthetic questions for the parse workload")
+    ap.add_argument("--synthetic-rows", type=int, default=0, help="Also route against a crop APY file scaled to N rows")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--skip-api", action="store_true", help="Skip the in-process FastAPI workloads")
+    ap.add_argument("--out", type=Path, default=None, help="Write results JSON here")
+    ap.add_argument("--baseline", type=Path, default=None, help="Compare against a stored results JSON")
+    ap.add_argument("--threshold", type=float, default=10.0, help="p95 regression threshold in percent")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(text, encoding="utf-8")
+        print(f"Saved benchmark results: {args.out}")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions (p95 > +{args.threshold:g}%): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
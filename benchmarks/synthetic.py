@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+"""
+Synthetic data and question generators for the benchmark suite.
+
+`generate_crop_apy` scales data/processed/agriculture/crop_apy_state_year.csv to
+an arbitrary row count by replicating the real rows: replica 0 is the original
+file, further replicas get a " R<k>" state suffix and jittered values, so the
+real states/crops stay queryable while scan cost grows linearly. It writes the
+same layout as process_agriculture: the flat CSV plus per-State partitions.
+
+Usage:
+  python -m benchmarks.synthetic --rows 1000000 --out data/synthetic/agriculture
+"""
+
+import argparse
+import csv
+import random
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+AG_SOURCE = ROOT / "data" / "processed" / "agriculture" / "crop_apy_state_year.csv"
+DEFAULT_OUT = ROOT / "data" / "synthetic" / "agriculture"
+
+def synthetic_manifest(out_dir: Path) -> Path:
+    """Copy of the dataset manifest whose crop APY entry points at `out_dir`.
+
+    Setting dataset_registry.MANIFEST_PATH to it makes every reader of the
+    crop table (router, scans, listings) use the synthetic files.
+    """
+    import yaml
+
+    from src.core import dataset_registry
+
+    doc = yaml.safe_load(dataset_registry.MANIFEST_PATH.read_text(encoding="utf-8"))
+    for entry in doc.get("processed_datasets") or []:
+        if entry.get("name") == "crop_apy_state_year":
+            entry["path"] = str(out_dir / "crop_apy_state_year.csv")
+            entry["partition_dir"] = str(out_dir / "crop_apy_state_year")
+    path = out_dir / "datasets.manifest.yaml"
+    path.write_text(yaml.safe_dump(doc, sort_keys=False), encoding="utf-8")
+    return path
+
+
+def generate_crop_apy(out_dir: Path, rows: int, seed: int = 42, source: Path = AG_SOURCE) -> Path:
+    """Write `out_dir/crop_apy_state_year.csv` with `rows` data rows, and its
+    partitioned copy under `out_dir/crop_apy_state_year/`; returns the CSV path."""
+    from src.data_ingestion.process_agriculture import HEADER, write_partitions
+
+    with open(source, "r", encoding="utf-8", errors="ignore") as f:
+        base = list(csv.DictReader(f))
+    if not base:
+        raise FileNotFoundError(f"Source has no rows: {source}")
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_csv = out_dir / "crop_apy_state_year.csv"
+    out_rows: List[List[str]] = []
+    replica = 0
+    while len(out_rows) < rows:
+        for r in base:
+            if len(out_rows) >= rows:
+                break
+            if replica == 0:
+                out_rows.append([r[k] for k in HEADER])
+            else:
+                k = rng.uniform(0.8, 1.2)
+                area = float(r.get("Area_ha") or 0) * k
+                prod = float(r.get("Production_tonnes") or 0) * rng.uniform(0.8, 1.2)
+                yld = prod / area if area > 0 else 0.0
+                out_rows.append([f"{r['State']} R{replica}", r["Year"], r["Year_start"], r["Year_end"], r["Crop"], f"{area:.3f}", f"{prod:.3f}", f"{yld:.6f}"])
+        replica += 1
+    # Year-sorted like the processed file, so loading stays a cheap stable sort
+    out_rows.sort(key=lambda row: int(row[2]))
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        w.writerows(out_rows)
+    write_partitions(out_rows, out_dir / "crop_apy_state_year")
+    return out_csv
+
+
+STATES = ["Kerala", "Punjab", "Karnataka", "Maharashtra", "Tamil Nadu", "Bihar", "Gujarat", "Odisha", "Assam", "West Bengal"]
+CROPS = ["Rice", "Wheat", "Maize", "Jowar", "Bajra", "Cotton(lint)", "Sugarcane", "Groundnut"]
+TEMPLATES = [
+    "Show trend of rainfall in {state} from {y1} to {y2}",
+    "Show {crop} yield trend in {state} since {y1}",
+    "Compare rainfall in {state} vs {state2} between {y1} and {y2}",
+    "Compare {crop} yield across states in {y1}",
+    "Top {k} states with highest rainfall in {y1}",
+    "Top {k} {crop}-producing states in {y1}",
+    "Which state had the highest rainfall in {y1}",
+    "Average rainfall in {state} over the last {k} years",
+    "Total {crop} production in {state} from {y1} to {y2}",
+    "What is the correlation between rainfall and {crop} yield in {state}",
+]
+
+
+def question_corpus(n: int, seed: int = 42) -> List[str]:
+    """Deterministic corpus of `n` questions in the shapes the UI samples use."""
+    rng = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n):
+        y1 = rng.randint(1998, 2014)
+        out.append(rng.choice(TEMPLATES).format(
+            state=rng.choice(STATES),
+            state2=rng.choice(STATES),
+            crop=rng.choice(CROPS).lower() if rng.random() < 0.5 else rng.choice(CROPS),
+            y1=y1,
+            y2=y1 + rng.randint(1, 6),
+            k=rng.randint(2, 10),
+        ))
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate a scaled crop APY CSV for benchmarks")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    args = ap.parse_args()
+    path = generate_crop_apy(args.out, args.rows, args.seed)
+    print(f"Saved synthetic CSV: {path} | rows: {args.rows}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,23 +1,77 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from datetime import datetime
 from ..utils.config import settings
-from ..db.mongo import ping as mongo_ping, get_collection
+from ..db.mongo import ping_async as mongo_ping, get_async_collection, close_async_client
 from pathlib import Path
 import csv
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from ..core.query_parser import parse_query
-from ..core.data_router import route_query
+from ..core.data_router import route_many, route_query
 from ..core.llm_handler import answer as llm_answer
+from ..core.downsample import lttb
+from ..core.result_store import ResultStore, StoredResult
+from ..core import crop_table, dataset_registry, parallel_scan, trend_analytics
+from ..utils.admission import AdmissionMiddleware, Limiter
+from ..utils import compression, http_cache
+from ..utils.metrics import QUERY_ROWS, TimingMiddleware, record_cache, render_prometheus, timed
+from ..utils.singleflight import SingleFlight, refresh_early
+import asyncio
+import itertools
+import json
 import os
+import time
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    # Release pooled Mongo connections and scan workers on shutdown
+    close_async_client()
+    parallel_scan.shutdown()
+
 
 app = FastAPI(
     title="Project Samarth API",
     description="Minimal FastAPI scaffold with MongoDB ping",
     version="0.1.0",
+    lifespan=lifespan,
+)
+
+# Full routed results behind the `result_id` returned by /query
+RESULTS = ResultStore(
+    ttl=settings.result_ttl_seconds,
+    max_entries=settings.result_store_max_entries,
+    max_bytes=settings.result_store_max_mb * 1024 * 1024,
 )
+# Rows inlined in a /query response; the rest are paged via /query/results/{id}/rows
+INLINE_ROWS = 100
+# Identical concurrent /query questions and cache misses share one computation
+INFLIGHT = SingleFlight()
+# Serialized + gzip/brotli-compressed bodies of hot listing and result pages
+BODIES = compression.BodyCache(max_bytes=settings.response_cache_max_mb * 1024 * 1024)
+
+# Admission control per route class; innermost, so shed 503s still get CORS
+# headers and show up in the latency histogram
+ADMISSION: Dict[str, Limiter] = {
+    "query": Limiter(
+        settings.admission_query_max_in_flight,
+        settings.admission_query_queue,
+        settings.admission_query_max_wait_ms / 1000.0,
+    ),
+    "light": Limiter(
+        settings.admission_light_max_in_flight,
+        settings.admission_light_queue,
+        settings.admission_light_max_wait_ms / 1000.0,
+    ),
+}
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware, limiters=ADMISSION, retry_after=settings.admission_retry_after_seconds)
 
 # CORS for local dev / Streamlit
 app.add_middleware(
@@ -27,6 +81,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-request latency histogram and Server-Timing header (outermost, so it sees the full request)
+app.add_middleware(TimingMiddleware)
 
 
 class HealthResponse(BaseModel):
@@ -51,9 +107,15 @@ async def root():
     return HealthResponse(status="healthy", version="0.1.0", timestamp=datetime.now())
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/db/ping", response_model=DBPingResponse)
 async def db_ping():
-    result = mongo_ping()
+    result = await mongo_ping()
     return DBPingResponse(ok=result.get("ok", False), error=result.get("error"))
 
 
@@ -68,14 +130,22 @@ class QueryResponse(BaseModel):
     rows: List[Dict]
     answer: str
     answer_source: str
+    analytics: List[Dict] = []
+    result_id: Optional[str] = None
+    total_rows: int = 0
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query_endpoint(req: QueryRequest):
-    pq = parse_query(req.q)
-    routed = route_query(pq)
-    # Return a structured response to satisfy Phase 2 acceptance criteria
-    parsed_dict: Dict = {
+async def _log_query(doc: Dict[str, Any]) -> None:
+    try:
+        col = get_async_collection(settings.log_queries_collection)
+        await col.insert_one(doc)
+    except Exception:
+        # ignore logging errors entirely
+        pass
+
+
+def _parsed_dict(pq) -> Dict:
+    return {
         "intent": pq.intent,
         "states": pq.states,
         "crops": pq.crops,
@@ -88,45 +158,249 @@ async def query_endpoint(req: QueryRequest):
         "domain": pq.domain,
         "last_n_years": pq.last_n_years,
         "since_year": pq.since_year,
+        "rainfall_condition": pq.rainfall_condition,
+        "season": pq.season,
+        "months": pq.months,
+        "subdivisions": pq.subdivisions,
+        "window": pq.window,
+        "percentile": pq.percentile,
+        "distinct_of": pq.distinct_of,
+        "entity_matches": pq.entity_matches,
+    }
+
+
+def _log_doc(q: str, parsed_dict: Dict, routed, llm) -> Dict[str, Any]:
+    return {
+        "q": q,
+        "parsed": parsed_dict,
+        "datasets": routed.datasets,
+        "citations": routed.citations,
+        "row_count": len(routed.rows),
+        "rows_sample": routed.rows[: settings.log_queries_rows_sample],
+        "answer_source": llm.source,
+        "created_at": datetime.utcnow(),
+        "version": app.version,
     }
-    llm = llm_answer(parsed_dict, routed.rows, routed.citations)
+
+
+def _store_result(parsed_dict: Dict, routed) -> Optional[str]:
+    # None only when the result alone exceeds the store's memory budget
+    return RESULTS.put(StoredResult(
+        rows=routed.rows,
+        datasets=routed.datasets,
+        citations=routed.citations,
+        parsed=parsed_dict,
+        analytics=routed.analytics,
+    ))
+
+
+def _answer_query(q: str):
+    pq = parse_query(q)
+    routed = route_query(pq)
+    parsed_dict = _parsed_dict(pq)
+    llm = llm_answer(parsed_dict, routed.rows, routed.citations, routed.analytics)
+    return parsed_dict, routed, llm, _store_result(parsed_dict, routed)
+
+
+@app.post("/query", response_model=QueryResponse)
+async def query_endpoint(req: QueryRequest, background_tasks: BackgroundTasks):
+    # Callers asking the same question at the same time share one parse/route/LLM
+    # pass (and one stored result); the blocking work runs in the threadpool
+    key = _build_cache_key("/query", {"q": " ".join(req.q.split())})
+    parsed_dict, routed, llm, result_id = await INFLIGHT.do(key, lambda: run_in_threadpool(_answer_query, req.q))
+    QUERY_ROWS.observe(len(routed.rows))
+    # Return a structured response to satisfy Phase 2 acceptance criteria
     resp = QueryResponse(
         parsed=parsed_dict,
         datasets=routed.datasets,
         citations=routed.citations,
-        rows=routed.rows[:100],
+        rows=routed.rows[:INLINE_ROWS],
         answer=llm.answer,
         answer_source=llm.source,
+        analytics=routed.analytics,
+        result_id=result_id,
+        total_rows=len(routed.rows),
     )
-    # Background logging to MongoDB (optional, never breaks the response)
+    # Background logging to MongoDB (optional, runs after the response is sent)
     if settings.log_queries:
-        try:
-            col = get_collection(settings.log_queries_collection)
-            doc = {
-                "q": req.q,
-                "parsed": parsed_dict,
-                "datasets": routed.datasets,
-                "citations": routed.citations,
-                "row_count": len(routed.rows),
-                "rows_sample": routed.rows[: settings.log_queries_rows_sample],
-                "answer_source": llm.source,
-                "created_at": datetime.utcnow(),
-                "version": app.version,
-            }
-            col.insert_one(doc)
-        except Exception:
-            # ignore logging errors entirely
-            pass
+        background_tasks.add_task(_log_query, _log_doc(req.q, parsed_dict, routed, llm))
     return resp
 
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+
+
+class BatchQueryItem(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch_endpoint(req: BatchQueryRequest, background_tasks: BackgroundTasks):
+    if len(req.questions) > settings.batch_max_questions:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_questions} questions per batch")
+    n = len(req.questions)
+    errors: List[Optional[str]] = [None] * n
+    parsed: List[Any] = [None] * n
+    for i, q in enumerate(req.questions):
+        if not q or not q.strip():
+            errors[i] = "empty question"
+            continue
+        try:
+            parsed[i] = parse_query(q)
+        except Exception as e:
+            errors[i] = f"parse failed: {e}"
+
+    # One routing pass: each target dataset is read once for the whole batch
+    live = [i for i in range(n) if parsed[i] is not None]
+    routed_list = await run_in_threadpool(route_many, [parsed[i] for i in live])
+    routed: Dict[int, Any] = {}
+    for i, r in zip(live, routed_list):
+        if isinstance(r, Exception):
+            errors[i] = f"route failed: {r}"
+        else:
+            routed[i] = r
+            QUERY_ROWS.observe(len(r.rows))
+
+    # LLM answers are independent (and may be network-bound): generate them concurrently
+    idx = sorted(routed)
+    dicts = {i: _parsed_dict(parsed[i]) for i in idx}
+    answers = await asyncio.gather(
+        *(run_in_threadpool(llm_answer, dicts[i], routed[i].rows, routed[i].citations, routed[i].analytics) for i in idx),
+        return_exceptions=True,
+    )
+
+    items: List[BatchQueryItem] = [BatchQueryItem(index=i, ok=False, error=errors[i]) for i in range(n)]
+    for i, llm in zip(idx, answers):
+        if isinstance(llm, BaseException):
+            items[i].error = f"answer failed: {llm}"
+            continue
+        r = routed[i]
+        items[i] = BatchQueryItem(
+            index=i,
+            ok=True,
+            result=QueryResponse(
+                parsed=dicts[i],
+                datasets=r.datasets,
+                citations=r.citations,
+                rows=r.rows[:INLINE_ROWS],
+                answer=llm.answer,
+                answer_source=llm.source,
+                analytics=r.analytics,
+                result_id=_store_result(dicts[i], r),
+                total_rows=len(r.rows),
+            ),
+        )
+        if settings.log_queries:
+            background_tasks.add_task(_log_query, _log_doc(req.questions[i], dicts[i], r, llm))
+    return BatchQueryResponse(results=items)
+
+
+class ResultPage(BaseModel):
+    result_id: str
+    total_rows: int
+    offset: int
+    limit: int
+    rows: List[Dict]
+
+
+class ResultInfo(BaseModel):
+    result_id: str
+    total_rows: int
+    columns: List[str]
+    parsed: Dict
+    datasets: List[str]
+    citations: List[Dict]
+    analytics: List[Dict] = []
+
+
+class SeriesLine(BaseModel):
+    name: str
+    points: List[List[float]]  # [year, value]
+    original_points: int
+
+
+class ResultSeries(BaseModel):
+    result_id: str
+    metric: Optional[str]
+    series: List[SeriesLine]
+
+
+def _stored(result_id: str) -> StoredResult:
+    item = RESULTS.get(result_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Result expired or unknown; re-run the query")
+    return item
+
+
+@app.get("/query/results/{result_id}", response_model=ResultInfo)
+async def query_result_info(result_id: str):
+    """Metadata of a stored /query result (no rows)."""
+    item = _stored(result_id)
+    return ResultInfo(
+        result_id=result_id,
+        total_rows=len(item.rows),
+        columns=item.columns,
+        parsed=item.parsed,
+        datasets=item.datasets,
+        citations=item.citations,
+        analytics=item.analytics,
+    )
+
+
+@app.get("/query/results/{result_id}/rows", response_model=ResultPage)
+async def query_result_rows(
+    request: Request,
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort_by: Optional[str] = Query(None, description="Column to sort by; missing values last"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+):
+    """One window of a stored /query result, optionally sorted (the order is cached per column)."""
+    item = _stored(result_id)
+    if sort_by and sort_by not in item.columns:
+        raise HTTPException(status_code=400, detail=f"Unknown column: {sort_by}")
+
+    async def page() -> Dict:
+        rows = item.sorted_rows(sort_by, order == "desc")
+        return ResultPage(
+            result_id=result_id,
+            total_rows=len(rows),
+            offset=offset,
+            limit=limit,
+            rows=rows[offset: offset + limit],
+        ).model_dump()
+
+    # Stored results never change, so a page's encoded body stays valid until the result expires
+    key = _build_cache_key("/query/results/rows", {"id": result_id, "offset": offset, "limit": limit, "sort_by": sort_by, "order": order})
+    return _send_body(request, await _encoded(key, page), {})
+
+
+@app.get("/query/results/{result_id}/series", response_model=ResultSeries)
+async def query_result_series(result_id: str, points: int = Query(200, ge=3, le=5000)):
+    """Per-group (year, value) series of a stored trend result, LTTB-downsampled to `points` each."""
+    item = _stored(result_id)
+    metric, groups = trend_analytics.series(item.rows)
+    return ResultSeries(
+        result_id=result_id,
+        metric=metric,
+        series=[SeriesLine(name=name, points=[list(p) for p in lttb(pts, points)], original_points=len(pts)) for name, pts in groups],
+    )
+
+
 # Entry point hint: uvicorn src.api.main:app --reload
 
 
 # ---------- Climate data endpoints ----------
 ROOT = Path(__file__).resolve().parents[2]
-PROC = ROOT / "data" / "processed" / "climate"
-AG_PROC = ROOT / "data" / "processed" / "agriculture"
 
 
 class StateAnnual(BaseModel):
@@ -155,33 +429,45 @@ def _build_cache_key(endpoint: str, params: Dict[str, Any]) -> str:
     return f"{endpoint}|" + "&".join(f"{k}={v}" for k, v in items)
 
 
-def _cache_lookup(key: str):
+@timed("cache")
+async def _cache_lookup(key: str):
     if not settings.cache_enabled:
         return None
     try:
-        col = get_collection(settings.cache_collection)
-        doc = col.find_one({"_id": key})
+        col = get_async_collection(settings.cache_collection)
+        doc = await col.find_one({"_id": key})
         if not doc:
+            record_cache(False)
             return None
         created_at = doc.get("created_at")
         if not created_at:
+            record_cache(False)
+            return None
+        age = (datetime.utcnow() - created_at).total_seconds()
+        if age > settings.cache_ttl_seconds:
+            await col.delete_one({"_id": key})
+            record_cache(False)
             return None
-        if datetime.utcnow() - created_at > timedelta(seconds=settings.cache_ttl_seconds):
-            col.delete_one({"_id": key})
+        # Entries close to expiry are occasionally reported as misses so one
+        # caller recomputes them before they lapse for everyone at once
+        if refresh_early(age, settings.cache_ttl_seconds, float(doc.get("compute_seconds") or 0.0), settings.cache_early_refresh_beta):
+            record_cache(False)
             return None
+        record_cache(True)
         return doc.get("data")
     except Exception:
+        record_cache(False)
         return None
 
 
-def _cache_store(key: str, data: Any):
+async def _cache_store(key: str, data: Any, compute_seconds: float = 0.0):
     if not settings.cache_enabled:
         return
     try:
-        col = get_collection(settings.cache_collection)
-        col.replace_one(
+        col = get_async_collection(settings.cache_collection)
+        await col.replace_one(
             {"_id": key},
-            {"_id": key, "created_at": datetime.utcnow(), "data": data},
+            {"_id": key, "created_at": datetime.utcnow(), "compute_seconds": compute_seconds, "data": data},
             upsert=True,
         )
     except Exception:
@@ -189,19 +475,77 @@ def _cache_store(key: str, data: Any):
         pass
 
 
-@app.get("/climate/state-annual", response_model=List[StateAnnual])
-def get_state_annual(
-    state: Optional[str] = Query(default=None, description="Filter by state name (exact match)"),
-    year: Optional[int] = Query(default=None, description="Filter by year"),
-    limit: int = Query(default=100, ge=1, le=1000),
-    offset: int = Query(default=0, ge=0),
-):
-    cache_key = _build_cache_key("/climate/state-annual", {"state": state, "year": year, "limit": limit, "offset": offset})
-    cached = _cache_lookup(cache_key)
+async def _cached(key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Cached value for `key`; on a miss, concurrent callers share one compute + store."""
+    cached = await _cache_lookup(key)
     if cached is not None:
         return cached
 
-    path = PROC / "rainfall_state_year.csv"
+    async def fill() -> Any:
+        start = time.perf_counter()
+        data = await compute()
+        await _cache_store(key, data, time.perf_counter() - start)
+        return data
+
+    return await INFLIGHT.do(key, fill)
+
+
+def _negotiated_headers(request: Request, headers: Dict[str, str]) -> Dict[str, str]:
+    # Each coding is a different byte sequence, so the shared ETag is weak for
+    # clients that may get one. Decided from Accept-Encoding alone (not the body
+    # size), so a 304 carries the same validator as the 200 it revalidates.
+    if "ETag" in headers and compression.accepts_compressed(request.headers.get("accept-encoding", "")):
+        return {**headers, "ETag": "W/" + headers["ETag"]}
+    return headers
+
+
+def _send_body(request: Request, body: compression.EncodedBody, headers: Dict[str, str]) -> Response:
+    coding, content = body.select(request.headers.get("accept-encoding", ""))
+    out = {**_negotiated_headers(request, headers), "Vary": "Accept-Encoding"}
+    if coding != "identity":
+        out["Content-Encoding"] = coding
+    return Response(content=content, media_type="application/json", headers=out)
+
+
+async def _encoded(key: str, compute: Callable[[], Awaitable[Any]]) -> compression.EncodedBody:
+    """Encoded body for `key`: from BODIES when hot, else computed, serialized and compressed once."""
+    body = BODIES.get(key)
+    if body is not None:
+        return body
+
+    async def fill() -> compression.EncodedBody:
+        data = await compute()
+        encoded = await run_in_threadpool(compression.encode_json, data, settings.response_compress_min_bytes)
+        BODIES.put(key, encoded)
+        return encoded
+
+    return await INFLIGHT.do("body|" + key, fill, label=key.split("|", 1)[0])
+
+
+def _validator_headers(v: http_cache.Validators) -> Dict[str, str]:
+    return {**v.headers(settings.http_cache_max_age_seconds), "Vary": "Accept-Encoding"}
+
+
+def _conditional(request: Request, response: Response, endpoint: str, params: Dict[str, Any], paths: List[Path], encoded: bool = True):
+    """(304 Response or None, validators) for a response computed from the files `paths`.
+
+    The 304 is returned when the client copy is current, before any data is
+    read; otherwise the ETag/Last-Modified/Cache-Control headers go on
+    `response`. Callers fold the ETag into their cache key, so reprocessing
+    a dataset also invalidates its cached pages. `encoded` endpoints answer
+    through `_send_body`, so their 304 carries the same (weak) ETag.
+    """
+    v = http_cache.validators(endpoint, params, paths)
+    headers = _validator_headers(v)
+    if v.matches(request.headers):
+        return Response(status_code=304, headers=_negotiated_headers(request, headers) if encoded else headers), v
+    response.headers.update(headers)
+    return None, v
+
+
+def _scan_state_annual(state: Optional[str], year: Optional[int]) -> List[Dict]:
+    # CSV parsing is blocking; endpoints run this in the threadpool
+    path = dataset_registry.registry()["rainfall_state_year"].path
     rows: List[Dict] = []
     for row in _read_csv_rows(path):
         s = row.get("State") or row.get("state") or ""
@@ -215,24 +559,34 @@ def get_state_annual(
         except Exception:
             val = 0.0
         rows.append({"State": s, "Year": y, "Annual_Rainfall_mm": val})
-    result = rows[offset : offset + limit]
-    _cache_store(cache_key, result)
-    return result
+    return rows
 
 
-@app.get("/climate/subdivision-annual", response_model=List[SubdivisionAnnual])
-def get_subdivision_annual(
-    subdivision: Optional[str] = Query(default=None, description="Filter by subdivision name (exact match)"),
+@app.get("/climate/state-annual", response_model=List[StateAnnual])
+async def get_state_annual(
+    request: Request,
+    response: Response,
+    state: Optional[str] = Query(default=None, description="Filter by state name (exact match)"),
     year: Optional[int] = Query(default=None, description="Filter by year"),
     limit: int = Query(default=100, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
 ):
-    cache_key = _build_cache_key("/climate/subdivision-annual", {"subdivision": subdivision, "year": year, "limit": limit, "offset": offset})
-    cached = _cache_lookup(cache_key)
-    if cached is not None:
-        return cached
+    params = {"state": state, "year": year, "limit": limit, "offset": offset}
+    not_modified, v = _conditional(request, response, "/climate/state-annual", params, dataset_registry.registry()["rainfall_state_year"].version_paths)
+    if not_modified is not None:
+        return not_modified
+    cache_key = _build_cache_key("/climate/state-annual", {**params, "v": v.etag})
 
-    path = PROC / "rainfall_subdivision_year.csv"
+    async def compute() -> List[Dict]:
+        rows = await run_in_threadpool(_scan_state_annual, state, year)
+        return rows[offset : offset + limit]
+
+    body = await _encoded(cache_key, lambda: _cached(cache_key, compute))
+    return _send_body(request, body, _validator_headers(v))
+
+
+def _scan_subdivision_annual(subdivision: Optional[str], year: Optional[int]) -> List[Dict]:
+    path = dataset_registry.registry()["rainfall_subdivision_year"].path
     rows: List[Dict] = []
     for row in _read_csv_rows(path):
         s = row.get("Subdivision") or row.get("subdivision") or ""
@@ -246,9 +600,30 @@ def get_subdivision_annual(
         except Exception:
             val = 0.0
         rows.append({"Subdivision": s, "Year": y, "Annual_Rainfall_mm": val})
-    result = rows[offset : offset + limit]
-    _cache_store(cache_key, result)
-    return result
+    return rows
+
+
+@app.get("/climate/subdivision-annual", response_model=List[SubdivisionAnnual])
+async def get_subdivision_annual(
+    request: Request,
+    response: Response,
+    subdivision: Optional[str] = Query(default=None, description="Filter by subdivision name (exact match)"),
+    year: Optional[int] = Query(default=None, description="Filter by year"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+):
+    params = {"subdivision": subdivision, "year": year, "limit": limit, "offset": offset}
+    not_modified, v = _conditional(request, response, "/climate/subdivision-annual", params, dataset_registry.registry()["rainfall_subdivision_year"].version_paths)
+    if not_modified is not None:
+        return not_modified
+    cache_key = _build_cache_key("/climate/subdivision-annual", {**params, "v": v.etag})
+
+    async def compute() -> List[Dict]:
+        rows = await run_in_threadpool(_scan_subdivision_annual, subdivision, year)
+        return rows[offset : offset + limit]
+
+    body = await _encoded(cache_key, lambda: _cached(cache_key, compute))
+    return _send_body(request, body, _validator_headers(v))
 
 
 # ---------- Agriculture data endpoints ----------
@@ -256,62 +631,77 @@ def get_subdivision_annual(
 class CropAPYRow(BaseModel):
     State: str
     Year: str  # e.g., "2000-01"
+    Year_start: int
+    Year_end: int
     Crop: str
     Area_ha: float
     Production_tonnes: float
     Yield_t_per_ha: float
 
 
+def _scan_crop_apy_state_year(
+    state: Optional[str],
+    crop: Optional[str],
+    year: Optional[str],
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+) -> List[Dict]:
+    bounds = crop_table.available_years()
+    if not bounds:
+        return []
+    lo = year_from if year_from is not None else bounds[0]
+    hi = year_to if year_to is not None else bounds[1]
+    if year:
+        # A label pins the start year; the slice is then checked for the exact label
+        start = crop_table.start_year(year)
+        if start is None:
+            return []
+        lo, hi = max(lo, start), min(hi, start)
+    states, crops = [state] if state else [], [crop] if crop else []
+    rows: List[Dict] = []
+    for table in crop_table.tables(states, crops, [], (lo, hi)):
+        for i in table.select(states, crops, [], (lo, hi)):
+            if year and table.year_label[i] != year:
+                continue
+            rows.append(
+                {
+                    "State": table.state[i],
+                    "Year": table.year_label[i],
+                    "Year_start": table.year_start[i],
+                    "Year_end": table.year_end[i],
+                    "Crop": table.crop[i],
+                    "Area_ha": table.metrics["Area_ha"][i],
+                    "Production_tonnes": table.metrics["Production_tonnes"][i],
+                    "Yield_t_per_ha": table.metrics["Yield_t_per_ha"][i],
+                }
+            )
+    return rows
+
+
 @app.get("/agriculture/crop-apy-state-year", response_model=List[CropAPYRow])
-def get_crop_apy_state_year(
+async def get_crop_apy_state_year(
+    request: Request,
+    response: Response,
     state: Optional[str] = Query(default=None, description="Filter by state (exact match)"),
     crop: Optional[str] = Query(default=None, description="Filter by crop (exact match)"),
     year: Optional[str] = Query(default=None, description="Filter by year label, e.g., 2000-01"),
+    year_from: Optional[int] = Query(default=None, description="Earliest crop start year (inclusive)"),
+    year_to: Optional[int] = Query(default=None, description="Latest crop start year (inclusive)"),
     limit: int = Query(default=100, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
 ):
-    cache_key = _build_cache_key("/agriculture/crop-apy-state-year", {"state": state, "crop": crop, "year": year, "limit": limit, "offset": offset})
-    cached = _cache_lookup(cache_key)
-    if cached is not None:
-        return cached
+    params = {"state": state, "crop": crop, "year": year, "year_from": year_from, "year_to": year_to, "limit": limit, "offset": offset}
+    not_modified, v = _conditional(request, response, "/agriculture/crop-apy-state-year", params, dataset_registry.registry()["crop_apy_state_year"].version_paths)
+    if not_modified is not None:
+        return not_modified
+    cache_key = _build_cache_key("/agriculture/crop-apy-state-year", {**params, "v": v.etag})
 
-    path = AG_PROC / "crop_apy_state_year.csv"
-    rows: List[Dict] = []
-    for row in _read_csv_rows(path):
-        s = row.get("State", "")
-        y = row.get("Year", "")
-        c = row.get("Crop", "")
-        if state and s != state:
-            continue
-        if crop and c != crop:
-            continue
-        if year and y != year:
-            continue
-        try:
-            area = float(row.get("Area_ha", "0") or 0)
-        except Exception:
-            area = 0.0
-        try:
-            prod = float(row.get("Production_tonnes", "0") or 0)
-        except Exception:
-            prod = 0.0
-        try:
-            yld = float(row.get("Yield_t_per_ha", "0") or 0)
-        except Exception:
-            yld = 0.0
-        rows.append(
-            {
-                "State": s,
-                "Year": y,
-                "Crop": c,
-                "Area_ha": area,
-                "Production_tonnes": prod,
-                "Yield_t_per_ha": yld,
-            }
-        )
-    result = rows[offset : offset + limit]
-    _cache_store(cache_key, result)
-    return result
+    async def compute() -> List[Dict]:
+        rows = await run_in_threadpool(_scan_crop_apy_state_year, state, crop, year, year_from, year_to)
+        return rows[offset : offset + limit]
+
+    body = await _encoded(cache_key, lambda: _cached(cache_key, compute))
+    return _send_body(request, body, _validator_headers(v))
 
 
 # ---------- Datasets and Stats stubs ----------
@@ -325,40 +715,152 @@ def _line_count_minus_header(path: Path) -> int:
         return 0
 
 
-def _file_meta(path: Path, kind: str) -> dict:
-    stat = path.stat()
-    return {
-        "id": f"{kind}:{path.stem}",
-        "kind": kind,
+def _dataset_meta(spec: dataset_registry.DatasetSpec) -> dict:
+    path = spec.path
+    meta = {
+        "id": spec.dataset_id,
+        "kind": spec.domain,
         "name": path.name,
-        "path": str(path.relative_to(ROOT)),
-        "bytes": stat.st_size,
-        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        "rows": _line_count_minus_header(path),
+        "path": spec.describe()["path"],
+        "available": path.exists(),
+        "bytes": None,
+        "modified": None,
+        "rows": 0,
     }
+    if meta["available"]:
+        stat = path.stat()
+        meta.update(bytes=stat.st_size, modified=datetime.fromtimestamp(stat.st_mtime).isoformat(), rows=_line_count_minus_header(path))
+    return meta
+
+
+def _registry_version_paths() -> List[Path]:
+    return [p for spec in dataset_registry.registry() for p in spec.version_paths]
 
 
 @app.get("/datasets", response_model=List[Dict])
-def list_datasets():
-    datasets: List[Dict] = []
-    # Climate
-    for p in (PROC.glob("*.csv")):
-        datasets.append(_file_meta(p, "climate"))
-    # Agriculture
-    for p in ((ROOT / "data" / "processed" / "agriculture").glob("*.csv")):
-        datasets.append(_file_meta(p, "agriculture"))
-    return datasets
+def list_datasets(request: Request, response: Response):
+    """One entry per dataset declared in the manifest, with file size and row count."""
+    # Row counts read every file; a current client copy skips all of that
+    not_modified, _ = _conditional(request, response, "/datasets", {}, _registry_version_paths(), encoded=False)
+    if not_modified is not None:
+        return not_modified
+    return [_dataset_meta(spec) for spec in dataset_registry.registry()]
 
 
 @app.get("/stats", response_model=Dict)
-def basic_stats():
-    stats: Dict[str, Any] = {"climate": {}, "agriculture": {}}
-    # Climate counts
-    state_year = PROC / "rainfall_state_year.csv"
-    subdiv_year = PROC / "rainfall_subdivision_year.csv"
-    stats["climate"]["state_annual_rows"] = _line_count_minus_header(state_year) if state_year.exists() else 0
-    stats["climate"]["subdivision_annual_rows"] = _line_count_minus_header(subdiv_year) if subdiv_year.exists() else 0
-    # Agriculture counts
-    crop_apy = ROOT / "data" / "processed" / "agriculture" / "crop_apy_state_year.csv"
-    stats["agriculture"]["crop_apy_rows"] = _line_count_minus_header(crop_apy) if crop_apy.exists() else 0
+def basic_stats(request: Request, response: Response):
+    """Row counts per declared dataset, grouped by domain: {"climate": {"rainfall_state_year_rows": n}}."""
+    not_modified, _ = _conditional(request, response, "/stats", {}, _registry_version_paths(), encoded=False)
+    if not_modified is not None:
+        return not_modified
+    stats: Dict[str, Any] = {}
+    for spec in dataset_registry.registry():
+        rows = _line_count_minus_header(spec.path) if spec.path.exists() else 0
+        stats.setdefault(spec.domain, {})[f"{spec.name}_rows"] = rows
     return stats
+
+
+# ---------- Registry-driven dataset endpoints ----------
+# Every dataset declared under `processed_datasets` in the manifest gets
+# these without code changes: typed rows filtered by its dimensions and
+# year field, and its declared rollups.
+
+def _registered(name: str) -> dataset_registry.DatasetSpec:
+    spec = dataset_registry.registry().get(name)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {name}")
+    return spec
+
+
+_RESERVED_PARAMS = {"year_from", "year_to", "limit", "offset"}
+
+
+def _dimension_filters(spec: dataset_registry.DatasetSpec, request: Request) -> Dict[str, List[Any]]:
+    """Dimension filters from the query string (?State=Kerala&State=Goa), typed per the schema."""
+    filters: Dict[str, List[Any]] = {}
+    for key in sorted(set(request.query_params.keys()) - _RESERVED_PARAMS):
+        col = spec.column(key)
+        if col is None or key not in spec.dimensions:
+            raise HTTPException(status_code=400, detail=f"Unknown filter: {key}; filter on {', '.join(spec.dimensions)}")
+        filters[key] = [col.convert({key: v}) for v in request.query_params.getlist(key)]
+    return filters
+
+
+def _filters_key(filters: Dict[str, List[Any]]) -> Optional[str]:
+    # JSON keeps ?State=Goa,Kerala (one value) apart from ?State=Goa&State=Kerala
+    # in cache keys and ETags; value order and repeats don't change the rows
+    if not filters:
+        return None
+    return json.dumps({k: sorted(set(v), key=repr) for k, v in filters.items()}, sort_keys=True, ensure_ascii=False)
+
+
+def _year_range(spec: dataset_registry.DatasetSpec, year_from: Optional[int], year_to: Optional[int]) -> Optional[Tuple[int, int]]:
+    if year_from is None and year_to is None:
+        return None
+    if not spec.year_field:
+        raise HTTPException(status_code=400, detail=f"{spec.name} has no year field")
+    return (year_from if year_from is not None else 0, year_to if year_to is not None else 9999)
+
+
+@app.get("/datasets/{name}", response_model=Dict)
+async def dataset_info(name: str):
+    """Registry entry of a processed dataset: schema, dimensions, metrics, indexes, aggregates."""
+    return _registered(name).describe()
+
+
+async def _registry_response(request: Request, response: Response, endpoint: str, spec: dataset_registry.DatasetSpec, params: Dict[str, Any], compute: Callable[[], List[Dict]]):
+    not_modified, v = _conditional(request, response, endpoint, params, spec.version_paths)
+    if not_modified is not None:
+        return not_modified
+    cache_key = _build_cache_key(endpoint, {**params, "v": v.etag})
+    body = await _encoded(cache_key, lambda: _cached(cache_key, lambda: run_in_threadpool(compute)))
+    return _send_body(request, body, _validator_headers(v))
+
+
+@app.get("/datasets/{name}/rows", response_model=List[Dict])
+async def dataset_rows(
+    request: Request,
+    response: Response,
+    name: str,
+    year_from: Optional[int] = Query(default=None, description="Earliest value of the dataset's year field (inclusive)"),
+    year_to: Optional[int] = Query(default=None, description="Latest value of the dataset's year field (inclusive)"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+):
+    """Typed rows of a registered dataset; any dimension column is a filter (repeat for several values)."""
+    spec = _registered(name)
+    filters = _dimension_filters(spec, request)
+    year_range = _year_range(spec, year_from, year_to)
+    params = {"filters": _filters_key(filters), "year_from": year_from, "year_to": year_to, "limit": limit, "offset": offset}
+
+    def compute() -> List[Dict]:
+        # Partitions are pruned by the filters, and reading stops at the page end
+        return list(itertools.islice(spec.rows(filters, year_range), offset, offset + limit))
+
+    return await _registry_response(request, response, f"/datasets/{name}/rows", spec, params, compute)
+
+
+@app.get("/datasets/{name}/aggregates/{aggregate}", response_model=List[Dict])
+async def dataset_aggregate(
+    request: Request,
+    response: Response,
+    name: str,
+    aggregate: str,
+    year_from: Optional[int] = Query(default=None, description="Earliest value of the dataset's year field (inclusive)"),
+    year_to: Optional[int] = Query(default=None, description="Latest value of the dataset's year field (inclusive)"),
+    limit: int = Query(default=1000, ge=1, le=10000),
+    offset: int = Query(default=0, ge=0),
+):
+    """A rollup declared for the dataset, over the rows matching the same filters as /rows."""
+    spec = _registered(name)
+    agg = spec.aggregate(aggregate)
+    if agg is None:
+        raise HTTPException(status_code=404, detail=f"Unknown aggregate for {name}: {aggregate}")
+    filters = _dimension_filters(spec, request)
+    year_range = _year_range(spec, year_from, year_to)
+    params = {"filters": _filters_key(filters), "year_from": year_from, "year_to": year_to, "limit": limit, "offset": offset}
+
+    def compute() -> List[Dict]:
+        return agg.compute(list(spec.rows(filters, year_range)))[offset: offset + limit]
+
+    return await _registry_response(request, response, f"/datasets/{name}/aggregates/{aggregate}", spec, params, compute)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import dataset_registry
+
+METRIC_FIELDS = ("Area_ha", "Production_tonnes", "Yield_t_per_ha")
+
+
+@dataclass
+class JoinedTable:
+    """Crop APY rows aligned with state annual rainfall, stored column-wise.
+
+    Columns are parallel lists so correlation can walk plain arrays instead of
+    re-reading dict rows per request.
+    """
+    state: List[str]
+    crop: List[str]
+    year: List[int]  # start year parsed from labels like "2009-10"
+    year_label: List[str]
+    rainfall: List[float]
+    metrics: Dict[str, List[float]]
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+
+_cache_key: Optional[Tuple[Path, float, Path, float]] = None
+_cache: Optional[JoinedTable] = None
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _to_float(x: Any) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+
+def _start_year(label: str) -> Optional[int]:
+    try:
+        return int(str(label).split("-")[0])
+    except Exception:
+        return None
+
+
+def build_joined_table(rain_path: Path, crop_path: Path) -> JoinedTable:
+    # Build side: hash rainfall on (State, Year). Zero annual rainfall marks a
+    # missing observation in the source, so it is left out of the join.
+    rain: Dict[Tuple[str, int], float] = {}
+    if rain_path.exists():
+        with open(rain_path, "r", encoding="utf-8", errors="ignore") as f:
+            for row in csv.DictReader(f):
+                val = _to_float(row.get("Annual_Rainfall_mm"))
+                y = _start_year(row.get("Year", ""))
+                if val > 0 and y is not None:
+                    rain[(row.get("State", ""), y)] = val
+
+    t = JoinedTable([], [], [], [], [], {m: [] for m in METRIC_FIELDS})
+    if not crop_path.exists():
+        return t
+    # Probe side: stream crop rows and keep those with a rainfall match
+    with open(crop_path, "r", encoding="utf-8", errors="ignore") as f:
+        for row in csv.DictReader(f):
+            label = row.get("Year", "")
+            y = _start_year(label)
+            if y is None:
+                continue
+            r = rain.get((row.get("State", ""), y))
+            if r is None:
+                continue
+            t.state.append(row.get("State", ""))
+            t.crop.append(row.get("Crop", ""))
+            t.year.append(y)
+            t.year_label.append(label)
+            t.rainfall.append(r)
+            for m in METRIC_FIELDS:
+                t.metrics[m].append(_to_float(row.get(m)))
+    return t
+
+
+def joined_table() -> JoinedTable:
+    """Cached rainfall x crop join, rebuilt only when either source file changes."""
+    global _cache_key, _cache
+    reg = dataset_registry.registry()
+    rain_path = reg["rainfall_state_year"].path
+    crop_path = reg["crop_apy_state_year"].path
+    key = (rain_path, _mtime(rain_path), crop_path, _mtime(crop_path))
+    if _cache is None or key != _cache_key:
+        _cache = build_joined_table(rain_path, crop_path)
+        _cache_key = key
+    return _cache
+
+
+def pearson(xs: List[float], ys: List[float]) -> Optional[float]:
+    """Pearson r from one pass of sufficient statistics; None if undefined."""
+    n = len(xs)
+    if n < 3:
+        return None
+    sx = sum(xs)
+    sy = sum(ys)
+    sxx = sum(x * x for x in xs)
+    syy = sum(y * y for y in ys)
+    sxy = sum(x * y for x, y in zip(xs, ys))
+    cov = n * sxy - sx * sy
+    vx = n * sxx - sx * sx
+    vy = n * syy - sy * sy
+    if vx <= 0 or vy <= 0:
+        return None
+    return max(-1.0, min(1.0, cov / math.sqrt(vx * vy)))
+
+
+def _ranks(vals: List[float]) -> List[float]:
+    # Average ranks for ties (1-based)
+    order = sorted(range(len(vals)), key=vals.__getitem__)
+    ranks = [0.0] * len(vals)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and vals[order[j + 1]] == vals[order[i]]:
+            j += 1
+        avg = (i + j) / 2.0 + 1.0
+        for k in range(i, j + 1):
+            ranks[order[k]] = avg
+        i = j + 1
+    return ranks
+
+
+def spearman(xs: List[float], ys: List[float]) -> Optional[float]:
+    if len(xs) < 3:
+        return None
+    return pearson(_ranks(xs), _ranks(ys))
+
+
+def correlate(
+    table: JoinedTable,
+    metric_field: str,
+    group_field: str,
+    states: List[str],
+    crops: List[str],
+    year_ok,
+) -> List[Dict[str, Any]]:
+    """Rainfall vs `metric_field` correlation per State or Crop over the joined table.
+
+    Per-State results are split by crop as well: yields of different crops
+    differ by orders of magnitude, so pooling them would correlate rainfall
+    with the crop mix rather than with yield. `year_ok(start_year) -> bool`
+    applies the query's year filters.
+    """
+    state_set = set(states)
+    crop_set = set(crops)
+    by_state = group_field == "State"
+    values = table.metrics[metric_field]
+    groups: Dict[Tuple[str, ...], Tuple[List[float], List[float]]] = {}
+    for i in range(len(table)):
+        if state_set and table.state[i] not in state_set:
+            continue
+        if crop_set and table.crop[i] not in crop_set:
+            continue
+        if not year_ok(table.year[i]):
+            continue
+        key = (table.state[i], table.crop[i]) if by_state else (table.crop[i],)
+        xs, ys = groups.setdefault(key, ([], []))
+        xs.append(table.rainfall[i])
+        ys.append(values[i])
+    rows: List[Dict[str, Any]] = []
+    for key, (xs, ys) in groups.items():
+        r = pearson(xs, ys)
+        rho = spearman(xs, ys)
+        row: Dict[str, Any] = {"State": key[0], "Crop": key[1]} if by_state else {"Crop": key[0]}
+        rows.append({
+            **row,
+            "Metric": metric_field,
+            "n": len(xs),
+            "pearson": round(r, 4) if r is not None else None,
+            "spearman": round(rho, 4) if rho is not None else None,
+        })
+    # Strongest relationships first; groups without enough data last
+    rows.sort(key=lambda r: (r["pearson"] is None, -abs(r["pearson"] or 0.0), r.get("State", ""), r["Crop"]))
+    return rows
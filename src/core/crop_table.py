@@ -0,0 +1,174 @@
+from __future__ import annotations
+import csv
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import dataset_registry, partitions
+
+# Registry entry whose path/partition_dir this module reads
+DATASET = "crop_apy_state_year"
+
+METRIC_FIELDS = ("Area_ha", "Production_tonnes", "Yield_t_per_ha")
+
+
+@dataclass
+class CropTable:
+    """Column-wise crop APY table ordered by start year.
+
+    `year_start` is ascending, so every year filter is a contiguous slice
+    found with two binary searches; labels ("2000-01") are kept only for
+    output.
+    """
+    state: List[str] = field(default_factory=list)
+    crop: List[str] = field(default_factory=list)
+    year_label: List[str] = field(default_factory=list)
+    year_start: List[int] = field(default_factory=list)
+    year_end: List[int] = field(default_factory=list)
+    metrics: Dict[str, List[float]] = field(default_factory=lambda: {m: [] for m in METRIC_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.year_start)
+
+    @property
+    def years(self) -> List[int]:
+        """First and last start year (enough for relative-year windows)."""
+        return [self.year_start[0], self.year_start[-1]] if self.year_start else []
+
+    def span(self, lo: int, hi: int) -> range:
+        """Row ids whose start year is within lo..hi."""
+        return range(bisect_left(self.year_start, lo), bisect_right(self.year_start, hi))
+
+    def select(
+        self,
+        states: Iterable[str],
+        crops: Iterable[str],
+        years: Iterable[int],
+        year_range: Optional[Tuple[int, int]],
+    ) -> List[int]:
+        """Row ids matching the filters, in year order."""
+        if years:
+            wanted = [y for y in sorted(set(years)) if not year_range or year_range[0] <= y <= year_range[1]]
+            ids: Iterable[int] = (i for y in wanted for i in self.span(y, y))
+        elif year_range:
+            ids = self.span(year_range[0], year_range[1])
+        else:
+            ids = range(len(self))
+        state_set, crop_set = set(states), set(crops)
+        return [
+            i for i in ids
+            if (not state_set or self.state[i] in state_set) and (not crop_set or self.crop[i] in crop_set)
+        ]
+
+
+_cache_key: Optional[Tuple[Path, float]] = None
+_cache: Optional[CropTable] = None
+_partition_cache: Dict[Path, Tuple[float, CropTable]] = {}
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def start_year(label: str) -> Optional[int]:
+    """Start year of a crop-year label ("2000-01" -> 2000)."""
+    try:
+        return int(str(label).split("-")[0])
+    except Exception:
+        return None
+
+
+def _spec() -> dataset_registry.DatasetSpec:
+    return dataset_registry.registry()[DATASET]
+
+
+def crop_path() -> Path:
+    """Flat crop APY file, as declared in the dataset manifest."""
+    return _spec().path
+
+
+def load_crop_table(path: Optional[Path] = None) -> CropTable:
+    path = path or crop_path()
+    t = CropTable()
+    if not path.exists():
+        return t
+    parsed: List[Tuple[int, int, Dict[str, str]]] = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for row in csv.DictReader(f):
+            start = _num(row.get("Year_start"))
+            # Files written before Year_start existed carry only the label
+            y = int(start) if start is not None else start_year(row.get("Year", ""))
+            if y is None:
+                continue
+            end = _num(row.get("Year_end"))
+            parsed.append((y, int(end) if end is not None else y, row))
+    # Processed files are already year-sorted; a stable sort keeps that cheap
+    parsed.sort(key=lambda p: p[0])
+    for y, end, row in parsed:
+        t.state.append(row.get("State", ""))
+        t.crop.append(row.get("Crop", ""))
+        t.year_label.append(row.get("Year", ""))
+        t.year_start.append(y)
+        t.year_end.append(end)
+        for m in METRIC_FIELDS:
+            t.metrics[m].append(_num(row.get(m)) or 0.0)
+    return t
+
+
+def crop_table() -> CropTable:
+    """Cached crop table, reloaded when the processed file changes."""
+    global _cache_key, _cache
+    path = crop_path()
+    try:
+        key = (path, path.stat().st_mtime)
+    except OSError:
+        key = (path, 0.0)
+    if _cache is None or key != _cache_key:
+        _cache = load_crop_table(path)
+        _cache_key = key
+    return _cache
+
+
+def partition_table(path: Path) -> CropTable:
+    """Cached table of one partition file."""
+    try:
+        key = path.stat().st_mtime
+    except OSError:
+        key = 0.0
+    cached = _partition_cache.get(path)
+    if cached is None or cached[0] != key:
+        cached = _partition_cache[path] = (key, load_crop_table(path))
+    return cached[1]
+
+
+def available_years() -> List[int]:
+    """First and last start year, from the partition manifest when there is one."""
+    m = _spec().manifest()
+    bounds = m.bounds("Year_start") if m is not None else None
+    return list(bounds) if bounds else crop_table().years
+
+
+def prune(
+    states: Iterable[str], crops: Iterable[str], years: Iterable[int], year_range: Optional[Tuple[int, int]]
+) -> Optional[List[partitions.Partition]]:
+    """State partitions that can hold rows for the filters (None without a partitioned layout)."""
+    m = _spec().manifest()
+    if m is None:
+        return None
+    intervals = [(y, y) for y in years] or ([year_range] if year_range else [])
+    return m.prune({"State": set(states), "Crop": set(crops)}, {"Year_start": intervals})
+
+
+def tables(states: Iterable[str], crops: Iterable[str], years: Iterable[int], year_range: Optional[Tuple[int, int]]) -> List[CropTable]:
+    """Tables that can hold rows for the filters, pruned by the State partition manifest.
+
+    Without a partitioned layout this is the whole cached table.
+    """
+    keep = prune(states, crops, years, year_range)
+    if keep is None:
+        return [crop_table()]
+    return [partition_table(p.path) for p in keep]
@@ -1,14 +1,15 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import csv
+import heapq
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from .query_parser import ParsedQuery
-
-ROOT = Path(__file__).resolve().parents[2]
-AG_PROC = ROOT / "data" / "processed" / "agriculture"
-CL_PROC = ROOT / "data" / "processed" / "climate"
+from . import correlation, crop_table, dataset_registry, fact_table, mongo_backend, parallel_scan, rainfall_series, sketches, trend_analytics
+from ..db.mongo import get_collection
+from ..utils.config import settings
+from ..utils.metrics import SCANS, timed
 
 
 def _read_csv(path: Path) -> List[Dict[str, Any]]:
@@ -24,6 +25,8 @@ class RoutedResult:
     datasets: List[str]
     citations: List[Dict[str, str]]
     rows: List[Dict[str, Any]]
+    # Per-group trend summaries (slope, mean, ...) for trend queries
+    analytics: List[Dict[str, Any]] = field(default_factory=list)
 
 
 def _filter_years(row_year: Union[int, str], years: List[int], year_range: Optional[Tuple[int, int]]) -> bool:
@@ -38,33 +41,271 @@ def _filter_years(row_year: Union[int, str], years: List[int], year_range: Optio
     return True
 
 
-def route_query(pq: ParsedQuery) -> RoutedResult:
+def _crop_metric_field(pq: ParsedQuery) -> str:
+    # Choose numeric field by metric priority
+    if "production" in pq.metrics:
+        return "Production_tonnes"
+    if "area" in pq.metrics:
+        return "Area_ha"
+    return "Yield_t_per_ha"
+
+
+def _top(rows: List[Dict[str, Any]], top_k: Optional[int]) -> List[Dict[str, Any]]:
+    # Highest values first; a bounded heap avoids sorting every group for top-k
+    if top_k:
+        return heapq.nlargest(top_k, rows, key=lambda r: r["Value"])
+    rows.sort(key=lambda r: r["Value"], reverse=True)
+    return rows
+
+
+_SKETCH_AGGS = ("median", "percentile", "distinct")
+
+
+def _sketch_rows(filtered: List[Dict[str, Any]], key_field: Optional[str], value_field: str, pq: ParsedQuery, extra: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Median/percentile/distinct-count per group (one overall row without a key).
+
+    Groups up to `settings.sketch_exact_limit` values are answered exactly;
+    larger ones spill into KLL / HyperLogLog sketches and report their error
+    bound (rank error for quantiles, relative error for counts).
+    """
+    limit = settings.sketch_exact_limit
+    distinct = pq.aggregation == "distinct"
+    groups: Dict[str, Any] = {}
+    for r in filtered:
+        key = r[key_field] if key_field else "All"
+        acc = groups.get(key)
+        if acc is None:
+            acc = groups[key] = sketches.DistinctCounter(limit) if distinct else sketches.QuantileSummary(limit)
+        if distinct:
+            acc.add(r.get(pq.distinct_of or ""))
+        else:
+            acc.add(r[value_field])
+    return _sketch_output(groups, key_field, pq, extra)
+
+
+def _sketch_output(groups: Dict[Any, Any], key_field: Optional[str], pq: ParsedQuery, extra: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for key, acc in groups.items():
+        row: Dict[str, Any] = {key_field or "Group": key}
+        row.update(extra)
+        if pq.aggregation == "distinct":
+            row.update({"Metric": f"distinct_{pq.distinct_of}", "Value": acc.count(), "Approximate": acc.approximate, "Error_bound": acc.relative_error})
+        else:
+            q = pq.percentile if pq.percentile is not None else 50.0
+            row.update({"Percentile": q, "Value": acc.quantile(q / 100.0), "n": acc.n, "Approximate": acc.approximate, "Error_bound": acc.rank_error})
+        rows.append(row)
+    return rows
+
+
+def _discrete_years(pq: ParsedQuery) -> List[int]:
+    # The parser also lists range bounds and "since" years as discrete years;
+    # drop those so a window filters on the whole range, not its endpoints.
+    return [y for y in pq.years if not (pq.year_range and y in pq.year_range) and y != pq.since_year]
+
+
+def _apply_relative_years(years: List[int], year_range: Optional[Tuple[int, int]], last_n_years: Optional[int], since_year: Optional[int], available_years: List[int]) -> Tuple[List[int], Optional[Tuple[int, int]]]:
+    if years or year_range:
+        return years, year_range
+    if not available_years:
+        return years, year_range
+    max_year = max(available_years)
+    min_year = min(available_years)
+    if last_n_years and last_n_years > 0:
+        start = max(min_year, max_year - last_n_years + 1)
+        return years, (start, max_year)
+    if since_year and since_year <= max_year:
+        start = max(min_year, since_year)
+        return years, (start, max_year)
+    return years, year_range
+
+
+def _spec(name: str) -> dataset_registry.DatasetSpec:
+    return dataset_registry.registry()[name]
+
+
+def _sources(*names: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """(dataset ids, citations) of registered datasets."""
+    specs = [_spec(n) for n in names]
+    return [s.dataset_id for s in specs], [s.citation() for s in specs]
+
+
+def _use_mongo(name: str) -> bool:
+    # Both configured (DATASET_BACKENDS) and declared loadable in the registry
+    return mongo_backend.backend_for(name) == "mongo" and "mongo" in _spec(name).backends
+
+
+def _route_mongo(pq: ParsedQuery, dataset: str, build) -> Optional[List[Dict[str, Any]]]:
+    """Run a routed query as a MongoDB aggregation; None means fall back to CSV."""
+    from pymongo.errors import PyMongoError  # only reached with a mongo backend configured
+    try:
+        col = get_collection(dataset)
+        year_field = _spec(dataset).year_field or "Year"
+        yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, mongo_backend.distinct_years(col, year_field))
+        return list(col.aggregate(build(yrs, yrng), allowDiskUse=True))
+    except PyMongoError:
+        return None
+
+
+def _route_correlation(pq: ParsedQuery) -> RoutedResult:
+    table = correlation.joined_table()
+    yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, table.year)
+    group_field = "Crop" if pq.group_by == "crop" else "State"
+    rows = correlation.correlate(
+        table,
+        _crop_metric_field(pq),
+        group_field,
+        pq.states,
+        pq.crops,
+        lambda y: _filter_years(y, yrs, yrng),
+    )
+    if pq.top_k:
+        rows = rows[: pq.top_k]
+    datasets, citations = _sources("rainfall_state_year", "crop_apy_state_year")
+    return RoutedResult(datasets=datasets, citations=citations, rows=rows)
+
+
+def _route_rainfall_condition(pq: ParsedQuery) -> RoutedResult:
+    table = fact_table.fact_table()
+    yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, table.year)
+    rows = fact_table.rainfall_condition_rows(
+        table,
+        pq.rainfall_condition or "low",
+        _crop_metric_field(pq),
+        "Crop" if pq.group_by == "crop" else "State",
+        pq.states,
+        pq.crops,
+        lambda y: _filter_years(y, yrs, yrng),
+    )
+    if pq.top_k:
+        rows = rows[: pq.top_k]
+    datasets, citations = _sources("crop_climate_fact", "crop_apy_state_year", "rainfall_subdivision_year")
+    # The join is the only dataset queried; the others are cited as its inputs
+    return RoutedResult(datasets=datasets[:1], citations=citations, rows=rows)
+
+
+def _seasonal_subdivisions(pq: ParsedQuery, known: List[str]) -> List[str]:
+    # Named subdivisions refine the state they mention ("Coastal Karnataka");
+    # other states expand to every subdivision they map to.
+    subs = list(pq.subdivisions)
+    mapping = rainfall_series.state_subdivisions()
+    for st in pq.states:
+        if any(st.lower() in sd.lower() for sd in pq.subdivisions):
+            continue
+        subs.extend(sd for sd in mapping.get(st, []) if sd not in subs)
+    return subs or sorted(known)
+
+
+def _route_seasonal(pq: ParsedQuery) -> RoutedResult:
+    months = rainfall_series.SEASONS[pq.season] if pq.season else tuple(pq.months)
+    yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, rainfall_series.available_years())
+    subdivisions = _seasonal_subdivisions(pq, rainfall_series.subdivision_names())
+    rows = rainfall_series.seasonal_rows(
+        rainfall_series.series_for(subdivisions, yrs, yrng),
+        subdivisions,
+        months,
+        rainfall_series.season_label(pq.season, months),
+        yrs,
+        yrng,
+        pq.aggregation,
+        per_year=pq.intent == "trend" or pq.group_by == "year",
+    )
+    if pq.top_k:
+        rows = rows[: pq.top_k]
+    datasets, citations = _sources("rainfall_subdivision_long")
+    return RoutedResult(datasets=datasets, citations=citations, rows=rows)
+
+
+def _asks_crop_metric(pq: ParsedQuery) -> bool:
+    return bool(pq.crops) or any(m in pq.metrics for m in ("yield", "production", "area"))
+
+
+def _is_rainfall_condition(pq: ParsedQuery) -> bool:
+    # "low rainfall"/"drought" alone is a rainfall question; the fact table only
+    # answers how crops fared in those years
+    return bool(pq.rainfall_condition) and _asks_crop_metric(pq)
+
+
+def _is_seasonal(pq: ParsedQuery) -> bool:
+    return bool(pq.season or pq.months) and not _asks_crop_metric(pq)
+
+
+def _is_climate(pq: ParsedQuery) -> bool:
+    return (pq.domain == "climate") or ("rainfall" in pq.metrics)
+
+
+def _is_agriculture(pq: ParsedQuery) -> bool:
+    return (pq.domain == "agriculture") or any(m in pq.metrics for m in ["yield", "production", "area"]) or bool(pq.crops)
+
+
+def _dataset_path(pq: ParsedQuery) -> Optional[Path]:
+    """CSV file route_query would scan for `pq` (None when nothing matches)."""
+    if pq.intent == "correlation" or _is_rainfall_condition(pq) or _is_seasonal(pq):
+        return None  # served from the cached join / fact table / monthly series
+    if _is_climate(pq):
+        return _spec("rainfall_state_year").path
+    return None  # agriculture is served from the cached, year-sorted crop table
+
+
+def route_many(pqs: List[ParsedQuery]) -> List[Union[RoutedResult, Exception]]:
+    """Route a batch of queries, reading each target dataset once for the whole batch.
+
+    Results are in input order; a query that fails yields its exception instead
+    of aborting the batch.
+    """
+    tables: Dict[Path, List[Dict[str, Any]]] = {}
+    for pq in pqs:
+        path = _dataset_path(pq)
+        # Mongo-backed datasets are queried per item; only CSVs benefit from a shared read
+        if path is not None and path not in tables and not _use_mongo(path.stem):
+            tables[path] = _read_csv(path)
+    out: List[Union[RoutedResult, Exception]] = []
+    for pq in pqs:
+        try:
+            out.append(route_query(pq, tables))
+        except Exception as e:
+            out.append(e)
+    return out
+
+
+@timed("route")
+def route_query(pq: ParsedQuery, tables: Optional[Dict[Path, List[Dict[str, Any]]]] = None) -> RoutedResult:
+    routed = _route(pq, tables)
+    # Trend rows carry moving average / YoY / anomaly columns plus a per-group fit
+    if pq.intent == "trend" and routed.rows:
+        routed.analytics = trend_analytics.annotate(routed.rows, pq.window)
+    return routed
+
+
+def _route(pq: ParsedQuery, tables: Optional[Dict[Path, List[Dict[str, Any]]]]) -> RoutedResult:
     # Default empty
     datasets: List[str] = []
     citations: List[Dict[str, str]] = []
     rows: List[Dict[str, Any]] = []
-    # Helpers inside to keep function self-contained
-    def _apply_relative_years(years: List[int], year_range: Optional[Tuple[int, int]], last_n_years: Optional[int], since_year: Optional[int], available_years: List[int]) -> Tuple[List[int], Optional[Tuple[int, int]]]:
-        if years or year_range:
-            return years, year_range
-        if not available_years:
-            return years, year_range
-        max_year = max(available_years)
-        min_year = min(available_years)
-        if last_n_years and last_n_years > 0:
-            start = max(min_year, max_year - last_n_years + 1)
-            return years, (start, max_year)
-        if since_year and since_year <= max_year:
-            start = max(min_year, since_year)
-            return years, (start, max_year)
-        return years, year_range
+    # -------- Correlation: rainfall x crop APY --------
+    if pq.intent == "correlation":
+        return _route_correlation(pq)
+
+    # -------- Fact table: crop metrics in low/high rainfall years --------
+    if _is_rainfall_condition(pq):
+        return _route_rainfall_condition(pq)
+
+    # -------- Monthly / seasonal rainfall from the subdivision series --------
+    if _is_seasonal(pq):
+        return _route_seasonal(pq)
 
     # -------- Climate: rainfall --------
-    if (pq.domain == "climate") or ("rainfall" in pq.metrics):
-        path = CL_PROC / "rainfall_state_year.csv"
-        data = _read_csv(path)
-        datasets.append("climate:rainfall_state_year")
-        citations.append({"dataset": "rainfall_state_year", "path": str(path)})
+    if _is_climate(pq):
+        spec = _spec("rainfall_state_year")
+        path = spec.path
+        datasets.append(spec.dataset_id)
+        group_by = pq.group_by or ("state" if pq.intent in ("ranking", "comparison") else None)
+        if _use_mongo(spec.name) and pq.aggregation != "distinct":
+            mrows = _route_mongo(pq, spec.name, lambda yrs, yrng: mongo_backend.rainfall_pipeline(pq, yrs, yrng, group_by))
+            if mrows is not None:
+                citations.append({"dataset": spec.name, "path": f"mongodb:{settings.mongodb_db}.{spec.name}"})
+                return RoutedResult(datasets=datasets, citations=citations, rows=mrows)
+        data = tables[path] if tables is not None and path in tables else _read_csv(path)
+        citations.append(spec.citation())
 
         # Collect available years first
         avail_years: List[int] = []
@@ -73,10 +314,8 @@ def route_query(pq: ParsedQuery) -> RoutedResult:
                 avail_years.append(int(d.get("Year", 0)))
             except Exception:
                 continue
-        yrs, yrng = _apply_relative_years(pq.years, pq.year_range, pq.last_n_years, pq.since_year, avail_years)
+        yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, avail_years)
 
-        # If ranking without explicit group_by, default to state
-        group_by = pq.group_by or ("state" if pq.intent in ("ranking", "comparison") else None)
         agg = pq.aggregation
         top_k = pq.top_k
 
@@ -100,6 +339,11 @@ def route_query(pq: ParsedQuery) -> RoutedResult:
             rows = sorted(filtered, key=lambda r: (r["State"], r["Year"]))
             return RoutedResult(datasets=datasets, citations=citations, rows=rows)
 
+        if agg in _SKETCH_AGGS:
+            key = "State" if group_by == "state" and pq.distinct_of != "State" else None
+            rows = _top(_sketch_rows(filtered, key, "Annual_Rainfall_mm", pq, {}), top_k)
+            return RoutedResult(datasets=datasets, citations=citations, rows=rows)
+
         # Ranking / Aggregation across states
         if group_by == "state":
             # Group values per state
@@ -119,109 +363,85 @@ def route_query(pq: ParsedQuery) -> RoutedResult:
                 else:  # default sum
                     val = sum(vals)
                 agg_rows.append({"State": st, "Value": val})
-            # Sort desc for top/highest by default
-            agg_rows.sort(key=lambda r: r["Value"], reverse=True)
-            if top_k:
-                agg_rows = agg_rows[: top_k]
+            # Highest first by default
+            agg_rows = _top(agg_rows, top_k)
             return RoutedResult(datasets=datasets, citations=citations, rows=agg_rows)
 
         # Otherwise, just return filtered rows
         return RoutedResult(datasets=datasets, citations=citations, rows=filtered)
 
     # -------- Agriculture: crop APY --------
-    if (pq.domain == "agriculture") or any(m in pq.metrics for m in ["yield", "production", "area"]) or pq.crops:
-        path = AG_PROC / "crop_apy_state_year.csv"
-        data = _read_csv(path)
-        datasets.append("agriculture:crop_apy_state_year")
-        citations.append({"dataset": "crop_apy_state_year", "path": str(path)})
-
-        # Determine available start years from labels like "2009-10"
-        avail_years: List[int] = []
-        for d in data:
-            label = d.get("Year", "")
-            try:
-                avail_years.append(int(str(label).split("-")[0]))
-            except Exception:
-                continue
-        yrs, yrng = _apply_relative_years(pq.years, pq.year_range, pq.last_n_years, pq.since_year, avail_years)
-
-        # Choose numeric field by metric priority
-        metric_field = "Yield_t_per_ha"
-        if "production" in pq.metrics:
-            metric_field = "Production_tonnes"
-        elif "area" in pq.metrics:
-            metric_field = "Area_ha"
-        elif "yield" in pq.metrics:
-            metric_field = "Yield_t_per_ha"
-
-        # Default grouping: comparison/ranking across states
+    if _is_agriculture(pq):
+        spec = _spec("crop_apy_state_year")
+        datasets.append(spec.dataset_id)
+        metric_field = _crop_metric_field(pq)
         group_by = pq.group_by or ("state" if pq.intent in ("ranking", "comparison") else None)
+        if _use_mongo(spec.name) and pq.aggregation != "distinct":
+            mrows = _route_mongo(pq, spec.name, lambda yrs, yrng: mongo_backend.crop_pipeline(pq, yrs, yrng, group_by, metric_field))
+            if mrows is not None:
+                citations.append({"dataset": spec.name, "path": f"mongodb:{settings.mongodb_db}.{spec.name}"})
+                return RoutedResult(datasets=datasets, citations=citations, rows=mrows)
+        citations.append(spec.citation())
+        yrs, yrng = _apply_relative_years(_discrete_years(pq), pq.year_range, pq.last_n_years, pq.since_year, crop_table.available_years())
+
         agg = pq.aggregation
         top_k = pq.top_k
 
-        filtered: List[Dict[str, Any]] = []
-        for d in data:
-            s = d.get("State", "")
-            y_label = d.get("Year", "")
-            crop = d.get("Crop", "")
-            # Filters
-            if pq.states and s not in pq.states:
-                continue
-            if pq.crops and crop not in pq.crops:
-                continue
-            # Year filtering using start year
-            if yrs:
-                if not any(str(yr) in str(y_label) for yr in yrs):
-                    continue
-            if yrng:
-                try:
-                    start_year = int(str(y_label).split("-")[0])
-                except Exception:
-                    continue
-                if not (yrng[0] <= start_year <= yrng[1]):
-                    continue
-            try:
-                val = float(d.get(metric_field, "0") or 0)
-            except Exception:
-                val = 0.0
-            filtered.append({
-                "State": s,
-                "Year": y_label,
-                "Crop": crop,
-                metric_field: val,
-            })
-
-        # Trend -> return by year for first matching state/crop if specified; else all rows (may be large)
-        if pq.intent == "trend" or group_by == "year":
-            rows = sorted(filtered, key=lambda r: (r.get("State", ""), r.get("Crop", ""), r.get("Year", "")))
-            return RoutedResult(datasets=datasets, citations=citations, rows=rows)
-
-        # Group and aggregate across states (or crops)
+        # Grouped aggregations run as a partitioned scan with mergeable partials,
+        # on a process pool when the manifest estimates a large scan
         key_field = "State" if group_by == "state" else ("Crop" if group_by == "crop" else None)
-        if key_field:
-            grouped: Dict[str, List[float]] = {}
-            for r in filtered:
-                grouped.setdefault(r[key_field], []).append(r.get(metric_field, 0.0))
+        if pq.intent != "trend" and group_by != "year" and (key_field or agg in _SKETCH_AGGS):
+            if agg in _SKETCH_AGGS:
+                key_field = key_field if key_field != pq.distinct_of else None
+            scan = parallel_scan.ScanSpec(
+                states=tuple(pq.states),
+                crops=tuple(pq.crops),
+                years=tuple(yrs),
+                year_range=yrng,
+                metric_field=metric_field,
+                key_field=key_field,
+                mode={"distinct": "distinct", "median": "quantile", "percentile": "quantile"}.get(agg or "", "basic"),
+                distinct_of=pq.distinct_of,
+                exact_limit=settings.sketch_exact_limit,
+            )
+            groups, mode = parallel_scan.run(scan, settings.scan_workers, settings.parallel_scan_min_rows)
+            SCANS.inc(mode=mode)
+            if agg in _SKETCH_AGGS:
+                extra = {} if agg == "distinct" else {"Metric": metric_field}
+                rows = _top(_sketch_output(groups, key_field, pq, extra), top_k)
+                return RoutedResult(datasets=datasets, citations=citations, rows=rows)
             agg_rows: List[Dict[str, Any]] = []
-            for key, vals in grouped.items():
-                if not vals:
-                    continue
+            for key, (total, n, lo, hi) in groups.items():
                 if agg == "avg" or (agg is None and metric_field == "Yield_t_per_ha"):
                     # default to average for yield if not specified
-                    val = sum(vals) / max(1, len(vals))
+                    val = total / n
                 elif agg == "min":
-                    val = min(vals)
+                    val = lo
                 elif agg == "max":
-                    val = max(vals)
+                    val = hi
                 else:
-                    val = sum(vals)
+                    val = total
                 agg_rows.append({key_field: key, "Metric": metric_field, "Value": val})
             # Sort high-to-low by default
-            agg_rows.sort(key=lambda r: r["Value"], reverse=True)
-            if top_k:
-                agg_rows = agg_rows[: top_k]
+            agg_rows = _top(agg_rows, top_k)
             return RoutedResult(datasets=datasets, citations=citations, rows=agg_rows)
 
+        # Only State partitions whose manifest stats can match are opened; within
+        # each, integer start years are binary-searched
+        filtered: List[Dict[str, Any]] = []
+        for table in crop_table.tables(pq.states, pq.crops, yrs, yrng):
+            values = table.metrics[metric_field]
+            filtered.extend(
+                {"State": table.state[i], "Year": table.year_label[i], "Crop": table.crop[i], metric_field: values[i]}
+                for i in table.select(pq.states, pq.crops, yrs, yrng)
+            )
+
+        # Trend -> return by year for first matching state/crop if specified; else all rows (may be large)
+        if pq.intent == "trend" or group_by == "year":
+            # Stable sort: rows are already in year order within each group
+            rows = sorted(filtered, key=lambda r: (r["State"], r["Crop"]))
+            return RoutedResult(datasets=datasets, citations=citations, rows=rows)
+
         # Otherwise return filtered rows
         return RoutedResult(datasets=datasets, citations=citations, rows=filtered)
 
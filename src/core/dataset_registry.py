@@ -0,0 +1,264 @@
+from __future__ import annotations
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import partitions
+
+ROOT = Path(__file__).resolve().parents[2]
+MANIFEST_PATH = ROOT / "data" / "datasets.manifest.yaml"
+
+# Processed datasets as declared under `processed_datasets:` in the
+# manifest: schema, key dimensions, metrics, MongoDB indexes and rollups.
+# The Mongo loader, the generic /datasets/{name} endpoints and the router's
+# paths/citations all read from here.
+
+TYPES = ("str", "int", "float")
+AGGREGATE_OPS = ("sum", "mean", "min", "max", "count")
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    type: str = "str"
+    fallback: Optional[str] = None  # column read when this one is empty
+    nullable: bool = False  # empty numbers stay None instead of 0
+
+    def convert(self, row: Dict[str, str]) -> Any:
+        raw = (row.get(self.name) or "").strip()
+        if not raw and self.fallback:
+            raw = (row.get(self.fallback) or "").strip()
+        if self.type == "str":
+            return raw
+        if not raw:
+            return None if self.nullable else (0 if self.type == "int" else 0.0)
+        try:
+            # "2000-01" -> 2000: crop-year labels stand in for a missing start year
+            return int(raw.split("-")[0]) if self.type == "int" else float(raw)
+        except ValueError:
+            return None if self.nullable else (0 if self.type == "int" else 0.0)
+
+
+@dataclass(frozen=True)
+class AggregateSpec:
+    name: str
+    group_by: Tuple[str, ...]
+    metrics: Tuple[Tuple[str, str], ...]  # (column, op)
+
+    def compute(self, rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One output row per group, in group-key order; None metric values are skipped."""
+        acc: Dict[Tuple[Any, ...], List[List[float]]] = {}
+        for r in rows:
+            key = tuple(r.get(c) for c in self.group_by)
+            slots = acc.get(key)
+            if slots is None:
+                slots = acc[key] = [[0.0, 0, float("inf"), float("-inf")] for _ in self.metrics]
+            for slot, (col, _) in zip(slots, self.metrics):
+                v = r.get(col)
+                if v is None:
+                    continue
+                slot[0] += v
+                slot[1] += 1
+                slot[2] = min(slot[2], v)
+                slot[3] = max(slot[3], v)
+        out = []
+        for key in sorted(acc, key=lambda k: tuple((v is None, v) for v in k)):
+            row: Dict[str, Any] = dict(zip(self.group_by, key))
+            for (col, op), (total, n, lo, hi) in zip(self.metrics, acc[key]):
+                if op == "count":
+                    row[f"{col}_count"] = n
+                elif not n:
+                    row[f"{col}_{op}"] = None
+                else:
+                    row[f"{col}_{op}"] = {"sum": total, "mean": total / n, "min": lo, "max": hi}[op]
+            out.append(row)
+        return out
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    name: str
+    domain: str
+    path: Path
+    columns: Tuple[Column, ...]
+    dimensions: Tuple[str, ...] = ()
+    metrics: Tuple[str, ...] = ()
+    year_field: Optional[str] = None
+    indexes: Tuple[Tuple[str, ...], ...] = ()
+    aggregates: Tuple[AggregateSpec, ...] = ()
+    backends: Tuple[str, ...] = ("csv",)
+    sources: Tuple[str, ...] = ()
+    partition_dir: Optional[Path] = None
+
+    @property
+    def dataset_id(self) -> str:
+        return f"{self.domain}:{self.name}"
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    def column(self, name: str) -> Optional[Column]:
+        return next((c for c in self.columns if c.name == name), None)
+
+    def aggregate(self, name: str) -> Optional[AggregateSpec]:
+        return next((a for a in self.aggregates if a.name == name), None)
+
+    def citation(self) -> Dict[str, str]:
+        return {"dataset": self.name, "path": str(self.path)}
+
+    @property
+    def version_paths(self) -> List[Path]:
+        """Files whose mtime/size version the dataset (flat file plus partition manifest)."""
+        paths = [self.path]
+        if self.partition_dir is not None:
+            paths.append(self.partition_dir / partitions.MANIFEST_NAME)
+        return paths
+
+    def convert(self, row: Dict[str, str]) -> Dict[str, Any]:
+        return {c.name: c.convert(row) for c in self.columns}
+
+    def manifest(self) -> Optional[partitions.Manifest]:
+        """Partition manifest when the dataset is laid out in partitions."""
+        return partitions.manifest(self.partition_dir) if self.partition_dir is not None else None
+
+    def files(self, equals: Dict[str, Collection[Any]], year_range: Optional[Tuple[int, int]]) -> List[Path]:
+        """Files that can hold matching rows: pruned partitions when laid out, else the flat file."""
+        m = self.manifest()
+        if m is None:
+            return [self.path] if self.path.exists() else []
+        ranges = {self.year_field: [year_range]} if self.year_field and year_range else {}
+        return [p.path for p in m.prune(equals, ranges)]
+
+    def rows(
+        self,
+        equals: Optional[Dict[str, Collection[Any]]] = None,
+        year_range: Optional[Tuple[int, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Typed rows with `col in equals[col]` and the year field inside `year_range`."""
+        equals = {k: set(v) for k, v in (equals or {}).items() if v}
+        for path in self.files(equals, year_range):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                for raw in csv.DictReader(f):
+                    row = self.convert(raw)
+                    if any(row.get(k) not in v for k, v in equals.items()):
+                        continue
+                    if year_range and self.year_field:
+                        y = row.get(self.year_field)
+                        if y is None or not year_range[0] <= y <= year_range[1]:
+                            continue
+                    yield row
+
+    def describe(self) -> Dict[str, Any]:
+        try:
+            path = str(self.path.relative_to(ROOT))
+        except ValueError:
+            path = str(self.path)
+        return {
+            "name": self.name,
+            "id": self.dataset_id,
+            "domain": self.domain,
+            "path": path,
+            "schema": {c.name: c.type for c in self.columns},
+            "dimensions": list(self.dimensions),
+            "metrics": list(self.metrics),
+            "year_field": self.year_field,
+            "indexes": [list(i) for i in self.indexes],
+            "aggregates": [{"name": a.name, "group_by": list(a.group_by), "metrics": dict(a.metrics)} for a in self.aggregates],
+            "backends": list(self.backends),
+            "sources": list(self.sources),
+            "partitioned": self.partition_dir is not None,
+        }
+
+
+def _column(name: str, decl: Any) -> Column:
+    if isinstance(decl, dict):
+        col = Column(name, str(decl.get("type", "str")), decl.get("fallback"), bool(decl.get("nullable", False)))
+    else:
+        col = Column(name, str(decl or "str"))
+    if col.type not in TYPES:
+        raise ValueError(f"column {name}: unknown type {col.type!r} (expected one of {', '.join(TYPES)})")
+    return col
+
+
+def parse_spec(doc: Dict[str, Any], root: Path = ROOT) -> DatasetSpec:
+    """One `processed_datasets` entry; raises ValueError when it references undeclared columns."""
+    name = doc.get("name")
+    if not name or not doc.get("path"):
+        raise ValueError(f"processed dataset entry needs a name and a path: {doc!r}")
+    columns = tuple(_column(c, d) for c, d in (doc.get("schema") or {}).items())
+    known = {c.name for c in columns}
+    aggregates = tuple(
+        AggregateSpec(a["name"], tuple(a.get("group_by") or ()), tuple((c, str(op)) for c, op in (a.get("metrics") or {}).items()))
+        for a in doc.get("aggregates") or []
+    )
+    spec = DatasetSpec(
+        name=name,
+        domain=doc.get("domain", ""),
+        path=root / doc["path"],
+        columns=columns,
+        dimensions=tuple(doc.get("dimensions") or ()),
+        metrics=tuple(doc.get("metrics") or ()),
+        year_field=doc.get("year_field"),
+        indexes=tuple(tuple(i) for i in doc.get("indexes") or ()),
+        aggregates=aggregates,
+        backends=tuple(doc.get("backends") or ("csv",)),
+        sources=tuple(doc.get("sources") or ()),
+        partition_dir=root / doc["partition_dir"] if doc.get("partition_dir") else None,
+    )
+    referenced = list(spec.dimensions) + list(spec.metrics) + [c for i in spec.indexes for c in i]
+    referenced += [spec.year_field] if spec.year_field else []
+    for a in aggregates:
+        referenced += list(a.group_by) + [c for c, _ in a.metrics]
+        bad_ops = [op for _, op in a.metrics if op not in AGGREGATE_OPS]
+        if bad_ops:
+            raise ValueError(f"{name}.{a.name}: unknown aggregate op(s) {', '.join(bad_ops)}")
+    missing = sorted({c for c in referenced if c not in known})
+    if missing:
+        raise ValueError(f"{name}: {', '.join(missing)} not declared in schema")
+    return spec
+
+
+class Registry:
+    def __init__(self, specs: Sequence[DatasetSpec]):
+        self._specs: Dict[str, DatasetSpec] = {s.name: s for s in specs}
+
+    def __iter__(self) -> Iterator[DatasetSpec]:
+        return iter(self._specs.values())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def get(self, name: str) -> Optional[DatasetSpec]:
+        return self._specs.get(name)
+
+    def __getitem__(self, name: str) -> DatasetSpec:
+        return self._specs[name]
+
+
+def load_registry(path: Optional[Path] = None, root: Path = ROOT) -> Registry:
+    import yaml  # only needed once, when the manifest is (re)read
+
+    with open(path or MANIFEST_PATH, "r", encoding="utf-8") as f:
+        doc = yaml.safe_load(f) or {}
+    return Registry([parse_spec(d, root) for d in doc.get("processed_datasets") or []])
+
+
+_cache: Optional[Tuple[Tuple[Path, float], Registry]] = None
+
+
+def registry() -> Registry:
+    """Cached registry, re-read when the manifest (or MANIFEST_PATH itself) changes."""
+    global _cache
+    path = MANIFEST_PATH
+    try:
+        key = (path, path.stat().st_mtime)
+    except OSError:
+        key = (path, 0.0)
+    if _cache is None or _cache[0] != key:
+        _cache = (key, load_registry(path))
+    return _cache[1]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets downsampling of an x-sorted series.
+
+    Keeps the first and last points and, from each of `threshold - 2` equal
+    buckets, the point forming the largest triangle with the previously kept
+    point and the next bucket's average. Peaks and troughs survive, unlike
+    plain striding.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    out: List[Point] = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nxt_start, nxt_end = end, min(int((i + 2) * every) + 1, n)
+        nxt = points[nxt_start:nxt_end] or [points[-1]]
+        avg_x = sum(p[0] for p in nxt) / len(nxt)
+        avg_y = sum(p[1] for p in nxt) / len(nxt)
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
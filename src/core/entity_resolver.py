@@ -0,0 +1,141 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_MAX_SPAN = 4  # longest catalog names ("andaman and nicobar islands") are 4 tokens
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase word tokens with '&' spelled out, so "Jammu & Kashmir" == "Jammu And Kashmir"."""
+    return _NON_ALNUM_RE.sub(" ", text.lower().replace("&", " and ")).split()
+
+
+def _trigrams(s: str) -> Set[str]:
+    padded = f"${s}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _levenshtein(a: str, b: str, limit: int) -> int:
+    """Edit distance, or limit + 1 as soon as it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+@dataclass(frozen=True)
+class EntityMatch:
+    text: str  # span of the question that matched
+    kind: str  # state | subdivision | crop
+    value: str  # canonical catalog name
+    confidence: float  # 1.0 for alias/normalized matches
+    method: str  # alias | normalized | fuzzy
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"text": self.text, "kind": self.kind, "value": self.value, "confidence": self.confidence, "method": self.method}
+
+
+class EntityResolver:
+    """Resolves misspelled or aliased state/subdivision/crop names in a question.
+
+    Every catalog name is keyed by its normalized form with spaces removed
+    ("tamilnadu"); alias rows map extra keys to catalog names. Word spans of
+    the question are looked up exactly on those keys first, then through a
+    character-trigram inverted index whose few best candidates are verified
+    with a bounded edit distance. Results are memoized per span.
+    """
+
+    def __init__(self, catalogs: Dict[str, Iterable[str]], aliases: Iterable[Tuple[str, str, str]], skip_words: Iterable[str], min_confidence: float = 0.8):
+        self.min_confidence = min_confidence
+        self.skip_words = set(skip_words)
+        # compact key -> [(kind, canonical, method)]
+        self.exact: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.keys: List[Tuple[str, str, str]] = []  # (compact, kind, canonical) for fuzzy search
+        self.gram_counts: List[int] = []
+        self.index: Dict[str, List[int]] = {}
+        for kind, names in catalogs.items():
+            for name in names:
+                key = "".join(normalize(name))
+                if not key:
+                    continue
+                self.exact.setdefault(key, []).append((kind, name, "normalized"))
+                grams = _trigrams(key)
+                for g in grams:
+                    self.index.setdefault(g, []).append(len(self.keys))
+                self.keys.append((key, kind, name))
+                self.gram_counts.append(len(grams))
+        known = {(kind, name) for kind, names in catalogs.items() for name in names}
+        for kind, alias, canonical in aliases:
+            if (kind, canonical) in known:
+                self.exact.setdefault("".join(normalize(alias)), []).append((kind, canonical, "alias"))
+        self._memo: Dict[str, List[Tuple[str, str, float, str]]] = {}
+
+    def _lookup(self, key: str, allow_fuzzy: bool) -> List[Tuple[str, str, float, str]]:
+        memo_key = key if allow_fuzzy else "=" + key
+        hit = self._memo.get(memo_key)
+        if hit is not None:
+            return hit
+        found = [(kind, name, 1.0, method) for kind, name, method in self.exact.get(key, [])]
+        if not found and allow_fuzzy and len(key) >= 4:
+            grams = _trigrams(key)
+            shared: Dict[int, int] = {}
+            for g in grams:
+                for idx in self.index.get(g, ()):
+                    shared[idx] = shared.get(idx, 0) + 1
+            # Dice coefficient on trigrams ranks candidates; edit distance decides
+            ranked = sorted(shared, key=lambda i: -2.0 * shared[i] / (len(grams) + self.gram_counts[i]))[:5]
+            best: Dict[str, Tuple[str, float]] = {}
+            for i in ranked:
+                cand, kind, name = self.keys[i]
+                longest = max(len(cand), len(key))
+                limit = int(longest * (1.0 - self.min_confidence))
+                dist = _levenshtein(key, cand, limit)
+                if dist <= limit:
+                    conf = round(1.0 - dist / longest, 3)
+                    if conf > best.get(kind, ("", 0.0))[1]:
+                        best[kind] = (name, conf)
+            found = [(kind, name, conf, "fuzzy") for kind, (name, conf) in best.items()]
+        if len(self._memo) > 10000:
+            self._memo.clear()
+        self._memo[memo_key] = found
+        return found
+
+    def resolve(self, text: str, exact_tokens: Optional[Set[str]] = None) -> List[EntityMatch]:
+        """Non-overlapping matches in `text`, best confidence and longest span first.
+
+        Tokens in `exact_tokens` belong to names the exact matcher already
+        found; spans containing them are only checked against aliases.
+        """
+        tokens = normalize(text)
+        covered = exact_tokens or set()
+        candidates: List[Tuple[float, int, int, int, Tuple[str, str, float, str]]] = []
+        for i in range(len(tokens)):
+            if tokens[i] in self.skip_words or tokens[i].isdigit():
+                continue
+            for j in range(i + 1, min(i + _MAX_SPAN, len(tokens)) + 1):
+                span = tokens[i:j]
+                if span[-1] in self.skip_words or any(t.isdigit() for t in span):
+                    continue
+                allow_fuzzy = not any(t in covered for t in span)
+                for found in self._lookup("".join(span), allow_fuzzy):
+                    candidates.append((found[2], j - i, i, j, found))
+        candidates.sort(key=lambda c: (-c[0], -c[1], c[2]))
+        used: Dict[str, Set[int]] = {}
+        out: List[EntityMatch] = []
+        for conf, _, i, j, (kind, name, _, method) in candidates:
+            taken = used.setdefault(kind, set())
+            if taken.intersection(range(i, j)):
+                continue
+            taken.update(range(i, j))
+            out.append(EntityMatch(" ".join(tokens[i:j]), kind, name, conf, method))
+        return out
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import dataset_registry
+
+# Registry entry whose path this module reads
+DATASET = "crop_climate_fact"
+
+# IMD convention: a year is deficient below 80% and excess above 120% of the
+# long-period average. Here the average is the state's mean over the table.
+LOW_RAIN_RATIO = 0.8
+HIGH_RAIN_RATIO = 1.2
+
+METRIC_FIELDS = ("Area_ha", "Production_tonnes", "Yield_t_per_ha")
+
+
+@dataclass
+class FactTable:
+    """Column-wise fact table with a State -> row ids index."""
+    state: List[str] = field(default_factory=list)
+    crop: List[str] = field(default_factory=list)
+    year: List[int] = field(default_factory=list)
+    year_label: List[str] = field(default_factory=list)
+    # Subdivision rainfall covers every crop year; state rainfall only 2009+
+    rainfall: List[Optional[float]] = field(default_factory=list)
+    metrics: Dict[str, List[float]] = field(default_factory=lambda: {m: [] for m in METRIC_FIELDS})
+    by_state: Dict[str, List[int]] = field(default_factory=dict)
+
+
+_cache_key: Optional[Tuple[Path, float]] = None
+_cache: Optional[FactTable] = None
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def fact_path() -> Path:
+    """Materialized fact table, as declared in the dataset manifest."""
+    return dataset_registry.registry()[DATASET].path
+
+
+def load_fact_table(path: Optional[Path] = None) -> FactTable:
+    path = path or fact_path()
+    t = FactTable()
+    if not path.exists():
+        return t
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for row in csv.DictReader(f):
+            y = _num(row.get("Year_start"))
+            if y is None:
+                continue
+            i = len(t.year)
+            t.state.append(row.get("State", ""))
+            t.crop.append(row.get("Crop", ""))
+            t.year.append(int(y))
+            t.year_label.append(row.get("Year", ""))
+            rain = _num(row.get("Subdivision_Rainfall_mm"))
+            t.rainfall.append(rain if rain is not None else _num(row.get("State_Rainfall_mm")))
+            for m in METRIC_FIELDS:
+                t.metrics[m].append(_num(row.get(m)) or 0.0)
+            t.by_state.setdefault(t.state[i], []).append(i)
+    return t
+
+
+def fact_table() -> FactTable:
+    """Cached fact table, reloaded when the materialized file changes."""
+    global _cache_key, _cache
+    path = fact_path()
+    try:
+        key = (path, path.stat().st_mtime)
+    except OSError:
+        key = (path, 0.0)
+    if _cache is None or key != _cache_key:
+        _cache = load_fact_table(path)
+        _cache_key = key
+    return _cache
+
+
+def rainfall_condition_rows(
+    table: FactTable,
+    condition: str,
+    metric_field: str,
+    group_field: str,
+    states: List[str],
+    crops: List[str],
+    year_ok: Callable[[int], bool],
+) -> List[Dict[str, Any]]:
+    """Average `metric_field` in low/high rainfall years vs. the remaining years.
+
+    Deficient/excess years are classified per state against that state's mean
+    annual rainfall, then rows are grouped by State or Crop.
+    """
+    crop_set = set(crops)
+    groups: Dict[str, Tuple[List[float], List[float], set]] = {}
+    for st in (states or list(table.by_state)):
+        idx = [i for i in table.by_state.get(st, []) if year_ok(table.year[i]) and (not crop_set or table.crop[i] in crop_set)]
+        yearly: Dict[int, float] = {}
+        for i in idx:
+            if table.rainfall[i] is not None:
+                yearly[table.year[i]] = table.rainfall[i]  # type: ignore[assignment]
+        if not yearly:
+            continue
+        mean = sum(yearly.values()) / len(yearly)
+        if condition == "low":
+            flagged = {y for y, r in yearly.items() if r < LOW_RAIN_RATIO * mean}
+        else:
+            flagged = {y for y, r in yearly.items() if r > HIGH_RAIN_RATIO * mean}
+        for i in idx:
+            if table.year[i] not in yearly:
+                continue
+            key = st if group_field == "State" else table.crop[i]
+            inside, outside, years = groups.setdefault(key, ([], [], set()))
+            if table.year[i] in flagged:
+                inside.append(table.metrics[metric_field][i])
+                years.add(table.year[i])
+            else:
+                outside.append(table.metrics[metric_field][i])
+    rows: List[Dict[str, Any]] = []
+    for key, (inside, outside, years) in groups.items():
+        if not inside:
+            continue
+        val = sum(inside) / len(inside)
+        base = sum(outside) / len(outside) if outside else None
+        rows.append({
+            group_field: key,
+            "Metric": metric_field,
+            "Condition": f"{condition}_rainfall",
+            "Value": val,
+            "Baseline": base,
+            "Change_pct": round((val - base) / base * 100.0, 2) if base else None,
+            "Years": sorted(years),
+        })
+    rows.sort(key=lambda r: r["Value"], reverse=True)
+    return rows
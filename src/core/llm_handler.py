@@ -2,11 +2,23 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 from ..utils.config import settings
+from ..utils.metrics import timed
 
-try:
-    from huggingface_hub import InferenceClient  # type: ignore
-except Exception:  # pragma: no cover - optional dep issues shouldn't break local fallback
-    InferenceClient = None  # type: ignore
+_UNRESOLVED = object()
+# huggingface_hub costs ~150 ms to import, so it is only loaded by the first
+# answer that can use it (HF_API_TOKEN set); None once known to be unavailable
+_inference_client: Any = _UNRESOLVED
+
+
+def _inference_client_class() -> Any:
+    global _inference_client
+    if _inference_client is _UNRESOLVED:
+        try:
+            from huggingface_hub import InferenceClient  # type: ignore
+        except Exception:  # pragma: no cover - optional dep issues shouldn't break local fallback
+            InferenceClient = None  # type: ignore
+        _inference_client = InferenceClient
+    return _inference_client
 
 
 @dataclass
@@ -15,7 +27,17 @@ class LLMAnswer:
     source: str  # "huggingface" | "fallback"
 
 
-def _build_prompt(parsed: dict, rows: list[dict], citations: list[dict]) -> str:
+def _trend_line(analytics: list[dict]) -> str:
+    # One clause per group, strongest slope first, e.g. "Kerala: +3.1/yr"
+    bits = []
+    for a in sorted(analytics, key=lambda a: -abs(a.get("Slope_per_year") or 0.0))[:3]:
+        name = " / ".join(str(a[k]) for k in ("State", "Subdivision", "Crop") if k in a) or "all"
+        if a.get("Slope_per_year") is not None:
+            bits.append(f"{name}: {a['Slope_per_year']:+g}/yr over {a['From']}-{a['To']} (mean {a['Mean']:g})")
+    return "; ".join(bits)
+
+
+def _build_prompt(parsed: dict, rows: list[dict], citations: list[dict], analytics: list[dict] | None = None) -> str:
     # Keep it short and deterministic; use a few top rows only
     sample_rows = rows[:5]
     ds_names = ", ".join(sorted({c.get("dataset", "?") for c in citations})) or "(none)"
@@ -30,13 +52,14 @@ def _build_prompt(parsed: dict, rows: list[dict], citations: list[dict]) -> str:
         "- Do NOT invent or add external sources.",
         "\nParsed:", str(parsed),
         "\nRows (sample):", str(sample_rows),
+        "\nTrend fit per group:", str((analytics or [])[:5]),
         "\nCitations:", str(citations),
         "\nNow produce the answer followed by the Citations line.",
     ]
     return "\n".join(prompt)
 
 
-def _fallback_answer(parsed: dict, rows: list[dict], citations: list[dict]) -> LLMAnswer:
+def _fallback_answer(parsed: dict, rows: list[dict], citations: list[dict], analytics: list[dict] | None = None) -> LLMAnswer:
     # Simple deterministic summary without external calls
     intent = parsed.get("intent", "unknown")
     states = parsed.get("states") or []
@@ -56,28 +79,32 @@ def _fallback_answer(parsed: dict, rows: list[dict], citations: list[dict]) -> L
         scope_bits.append(f"range: {yrng[0]}-{yrng[1]}")
     scope = "; ".join(scope_bits) or "no specific filters"
     n = len(rows)
+    trend = _trend_line(analytics or [])
     msg = (
         f"Parsed intent: {intent}. Using {n} matching rows ({datasets}); scope: {scope}. "
-        "Refer to the returned rows for details; you can refine filters for a tighter view.\n"
+        + (f"Linear trend: {trend}. " if trend else "")
+        + "Refer to the returned rows for details; you can refine filters for a tighter view.\n"
         f"Citations: {datasets or '(none)'}"
     )
     return LLMAnswer(answer=msg, source="fallback")
 
 
-def answer(parsed: dict, rows: list[dict], citations: list[dict]) -> LLMAnswer:
+@timed("llm")
+def answer(parsed: dict, rows: list[dict], citations: list[dict], analytics: list[dict] | None = None) -> LLMAnswer:
     token = settings.hf_api_token.strip()
-    if not token or InferenceClient is None:
-        return _fallback_answer(parsed, rows, citations)
+    client_class = _inference_client_class() if token else None
+    if client_class is None:
+        return _fallback_answer(parsed, rows, citations, analytics)
 
     try:
-        client = InferenceClient(token=token)
+        client = client_class(token=token)
         # A small, widely available instruction-tuned model is preferred. Keep it generic to avoid tight coupling.
         model = "HuggingFaceH4/zephyr-7b-beta"
-        prompt = _build_prompt(parsed, rows, citations)
+        prompt = _build_prompt(parsed, rows, citations, analytics)
         # Keep max tokens small for free-tier friendliness
         resp = client.text_generation(model=model, prompt=prompt, max_new_tokens=128, temperature=0.3)
         text = resp if isinstance(resp, str) else str(resp)
         return LLMAnswer(answer=text.strip(), source="huggingface")
     except Exception:
         # Fall back gracefully on any network or API error
-        return _fallback_answer(parsed, rows, citations)
+        return _fallback_answer(parsed, rows, citations, analytics)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+from .query_parser import ParsedQuery
+from ..utils.config import settings
+
+# MongoDB-side counterpart of the CSV scans in data_router. Collections are
+# produced by src/data_ingestion/load_mongo.py and carry the same column names
+# as the processed CSVs (plus `Year_start` for agriculture year labels).
+
+_AGG_OPS = {"avg": "$avg", "min": "$min", "max": "$max", "sum": "$sum"}
+
+
+def dataset_backends() -> Dict[str, str]:
+    """Parse `settings.dataset_backends` into {dataset: backend}."""
+    out: Dict[str, str] = {}
+    for part in settings.dataset_backends.split(","):
+        if "=" not in part:
+            continue
+        name, backend = part.split("=", 1)
+        name, backend = name.strip(), backend.strip().lower()
+        if name and backend in ("csv", "mongo"):
+            out[name] = backend
+    return out
+
+
+def backend_for(dataset: str) -> str:
+    backends = dataset_backends()
+    return backends.get(dataset, backends.get("*", "csv"))
+
+
+def _year_filter(years: List[int], year_range: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+    cond: Dict[str, Any] = {}
+    if years:
+        cond["$in"] = list(years)
+    if year_range:
+        cond["$gte"] = year_range[0]
+        cond["$lte"] = year_range[1]
+    return cond
+
+
+def _accumulator(agg: str, value_field: str, percentile: Optional[float]) -> Dict[str, Any]:
+    # $median / $percentile need MongoDB 7.0+; "approximate" is their t-digest mode
+    if agg in ("median", "percentile"):
+        p = (percentile if percentile is not None else 50.0) / 100.0
+        return {"$percentile": {"input": f"${value_field}", "p": [p], "method": "approximate"}}
+    return {_AGG_OPS.get(agg, "$sum"): f"${value_field}"}
+
+
+def _group_stages(key_field: str, value_field: str, agg: str, top_k: Optional[int], extra: Optional[Dict[str, Any]] = None, percentile: Optional[float] = None) -> List[Dict[str, Any]]:
+    project: Dict[str, Any] = {"_id": 0, key_field: "$_id"}
+    project.update(extra or {})
+    # $percentile yields a one-element array
+    project["Value"] = {"$first": "$Value"} if agg in ("median", "percentile") else 1
+    stages: List[Dict[str, Any]] = [
+        {"$group": {"_id": f"${key_field}", "Value": _accumulator(agg, value_field, percentile)}},
+        {"$project": project},
+        {"$sort": {"Value": -1, key_field: 1}},
+    ]
+    if top_k:
+        stages.append({"$limit": int(top_k)})
+    return stages
+
+
+def rainfall_pipeline(pq: ParsedQuery, years: List[int], year_range: Optional[Tuple[int, int]], group_by: Optional[str]) -> List[Dict[str, Any]]:
+    """Aggregation pipeline over `rainfall_state_year` mirroring the CSV router."""
+    match: Dict[str, Any] = {}
+    if pq.states:
+        match["State"] = {"$in": list(pq.states)}
+    ycond = _year_filter(years, year_range)
+    if ycond:
+        match["Year"] = ycond
+    pipeline: List[Dict[str, Any]] = [{"$match": match}] if match else []
+
+    if pq.intent == "trend" or group_by != "state":
+        pipeline.append({"$project": {"_id": 0, "State": 1, "Year": 1, "Annual_Rainfall_mm": 1}})
+        pipeline.append({"$sort": {"State": 1, "Year": 1}})
+        return pipeline
+    pipeline.extend(_group_stages("State", "Annual_Rainfall_mm", pq.aggregation or "sum", pq.top_k, percentile=pq.percentile))
+    return pipeline
+
+
+def crop_pipeline(pq: ParsedQuery, years: List[int], year_range: Optional[Tuple[int, int]], group_by: Optional[str], metric_field: str) -> List[Dict[str, Any]]:
+    """Aggregation pipeline over `crop_apy_state_year` mirroring the CSV router."""
+    match: Dict[str, Any] = {}
+    if pq.states:
+        match["State"] = {"$in": list(pq.states)}
+    if pq.crops:
+        match["Crop"] = {"$in": list(pq.crops)}
+    ycond = _year_filter(years, year_range)
+    if ycond:
+        match["Year_start"] = ycond
+    pipeline: List[Dict[str, Any]] = [{"$match": match}] if match else []
+
+    key_field = "State" if group_by == "state" else ("Crop" if group_by == "crop" else None)
+    if pq.intent == "trend" or group_by == "year" or not key_field:
+        pipeline.append({"$project": {"_id": 0, "State": 1, "Year": 1, "Crop": 1, metric_field: 1}})
+        pipeline.append({"$sort": {"State": 1, "Crop": 1, "Year": 1}})
+        return pipeline
+    agg = pq.aggregation
+    if agg is None:
+        # default to average for yield if not specified
+        agg = "avg" if metric_field == "Yield_t_per_ha" else "sum"
+    pipeline.extend(_group_stages(key_field, metric_field, agg, pq.top_k, extra={"Metric": metric_field}, percentile=pq.percentile))
+    return pipeline
+
+
+def distinct_years(collection, field: str) -> List[int]:
+    out: List[int] = []
+    for y in collection.distinct(field):
+        try:
+            out.append(int(y))
+        except Exception:
+            continue
+    return out
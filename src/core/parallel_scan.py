@@ -0,0 +1,158 @@
+from __future__ import annotations
+import os
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from . import crop_table, sketches
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import ProcessPoolExecutor
+
+# Filter + partial aggregation of crop APY partitions on worker processes.
+# Each partition is pinned to one worker ("lane") by a hash of its path;
+# workers open their partition files themselves (the OS page cache is
+# shared between processes) and keep them parsed in their own table cache,
+# so every partition is held by exactly one process. Only the query spec
+# goes out and only per-group partials come back. Partials are mergeable:
+# sums/counts/min/max, or the sketch summaries.
+
+
+@dataclass(frozen=True)
+class ScanSpec:
+    states: Tuple[str, ...]
+    crops: Tuple[str, ...]
+    years: Tuple[int, ...]
+    year_range: Optional[Tuple[int, int]]
+    metric_field: str
+    key_field: Optional[str]  # State | Crop | None (one overall group)
+    mode: str = "basic"  # basic | quantile | distinct
+    distinct_of: Optional[str] = None
+    exact_limit: int = 5000
+
+
+# basic partials: [sum, count, min, max]
+Partials = Dict[Any, Any]
+
+
+def scan_table(table: crop_table.CropTable, spec: ScanSpec) -> Partials:
+    """Per-group partial aggregates of the rows of `table` matching `spec`."""
+    values = table.metrics[spec.metric_field]
+    keys = {"State": table.state, "Crop": table.crop, "Year": table.year_label}
+    key_col = keys.get(spec.key_field or "")
+    out: Partials = {}
+    for i in table.select(spec.states, spec.crops, spec.years, spec.year_range):
+        key = key_col[i] if key_col is not None else "All"
+        v = values[i]
+        if spec.mode == "basic":
+            acc = out.get(key)
+            if acc is None:
+                out[key] = [v, 1, v, v]
+            else:
+                acc[0] += v
+                acc[1] += 1
+                if v < acc[2]:
+                    acc[2] = v
+                if v > acc[3]:
+                    acc[3] = v
+            continue
+        acc = out.get(key)
+        if spec.mode == "distinct":
+            if acc is None:
+                acc = out[key] = sketches.DistinctCounter(spec.exact_limit)
+            acc.add(keys[spec.distinct_of or "Crop"][i])
+        else:
+            if acc is None:
+                acc = out[key] = sketches.QuantileSummary(spec.exact_limit)
+            acc.add(v)
+    return out
+
+
+def _scan_paths(paths: List[Path], spec: ScanSpec) -> Partials:
+    return merge([scan_table(crop_table.partition_table(p), spec) for p in paths], spec)
+
+
+def merge(parts: List[Partials], spec: ScanSpec) -> Partials:
+    out: Partials = {}
+    for part in parts:
+        for key, acc in part.items():
+            cur = out.get(key)
+            if cur is None:
+                out[key] = acc
+            elif spec.mode == "basic":
+                cur[0] += acc[0]
+                cur[1] += acc[1]
+                cur[2] = min(cur[2], acc[2])
+                cur[3] = max(cur[3], acc[3])
+            else:
+                cur.merge(acc)
+    return out
+
+
+# One single-process executor per lane, so a partition always lands on the
+# worker that already has it parsed
+_lanes: List[ProcessPoolExecutor] = []
+_lanes_lock = threading.Lock()
+
+
+def workers(configured: int) -> int:
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def _get_lanes(n: int) -> List[ProcessPoolExecutor]:
+    with _lanes_lock:
+        if len(_lanes) != n:
+            _shutdown_lanes()
+            # multiprocessing is only imported once a scan is big enough to fan out
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a threaded server process can copy held locks
+            ctx = multiprocessing.get_context("spawn")
+            _lanes.extend(ProcessPoolExecutor(max_workers=1, mp_context=ctx) for _ in range(n))
+        return list(_lanes)
+
+
+def _shutdown_lanes() -> None:
+    for lane in _lanes:
+        # cancel_futures needs 3.9; the Docker image runs 3.8
+        lane.shutdown(wait=False)
+    _lanes.clear()
+
+
+def shutdown() -> None:
+    with _lanes_lock:
+        _shutdown_lanes()
+
+
+def lane_of(path: Path, n: int) -> int:
+    return zlib.crc32(path.name.encode("utf-8")) % n
+
+
+def run(spec: ScanSpec, n_workers: int, min_rows: int) -> Tuple[Partials, str]:
+    """Scan the partitions `spec` can touch; returns (merged partials, "serial" | "parallel").
+
+    The row estimate comes from the partition manifest. Small scans, a
+    single partition or a single worker stay in-process; a worker failure
+    falls back to the serial path.
+    """
+    parts = crop_table.prune(spec.states, spec.crops, spec.years, spec.year_range)
+    if parts is None:
+        return scan_table(crop_table.crop_table(), spec), "serial"
+    n = workers(n_workers)
+    estimated = sum(p.rows for p in parts)
+    if n > 1 and len(parts) > 1 and estimated >= min_rows:
+        from concurrent.futures.process import BrokenProcessPool
+
+        by_lane: Dict[int, List[Path]] = {}
+        for p in parts:
+            by_lane.setdefault(lane_of(p.path, n), []).append(p.path)
+        try:
+            lanes = _get_lanes(n)
+            futures = [lanes[i].submit(_scan_paths, paths, spec) for i, paths in by_lane.items()]
+            return merge([f.result() for f in futures], spec), "parallel"
+        except (BrokenProcessPool, OSError):
+            shutdown()  # fresh workers are started on the next parallel scan
+    return _scan_paths([p.path for p in parts], spec), "serial"
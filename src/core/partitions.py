@@ -0,0 +1,183 @@
+from __future__ import annotations
+import csv
+import json
+import re
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Partitioned dataset layout: one directory per dataset holding small CSVs
+# (one per partition key) plus `_manifest.json`, which records every
+# partition's key values, row count and per-column min/max. Readers prune
+# partitions from the manifest alone and open only the files that can match.
+
+MANIFEST_NAME = "_manifest.json"
+
+_SLUG_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def slug(value: Any) -> str:
+    """File-name-safe form of a partition value ("Jammu & Kashmir" -> "Jammu_Kashmir")."""
+    return _SLUG_RE.sub("_", str(value)).strip("_") or "_"
+
+
+@dataclass
+class Partition:
+    path: Path
+    keys: Dict[str, Any]
+    rows: int
+    stats: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)  # column -> (min, max)
+
+    def may_match(self, equals: Dict[str, Collection[Any]], ranges: Dict[str, Sequence[Tuple[Any, Any]]]) -> bool:
+        """False only when the key values or min/max statistics rule every row out."""
+        for col, wanted in equals.items():
+            if not wanted:
+                continue
+            if col in self.keys:
+                if self.keys[col] not in wanted:
+                    return False
+            elif col in self.stats:
+                lo, hi = self.stats[col]
+                if not any(lo <= v <= hi for v in wanted):
+                    return False
+        for col, intervals in ranges.items():
+            if not intervals or col not in self.stats:
+                continue
+            lo, hi = self.stats[col]
+            if not any(a <= hi and b >= lo for a, b in intervals):
+                return False
+        return True
+
+
+@dataclass
+class Manifest:
+    dataset: str
+    partition_by: List[str]
+    partitions: List[Partition]
+
+    @property
+    def rows(self) -> int:
+        return sum(p.rows for p in self.partitions)
+
+    def key_values(self, col: str) -> List[Any]:
+        return sorted({p.keys[col] for p in self.partitions if col in p.keys})
+
+    def bounds(self, col: str) -> Optional[Tuple[Any, Any]]:
+        """Overall (min, max) of `col` from the partition statistics."""
+        stats = [p.stats[col] for p in self.partitions if col in p.stats]
+        if not stats:
+            return None
+        return min(s[0] for s in stats), max(s[1] for s in stats)
+
+    def prune(
+        self,
+        equals: Optional[Dict[str, Collection[Any]]] = None,
+        ranges: Optional[Dict[str, Sequence[Tuple[Any, Any]]]] = None,
+    ) -> List[Partition]:
+        """Partitions that may hold rows with `col in equals[col]` and `col` inside one of `ranges[col]`."""
+        return [p for p in self.partitions if p.may_match(equals or {}, ranges or {})]
+
+
+def _number(x: str) -> Any:
+    try:
+        v = float(x)
+    except ValueError:
+        return x
+    return int(v) if v.is_integer() and "." not in x else v
+
+
+def write_partitioned(
+    out_dir: Path,
+    dataset: str,
+    header: List[str],
+    rows: Iterable[List[Any]],
+    partition_by: List[str],
+    file_for: Callable[[Dict[str, Any]], str],
+    stats_fields: List[str],
+) -> Manifest:
+    """Write `rows` split by the `partition_by` columns, then the manifest.
+
+    `file_for` maps a partition's key values to a path relative to `out_dir`.
+    The layout is built in a sibling staging directory and swapped in, so a
+    reader never sees a mix of old and new partitions.
+    """
+    key_idx = [header.index(c) for c in partition_by]
+    stat_idx = {c: header.index(c) for c in stats_fields}
+    groups: Dict[Tuple[Any, ...], List[List[Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row[i] for i in key_idx), []).append(row)
+
+    staging = out_dir.with_name(out_dir.name + ".tmp")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    parts: List[Partition] = []
+    for key in sorted(groups):
+        part_rows = groups[key]
+        keys = dict(zip(partition_by, key))
+        rel = file_for(keys)
+        target = staging / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f, lineterminator="\n")
+            w.writerow(header)
+            w.writerows(part_rows)
+        stats: Dict[str, Tuple[Any, Any]] = {}
+        for col, i in stat_idx.items():
+            vals = [_number(str(r[i])) for r in part_rows if str(r[i]) != ""]
+            if vals:
+                try:
+                    stats[col] = (min(vals), max(vals))
+                except TypeError:  # mixed numbers and text
+                    continue
+        parts.append(Partition(Path(rel), keys, len(part_rows), stats))
+
+    manifest = Manifest(dataset, list(partition_by), parts)
+    doc = {
+        "dataset": dataset,
+        "partition_by": partition_by,
+        "columns": header,
+        "rows": manifest.rows,
+        "partitions": [
+            {"path": p.path.as_posix(), "keys": p.keys, "rows": p.rows, "stats": {c: list(v) for c, v in p.stats.items()}}
+            for p in parts
+        ],
+    }
+    with open(staging / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+        f.write("\n")
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    staging.replace(out_dir)
+    for p in parts:
+        p.path = out_dir / p.path
+    return manifest
+
+
+def read_manifest(part_dir: Path) -> Optional[Manifest]:
+    path = part_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    parts = [
+        Partition(part_dir / p["path"], dict(p.get("keys", {})), int(p.get("rows", 0)), {c: (v[0], v[1]) for c, v in p.get("stats", {}).items()})
+        for p in doc.get("partitions", [])
+    ]
+    return Manifest(doc.get("dataset", part_dir.name), list(doc.get("partition_by", [])), parts)
+
+
+_manifests: Dict[Path, Tuple[float, Optional[Manifest]]] = {}
+
+
+def manifest(part_dir: Path) -> Optional[Manifest]:
+    """Cached manifest of a partitioned dataset (None when the layout is absent)."""
+    try:
+        key = (part_dir / MANIFEST_NAME).stat().st_mtime
+    except OSError:
+        key = 0.0
+    cached = _manifests.get(part_dir)
+    if cached is None or cached[0] != key:
+        cached = _manifests[part_dir] = (key, read_manifest(part_dir))
+    return cached[1]
@@ -3,11 +3,15 @@ import re
 from dataclasses import dataclass, field
 from pathlib import Path
 import csv
-from typing import List, Optional, Set, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils.config import settings
+from ..utils.metrics import timed
+from . import dataset_registry
+from .entity_resolver import EntityResolver, normalize
 
 ROOT = Path(__file__).resolve().parents[2]
-AG_PROC = ROOT / "data" / "processed" / "agriculture"
-CL_PROC = ROOT / "data" / "processed" / "climate"
+ALIASES_PATH = ROOT / "data" / "reference" / "entity_aliases.csv"
 
 
 @dataclass
@@ -20,12 +24,22 @@ class ParsedQuery:
     year_range: Optional[Tuple[int, int]] = None  # (start, end)
     metrics: List[str] = field(default_factory=list)  # rainfall | area | production | yield
     # Extended NLP fields
-    aggregation: Optional[str] = None  # avg|sum|min|max
+    aggregation: Optional[str] = None  # avg|sum|min|max|median|percentile|distinct
     top_k: Optional[int] = None  # e.g., top 5
     group_by: Optional[str] = None  # state|crop|year
     domain: Optional[str] = None  # climate|agriculture
     last_n_years: Optional[int] = None  # "last 5 years"
     since_year: Optional[int] = None  # "since 2005"
+    rainfall_condition: Optional[str] = None  # low|high ("in low-rainfall years")
+    season: Optional[str] = None  # jf|mam|jjas|ond (IMD seasons)
+    months: List[int] = field(default_factory=list)  # 1-12, e.g. "July rainfall"
+    subdivisions: List[str] = field(default_factory=list)  # IMD meteorological subdivisions
+    window: Optional[int] = None  # moving-average window in years ("5-year moving average")
+    percentile: Optional[float] = None  # 0-100, set for median/percentile aggregations
+    distinct_of: Optional[str] = None  # State|Crop|Year, set for distinct-count aggregations
+    # Entities found only through an alias or fuzzy match: text, kind, value, confidence, method
+    entity_matches: List[Dict[str, Any]] = field(default_factory=list)
+
 
 
 def _read_unique_values(path: Path, col: str) -> Set[str]:
@@ -41,152 +55,270 @@ def _read_unique_values(path: Path, col: str) -> Set[str]:
     return vals
 
 
+def _source_path(dataset: str) -> Path:
+    # Entity names come from whatever files the dataset manifest declares
+    return dataset_registry.registry()[dataset].path
+
+
 def _known_states() -> Set[str]:
-    return _read_unique_values(CL_PROC / "rainfall_state_year.csv", "State")
+    return _read_unique_values(_source_path("rainfall_state_year"), "State")
 
 
 def _known_crops() -> Set[str]:
-    return _read_unique_values(AG_PROC / "crop_apy_state_year.csv", "Crop")
+    return _read_unique_values(_source_path("crop_apy_state_year"), "Crop")
 
 
-def _detect_intent(text: str) -> str:
-    t = text.lower()
-    if any(w in t for w in ["trend", "over time", "year by year"]):
-        return "trend"
-    if any(w in t for w in ["compare", "comparison", "vs", "versus", "between"]):
-        return "comparison"
-    if any(w in t for w in ["correlat", "relationship"]):
-        return "correlation"
-    if any(w in t for w in ["top", "rank", "highest", "lowest"]):
-        return "ranking"
-    return "unknown"
-
-
-def _detect_metrics(text: str) -> List[str]:
-    t = text.lower()
-    metrics: List[str] = []
-    if "rain" in t:
-        metrics.append("rainfall")
-    if any(w in t for w in ["yield", "productivity"]):
-        metrics.append("yield")
-    if any(w in t for w in ["area", "sown"]):
-        metrics.append("area")
-    if any(w in t for w in ["production", "output", "tonne"]):
-        metrics.append("production")
-    return metrics
-
-
-def _detect_years(text: str) -> Tuple[List[int], Optional[Tuple[int, int]]]:
-    # Find 4-digit years
-    years = [int(y) for y in re.findall(r"\b(19\d{2}|20\d{2})\b", text)]
-    # Detect ranges like 2009-2012 or 2009 to 2012
-    m = re.search(r"(19\d{2}|20\d{2})\s*[-to]+\s*(19\d{2}|20\d{2})", text)
-    year_range = None
-    if m:
-        a, b = int(m.group(1)), int(m.group(2))
-        if a <= b:
-            year_range = (a, b)
-        else:
-            year_range = (b, a)
-    return years, year_range
+def _known_subdivisions() -> Set[str]:
+    return _read_unique_values(_source_path("rainfall_subdivision_year"), "Subdivision")
+
 
+def _aliases() -> Iterator[Tuple[str, str, str]]:
+    if not ALIASES_PATH.exists():
+        return
+    with open(ALIASES_PATH, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            kind, alias, canonical = (row.get(c, "").strip() for c in ("Kind", "Alias", "Canonical"))
+            if kind and alias and canonical:
+                yield kind, alias, canonical
 
-def _detect_relative_years(text: str) -> Tuple[Optional[int], Optional[int]]:
-    """Detect phrases like 'last 5 years' and 'since 2005'.
 
-    Returns (last_n_years, since_year).
+class _PhraseMatcher:
+    """Finds every phrase that occurs as a substring of a lowercased text.
+
+    Phrases are compiled into lookahead alternations (longest first) so one
+    `finditer` pass reports matches at every offset, overlapping ones included.
+    A phrase that is a prefix of another can never win at the same offset, so
+    phrases are split into layers where no phrase prefixes another; usually
+    there is a single layer.
     """
-    t = text.lower()
-    last_n: Optional[int] = None
-    since_y: Optional[int] = None
-    m = re.search(r"last\s+(\d{1,2})\s+years", t)
-    if m:
-        try:
-            last_n = int(m.group(1))
-        except Exception:
-            last_n = None
-    m2 = re.search(r"since\s+(19\d{2}|20\d{2})", t)
-    if m2:
-        try:
-            since_y = int(m2.group(1))
-        except Exception:
-            since_y = None
-    return last_n, since_y
-
-
-def _detect_group_by(text: str, intent: str) -> Optional[str]:
-    t = text.lower()
-    if any(p in t for p in ["across states", "by state", "state-wise", "statewise"]):
-        return "state"
-    if any(p in t for p in ["across crops", "by crop", "crop-wise", "cropwise"]):
-        return "crop"
-    if intent == "trend":
-        return "year"
-    return None
 
+    def __init__(self, phrases: Dict[str, Tuple[str, ...]]):
+        # phrase (lowercase) -> tags it contributes
+        self.tags = phrases
+        layers: List[List[str]] = []
+        for p in sorted(phrases, key=lambda x: (-len(x), x)):
+            for layer in layers:
+                if not any(q.startswith(p) for q in layer):
+                    layer.append(p)
+                    break
+            else:
+                layers.append([p])
+        self.patterns = [re.compile("(?=(" + "|".join(re.escape(p) for p in layer) + "))") for layer in layers]
 
-def _detect_aggregation(text: str) -> Optional[str]:
-    t = text.lower()
-    if any(w in t for w in ["average", "avg", "mean"]):
-        return "avg"
-    if any(w in t for w in ["total", "sum", "overall"]):
-        return "sum"
-    if any(w in t for w in ["minimum", "min", "lowest"]):
-        return "min"
-    if any(w in t for w in ["maximum", "max", "highest"]):
-        return "max"
-    return None
-
-
-def _detect_topk(text: str) -> Optional[int]:
+    def scan(self, text_lower: str) -> Set[str]:
+        found: Set[str] = set()
+        for pat in self.patterns:
+            for m in pat.finditer(text_lower):
+                found.update(self.tags[m.group(1)])
+        return found
+
+
+# keyword -> tags; one keyword may feed several classes (e.g. "highest" is a
+# ranking intent and a max aggregation)
+_KEYWORDS: Dict[str, Tuple[str, ...]] = {}
+
+
+def _kw(tag: str, *words: str) -> None:
+    for w in words:
+        _KEYWORDS[w] = _KEYWORDS.get(w, ()) + (tag,)
+
+
+_kw("intent:trend", "trend", "over time", "year by year", "moving average", "rolling average",
+    "year-over-year", "year on year", "anomal")
+_kw("intent:comparison", "compare", "comparison", "vs", "versus", "between")
+_kw("intent:correlation", "correlat", "relationship")
+_kw("intent:ranking", "top", "rank", "highest", "lowest")
+_kw("metric:rainfall", "rain")
+_kw("metric:yield", "yield", "productivity")
+_kw("metric:area", "area", "sown")
+_kw("metric:production", "production", "output", "tonne")
+_kw("agg:avg", "average", "avg", "mean")
+_kw("agg:sum", "total", "sum", "overall")
+_kw("agg:min", "minimum", "min", "lowest")
+_kw("agg:max", "maximum", "max", "highest")
+_kw("agg:median", "median")
+_kw("group:state", "across states", "by state", "state-wise", "statewise")
+_kw("group:crop", "across crops", "by crop", "crop-wise", "cropwise")
+_kw("which", "which state", "which crop")
+_kw("raincond:low", "low rainfall", "low-rainfall", "deficient rain", "drought", "dry year")
+_kw("raincond:high", "high rainfall", "high-rainfall", "excess rain", "wet year")
+_kw("season:jf", "winter rain", "winter season")
+_kw("season:mam", "pre-monsoon", "premonsoon", "pre monsoon")
+_kw("season:jjas", "jjas", "monsoon")
+_kw("season:ond", "post-monsoon", "postmonsoon", "post monsoon", "northeast monsoon", "north-east monsoon")
+
+_KEYWORD_MATCHER = _PhraseMatcher(_KEYWORDS)
+
+# First matching tag wins. Correlation outranks comparison because its usual
+# phrasing ("correlation between rainfall and yield") also contains "between".
+_INTENT_ORDER = ("trend", "correlation", "comparison", "ranking")
+_METRIC_ORDER = ("rainfall", "yield", "area", "production")
+# Quantiles outrank the others: "highest median yield" ranks by median
+_AGG_ORDER = ("median", "avg", "sum", "min", "max")
+# "monsoon" is a substring of the pre/post-monsoon phrases, so it goes last
+_SEASON_ORDER = ("mam", "ond", "jf", "jjas")
+
+_YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+# Ranges like 2009-2012 or 2009 to 2012
+_YEAR_RANGE_RE = re.compile(r"(19\d{2}|20\d{2})\s*[-to]+\s*(19\d{2}|20\d{2})")
+_LAST_N_RE = re.compile(r"last\s+(\d{1,2})\s+years")
+_SINCE_RE = re.compile(r"since\s+(19\d{2}|20\d{2})")
+_WINDOW_RE = re.compile(r"(\d{1,2})[- ]year (?:moving|rolling|running)")
+_PERCENTILE_RE = re.compile(r"\b(\d{1,2}(?:\.\d+)?)(?:st|nd|rd|th)?[- ]percentile|\bp(\d{2})\b")
+_DISTINCT_RE = re.compile(r"(?:how many|number of|count of|distinct|unique)\s+(?:different\s+)?(crop|state|year)s?\b")
+_TOPK_RE = re.compile(r"(?:top|highest|lowest)\s+(\d{1,3})")
+_MONTHS: Dict[str, int] = {}
+for _i, _name in enumerate(("january", "february", "march", "april", "may", "june", "july",
+                            "august", "september", "october", "november", "december"), start=1):
+    _MONTHS[_name] = _MONTHS[_name[:3]] = _i
+_MONTHS["sept"] = 9
+_MONTH_RE = re.compile(r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+# Words that never start or end a fuzzy entity span: query vocabulary that
+# would otherwise sit a few edits away from short names ("rain" ~ "Ragi")
+_FUZZY_SKIP = {
+    "the", "in", "of", "for", "to", "from", "and", "or", "vs", "with", "by", "over", "between", "since",
+    "last", "year", "years", "yearly", "annual", "show", "list", "which", "what", "how", "many", "much",
+    "is", "was", "were", "are", "state", "states", "crop", "crops", "top", "compare", "across", "grown",
+    "growing", "producing", "produce", "season", "seasonal", "during", "per", "each", "all", "give",
+    "me", "trend", "rainfall", "rain", "yield", "area", "production", "india", "district", "districts",
+}
+_FUZZY_SKIP.update(w for phrase in _KEYWORDS for w in normalize(phrase))
+_FUZZY_SKIP.update(_MONTHS)
+
+_Catalog = Tuple[
+    _PhraseMatcher, _PhraseMatcher, _PhraseMatcher, Dict[str, str], Dict[str, str], Dict[str, str], EntityResolver
+]
+_catalog_key: Optional[Tuple[Tuple[Path, float], ...]] = None
+_catalog: Optional[_Catalog] = None
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _entity_catalog() -> _Catalog:
+    """State/crop/subdivision matchers and the fuzzy resolver, rebuilt only when a source file changes."""
+    global _catalog_key, _catalog
+    names = ("rainfall_state_year", "crop_apy_state_year", "rainfall_subdivision_year")
+    paths = [_source_path(n) for n in names] + [ALIASES_PATH]
+    key = tuple((p, _mtime(p)) for p in paths)
+    if _catalog is None or key != _catalog_key:
+        states = {s.lower(): s for s in _known_states()}
+        crops = {c.lower(): c for c in _known_crops()}
+        subdivisions = {d.lower(): d for d in _known_subdivisions()}
+        _catalog = (
+            _PhraseMatcher({k: (k,) for k in states}),
+            _PhraseMatcher({k: (k,) for k in crops}),
+            _PhraseMatcher({k: (k,) for k in subdivisions}),
+            states,
+            crops,
+            subdivisions,
+            EntityResolver(
+                {"state": states.values(), "subdivision": subdivisions.values(), "crop": crops.values()},
+                _aliases(),
+                _FUZZY_SKIP,
+                settings.fuzzy_min_confidence,
+            ),
+        )
+        _catalog_key = key
+    return _catalog
+
+
+def _by_length(names: Set[str]) -> List[str]:
+    # Longest names first (e.g. "West Bengal" before "Bengal"), then alphabetical
+    return sorted(names, key=lambda n: (-len(n), n))
+
+
+@timed("parse")
+def parse_query(text: str) -> ParsedQuery:
+    # Lowercase once, then fill every field from a single keyword scan
     t = text.lower()
-    m = re.search(r"(?:top|highest|lowest)\s+(\d{1,3})", t)
+    tags = _KEYWORD_MATCHER.scan(t)
+
+    intent = next((i for i in _INTENT_ORDER if f"intent:{i}" in tags), "unknown")
+    metrics = [m for m in _METRIC_ORDER if f"metric:{m}" in tags]
+    aggregation = next((a for a in _AGG_ORDER if f"agg:{a}" in tags), None)
+    percentile: Optional[float] = 50.0 if aggregation == "median" else None
+    m = _PERCENTILE_RE.search(t)
     if m:
-        try:
-            return int(m.group(1))
-        except Exception:
-            return None
-    # 'which' questions often imply top 1
-    if t.startswith("which ") or "which state" in t or "which crop" in t:
-        return 1
-    return None
+        aggregation, percentile = "percentile", float(m.group(1) or m.group(2))
+    m = _DISTINCT_RE.search(t)
+    distinct_of = m.group(1).capitalize() if m else None
+    if distinct_of:
+        aggregation = "distinct"
+    if "group:state" in tags:
+        group_by: Optional[str] = "state"
+    elif "group:crop" in tags:
+        group_by = "crop"
+    else:
+        group_by = "year" if intent == "trend" else None
+    if "metric:rainfall" in tags:
+        domain: Optional[str] = "climate"
+    elif any(m in metrics for m in ("yield", "production", "area")):
+        domain = "agriculture"
+    elif distinct_of == "Crop":
+        domain = "agriculture"  # "how many crops ..." has no metric word
+    else:
+        domain = None
 
+    if "raincond:low" in tags:
+        rainfall_condition: Optional[str] = "low"
+    elif "raincond:high" in tags:
+        rainfall_condition = "high"
+    else:
+        rainfall_condition = None
 
-def _detect_domain(text: str, metrics: List[str]) -> Optional[str]:
-    t = text.lower()
-    if "rain" in t:
-        return "climate"
-    if any(m in (metrics or []) for m in ["yield", "production", "area"]):
-        return "agriculture"
-    # default unknown -> None
-    return None
-
-
-def _detect_entities_from_catalog(text: str) -> Tuple[List[str], List[str]]:
-    states_list = sorted(_known_states(), key=len, reverse=True)
-    crops_list = sorted(_known_crops(), key=len, reverse=True)
-    states: List[str] = []
-    crops: List[str] = []
-    tl = text.lower()
-    for s in states_list:
-        if s and s.lower() in tl:
-            states.append(s)
-    for c in crops_list:
-        if c and c.lower() in tl:
-            crops.append(c)
-    return states, crops
+    season = next((x for x in _SEASON_ORDER if f"season:{x}" in tags), None)
+    # "may" is usually a verb; only a capitalized "May" counts as the month
+    months = sorted({_MONTHS[w.lower()] for w in _MONTH_RE.findall(text) if w.lower() != "may" or w == "May"})
+    if (season or months) and not metrics:
+        # "monsoon in Kerala" is a rainfall question even without the word
+        metrics = ["rainfall"]
+        domain = "climate"
 
+    years = [int(y) for y in _YEAR_RE.findall(text)]
+    year_range: Optional[Tuple[int, int]] = None
+    m = _YEAR_RANGE_RE.search(text)
+    if m:
+        a, b = int(m.group(1)), int(m.group(2))
+        year_range = (a, b) if a <= b else (b, a)
+    m = _LAST_N_RE.search(t)
+    last_n_years = int(m.group(1)) if m else None
+    m = _SINCE_RE.search(t)
+    since_year = int(m.group(1)) if m else None
+    m = _WINDOW_RE.search(t)
+    window = int(m.group(1)) if m else None
+    m = _TOPK_RE.search(t)
+    if m:
+        top_k: Optional[int] = int(m.group(1))
+    elif t.startswith("which ") or "which" in tags:
+        # 'which' questions often imply top 1
+        top_k = 1
+    else:
+        top_k = None
+
+    state_matcher, crop_matcher, subdiv_matcher, state_names, crop_names, subdiv_names, resolver = _entity_catalog()
+    found: Dict[str, Set[str]] = {
+        "state": {state_names[k] for k in state_matcher.scan(t)},
+        "crop": {crop_names[k] for k in crop_matcher.scan(t)},
+        "subdivision": {subdiv_names[k] for k in subdiv_matcher.scan(t)},
+    }
+    # Misspellings and aliases the substring matchers missed; tokens of names
+    # already matched exactly are only checked against the alias table
+    exact_tokens = {w for names in found.values() for n in names for w in normalize(n)}
+    entity_matches = []
+    for match in resolver.resolve(text, exact_tokens):
+        if match.value not in found[match.kind]:
+            found[match.kind].add(match.value)
+            entity_matches.append(match.as_dict())
+    states = _by_length(found["state"])
+    crops = _by_length(found["crop"])
+    subdivisions = _by_length(found["subdivision"])
 
-def parse_query(text: str) -> ParsedQuery:
-    years, year_range = _detect_years(text)
-    last_n_years, since_year = _detect_relative_years(text)
-    intent = _detect_intent(text)
-    metrics = _detect_metrics(text)
-    states, crops = _detect_entities_from_catalog(text)
-    aggregation = _detect_aggregation(text)
-    top_k = _detect_topk(text)
-    group_by = _detect_group_by(text, intent)
-    domain = _detect_domain(text, metrics)
     return ParsedQuery(
         text=text,
         intent=intent,
@@ -201,4 +333,12 @@ def parse_query(text: str) -> ParsedQuery:
         domain=domain,
         last_n_years=last_n_years,
         since_year=since_year,
+        rainfall_condition=rainfall_condition,
+        season=season,
+        months=months,
+        subdivisions=subdivisions,
+        window=window,
+        percentile=percentile,
+        distinct_of=distinct_of,
+        entity_matches=entity_matches,
     )
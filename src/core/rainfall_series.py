@@ -0,0 +1,276 @@
+from __future__ import annotations
+import csv
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import dataset_registry, partitions
+
+ROOT = Path(__file__).resolve().parents[2]
+# Registry entry whose path/partition_dir this module reads
+DATASET = "rainfall_subdivision_long"
+MAPPING_PATH = ROOT / "data" / "reference" / "state_subdivision_map.csv"
+
+# IMD seasons as month numbers
+SEASONS: Dict[str, Tuple[int, ...]] = {
+    "jf": (1, 2),  # winter
+    "mam": (3, 4, 5),  # pre-monsoon
+    "jjas": (6, 7, 8, 9),  # southwest monsoon
+    "ond": (10, 11, 12),  # post-monsoon
+}
+MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+@dataclass
+class SubdivisionSeries:
+    """Monthly rainfall of one subdivision as a contiguous year x 12 array.
+
+    `values[(year - first_year) * 12 + month - 1]` holds the month's rainfall;
+    `observed` flags which slots the source actually had. Per month-set
+    prefix sums over years are built on first use and memoized, so any
+    seasonal total over a year range is two lookups.
+    """
+    first_year: int
+    n_years: int
+    values: array
+    observed: array
+    _prefix: Dict[Tuple[int, ...], Tuple[array, array]] = field(default_factory=dict, repr=False)
+
+    @property
+    def last_year(self) -> int:
+        return self.first_year + self.n_years - 1
+
+    def _year_prefix(self, months: Tuple[int, ...]) -> Tuple[array, array]:
+        # (cumulative totals, cumulative count of years with every month observed)
+        cached = self._prefix.get(months)
+        if cached is not None:
+            return cached
+        totals = array("d", [0.0]) * (self.n_years + 1)
+        counts = array("l", [0]) * (self.n_years + 1)
+        for k in range(self.n_years):
+            base = k * 12
+            complete = all(self.observed[base + m - 1] for m in months)
+            season_total = sum(self.values[base + m - 1] for m in months) if complete else 0.0
+            totals[k + 1] = totals[k] + season_total
+            counts[k + 1] = counts[k] + (1 if complete else 0)
+        self._prefix[months] = (totals, counts)
+        return totals, counts
+
+    def _clamp(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        lo = max(start, self.first_year) - self.first_year
+        hi = min(end, self.last_year) - self.first_year
+        return (lo, hi) if lo <= hi else None
+
+    def range_total(self, months: Tuple[int, ...], start: int, end: int) -> Tuple[float, int]:
+        """Sum of `months` rainfall over years start..end and the number of complete years, in O(1)."""
+        span = self._clamp(start, end)
+        if span is None:
+            return 0.0, 0
+        totals, counts = self._year_prefix(months)
+        lo, hi = span
+        return totals[hi + 1] - totals[lo], counts[hi + 1] - counts[lo]
+
+    def year_value(self, months: Tuple[int, ...], year: int) -> Optional[float]:
+        total, n = self.range_total(months, year, year)
+        return total if n else None
+
+
+_cache_key: Optional[Tuple[Path, float]] = None
+_cache: Optional[Dict[str, SubdivisionSeries]] = None
+_map_key: Optional[float] = None
+_map: Optional[Dict[str, List[str]]] = None
+# (subdivision, partition files) -> series built from just those files
+_part_cache: Dict[Tuple[str, Tuple[Path, ...]], SubdivisionSeries] = {}
+_part_manifest: Optional[partitions.Manifest] = None
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _load(paths: Iterable[Path]) -> Dict[str, SubdivisionSeries]:
+    raw: Dict[str, List[Tuple[int, int, float]]] = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for row in csv.DictReader(f):
+                try:
+                    y, m, v = int(row["Year"]), int(row["Month"]), float(row["Rainfall_mm"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if 1 <= m <= 12:
+                    raw.setdefault(row.get("Subdivision", ""), []).append((y, m, v))
+    out: Dict[str, SubdivisionSeries] = {}
+    for sub, obs in raw.items():
+        first = min(y for y, _, _ in obs)
+        n = max(y for y, _, _ in obs) - first + 1
+        values = array("d", [0.0]) * (n * 12)
+        observed = array("b", [0]) * (n * 12)
+        for y, m, v in obs:
+            i = (y - first) * 12 + m - 1
+            values[i] = v
+            observed[i] = 1
+        out[sub] = SubdivisionSeries(first, n, values, observed)
+    return out
+
+
+def _spec() -> dataset_registry.DatasetSpec:
+    return dataset_registry.registry()[DATASET]
+
+
+def long_path() -> Path:
+    """Flat monthly subdivision file, as declared in the dataset manifest."""
+    return _spec().path
+
+
+def load_series(path: Optional[Path] = None) -> Dict[str, SubdivisionSeries]:
+    return _load([path or long_path()])
+
+
+def series() -> Dict[str, SubdivisionSeries]:
+    """Cached per-subdivision series, reloaded when the long table changes."""
+    global _cache_key, _cache
+    path = long_path()
+    key = (path, _mtime(path))
+    if _cache is None or key != _cache_key:
+        _cache = load_series(path)
+        _cache_key = key
+    return _cache
+
+
+def subdivision_names() -> List[str]:
+    m = _spec().manifest()
+    return m.key_values("Subdivision") if m is not None else sorted(series())
+
+
+def available_years() -> List[int]:
+    """First and last year on record, from the partition manifest when there is one."""
+    m = _spec().manifest()
+    bounds = m.bounds("Year") if m is not None else None
+    if bounds:
+        return list(bounds)
+    return [y for s in series().values() for y in (s.first_year, s.last_year)]
+
+
+def series_for(subdivisions: List[str], years: List[int], year_range: Optional[Tuple[int, int]]) -> Dict[str, SubdivisionSeries]:
+    """Series of `subdivisions`, read only from the Subdivision/decade partitions the filters can touch.
+
+    Each result covers just the decades it was built from, which is enough
+    for the requested years. Without a partitioned layout this is `series()`.
+    """
+    global _part_manifest
+    m = _spec().manifest()
+    if m is None:
+        return series()
+    if m is not _part_manifest:
+        _part_cache.clear()
+        _part_manifest = m
+    intervals = [(y, y) for y in years] or ([year_range] if year_range else [])
+    out: Dict[str, SubdivisionSeries] = {}
+    for sub in subdivisions:
+        paths = tuple(p.path for p in m.prune({"Subdivision": {sub}}, {"Year": intervals}))
+        if not paths:
+            continue
+        cached = _part_cache.get((sub, paths))
+        if cached is None:
+            if len(_part_cache) > 1024:
+                _part_cache.clear()
+            cached = _load(paths).get(sub)
+            if cached is None:
+                continue
+            _part_cache[(sub, paths)] = cached
+        out[sub] = cached
+    return out
+
+
+def state_subdivisions() -> Dict[str, List[str]]:
+    """State -> IMD subdivisions from the reference mapping."""
+    global _map_key, _map
+    key = _mtime(MAPPING_PATH)
+    if _map is None or key != _map_key:
+        _map = {}
+        if MAPPING_PATH.exists():
+            with open(MAPPING_PATH, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    _map.setdefault(row["State"], []).append(row["Subdivision"])
+        _map_key = key
+    return _map
+
+
+def season_label(season: Optional[str], months: Tuple[int, ...]) -> str:
+    if season:
+        return season.upper()
+    return "+".join(MONTH_ABBR[m - 1] for m in months)
+
+
+def seasonal_rows(
+    table: Dict[str, SubdivisionSeries],
+    subdivisions: List[str],
+    months: Tuple[int, ...],
+    label: str,
+    years: List[int],
+    year_range: Optional[Tuple[int, int]],
+    aggregation: Optional[str],
+    per_year: bool,
+) -> List[Dict[str, object]]:
+    """Seasonal rainfall per subdivision, either per year or aggregated over the window.
+
+    A year range is answered from prefix sums; discrete years are looked up
+    one by one. Only years with every requested month observed count.
+    """
+    rows: List[Dict[str, object]] = []
+    for sub in subdivisions:
+        s = table.get(sub)
+        if s is None:
+            continue
+        start, end = year_range or (s.first_year, s.last_year)
+        start, end = max(start, s.first_year), min(end, s.last_year)
+        if start > end:
+            continue
+        if per_year or years or aggregation in ("min", "max"):
+            wanted = [y for y in sorted(set(years)) if start <= y <= end] if years else range(start, end + 1)
+            points: List[Tuple[int, float]] = []
+            for y in wanted:
+                v = s.year_value(months, y)
+                if v is not None:
+                    points.append((y, v))
+            if per_year:
+                rows.extend({"Subdivision": sub, "Year": y, "Season": label, "Rainfall_mm": round(v, 3)} for y, v in points)
+                continue
+            if not points:
+                continue
+            vals = [v for _, v in points]
+            total, n, first, last = sum(vals), len(vals), points[0][0], points[-1][0]
+        else:
+            total, n = s.range_total(months, start, end)
+            if not n:
+                continue
+            vals, first, last = [], start, end
+        if aggregation == "sum":
+            value = total
+        elif aggregation == "min":
+            value = min(vals)
+        elif aggregation == "max":
+            value = max(vals)
+        else:
+            value = total / n
+        rows.append({
+            "Subdivision": sub,
+            "Season": label,
+            "From": first,
+            "To": last,
+            "Years": n,
+            "Total_mm": round(total, 3),
+            "Mean_mm": round(total / n, 3),
+            "Value": round(value, 3),
+        })
+    if per_year:
+        rows.sort(key=lambda r: (r["Subdivision"], r["Year"]))
+    else:
+        rows.sort(key=lambda r: r["Value"], reverse=True)  # type: ignore[arg-type,return-value]
+    return rows
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class StoredResult:
+    rows: List[Dict[str, Any]]
+    datasets: List[str]
+    citations: List[Dict[str, str]]
+    parsed: Dict[str, Any]
+    analytics: List[Dict[str, Any]] = field(default_factory=list)
+    expires_at: float = 0.0
+    size_bytes: int = 0
+    # (column, descending) -> row order, so repeated pages of a sort reuse it
+    _orders: Dict[Tuple[str, bool], List[int]] = field(default_factory=dict, repr=False)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.rows[0]) if self.rows else []
+
+    def sorted_rows(self, column: Optional[str], descending: bool = False) -> List[Dict[str, Any]]:
+        if not column:
+            return self.rows
+        key = (column, descending)
+        order = self._orders.get(key)
+        if order is None:
+            # Missing values sort last in either direction
+            present = [i for i, r in enumerate(self.rows) if r.get(column) is not None]
+            missing = [i for i, r in enumerate(self.rows) if r.get(column) is None]
+            try:
+                present.sort(key=lambda i: self.rows[i][column], reverse=descending)
+            except TypeError:
+                present.sort(key=lambda i: str(self.rows[i][column]), reverse=descending)
+            order = self._orders[key] = present + missing
+        return [self.rows[i] for i in order]
+
+
+def estimate_size(rows: List[Dict[str, Any]], sample: int = 64) -> int:
+    """Approximate in-memory size of `rows`, extrapolated from a sample."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // sample)
+    picked = rows[::step][:sample]
+    per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in picked) / len(picked)
+    return int(per_row * len(rows))
+
+
+class ResultStore:
+    """In-process store of routed /query results, addressed by an opaque id.
+
+    Entries expire `ttl` seconds after they are stored. The store is an LRU
+    bounded by both `max_entries` and `max_bytes` (estimated row memory);
+    reads refresh recency. A result larger than the whole budget is not
+    stored and `put` returns None.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, StoredResult]" = OrderedDict()
+
+    def _drop(self, key: str) -> None:
+        self.bytes -= self._items.pop(key).size_bytes
+
+    def _expire(self, now: float) -> None:
+        for key in [k for k, v in self._items.items() if v.expires_at <= now]:
+            self._drop(key)
+
+    def put(self, result: StoredResult) -> Optional[str]:
+        result.size_bytes = estimate_size(result.rows)
+        if self.max_bytes and result.size_bytes > self.max_bytes:
+            return None
+        result_id = uuid.uuid4().hex
+        now = time.monotonic()
+        result.expires_at = now + self.ttl
+        with self._lock:
+            self._expire(now)
+            self._items[result_id] = result
+            self.bytes += result.size_bytes
+            while len(self._items) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                self._drop(next(iter(self._items)))
+                self.evictions += 1
+        return result_id
+
+    def get(self, result_id: str) -> Optional[StoredResult]:
+        with self._lock:
+            item = self._items.get(result_id)
+            if item is None:
+                return None
+            if item.expires_at <= time.monotonic():
+                self._drop(result_id)
+                return None
+            self._items.move_to_end(result_id)
+            return item
+
+    def __len__(self) -> int:
+        return len(self._items)
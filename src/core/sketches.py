@@ -0,0 +1,222 @@
+from __future__ import annotations
+import hashlib
+import math
+import random
+from typing import Any, Iterable, List, Optional, Set
+
+# Mergeable streaming summaries for quantile and distinct-count aggregations.
+# Small groups stay exact; a group switches to a sketch once it outgrows
+# `exact_limit`, so memory per group is bounded and error is only paid on
+# large inputs. Every summary supports `merge`, so partials built per
+# partition (or per worker) combine into the same answer.
+
+
+def exact_quantile(sorted_vals: List[float], q: float) -> float:
+    """Linearly interpolated quantile (q in [0, 1]) of a sorted list."""
+    if not sorted_vals:
+        return math.nan
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Items live in a hierarchy of compactors; an item at level h stands for
+    2**h inputs. A full compactor sorts itself and promotes every other item
+    (random offset) one level up. Rank error is about 1.7 / k with high
+    probability, independent of the input size.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+        self._limit = self._max_size()
+
+    @property
+    def rank_error(self) -> float:
+        return 1.7 / self.k
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        size = sum(len(c) for c in self.compactors)
+        while size >= self._max_size():
+            for h in range(len(self.compactors)):
+                if len(self.compactors[h]) >= self._capacity(h):
+                    if h + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    buf = sorted(self.compactors[h])
+                    # An odd item stays behind so total weight is preserved
+                    keep = [buf.pop()] if len(buf) % 2 else []
+                    promoted = buf[self._rng.random() < 0.5::2]
+                    self.compactors[h + 1].extend(promoted)
+                    size -= len(self.compactors[h]) - len(keep) - len(promoted)
+                    self.compactors[h] = keep
+                    break
+        self._limit = self._max_size() - size
+
+    def update(self, x: float) -> None:
+        self.compactors[0].append(x)
+        self.n += 1
+        # `_limit` counts the updates left before the sketch is full
+        self._limit -= 1
+        if self._limit <= 0:
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        weighted = sorted((x, 1 << h) for h, items in enumerate(self.compactors) for x in items)
+        if not weighted:
+            return math.nan
+        target = q * sum(w for _, w in weighted)
+        cum = 0
+        for x, w in weighted:
+            cum += w
+            if cum >= target:
+                return x
+        return weighted[-1][0]
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**p registers (standard error ~1.04 / sqrt(2**p))."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: Any) -> None:
+        h = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        est = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if est <= 2.5 * self.m and zeros:
+            est = self.m * math.log(self.m / zeros)  # linear counting for small cardinalities
+        return int(round(est))
+
+
+class QuantileSummary:
+    """Exact values up to `exact_limit`, then a KLL sketch."""
+
+    def __init__(self, exact_limit: int = 5000, k: int = 200):
+        self.exact_limit = exact_limit
+        self.k = k
+        self.values: Optional[List[float]] = []
+        self.sketch: Optional[KLLSketch] = None
+        self.n = 0
+
+    @property
+    def approximate(self) -> bool:
+        return self.sketch is not None
+
+    def _spill(self) -> None:
+        self.sketch = KLLSketch(self.k)
+        for v in self.values or []:
+            self.sketch.update(v)
+        self.values = None
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        if self.sketch is not None:
+            self.sketch.update(x)
+            return
+        self.values.append(x)  # type: ignore[union-attr]
+        if len(self.values) > self.exact_limit:  # type: ignore[arg-type]
+            self._spill()
+
+    def extend(self, xs: Iterable[float]) -> None:
+        for x in xs:
+            self.add(x)
+
+    def merge(self, other: "QuantileSummary") -> None:
+        if other.sketch is None:
+            self.extend(other.values or [])
+            return
+        if self.sketch is None:
+            self._spill()
+        self.sketch.merge(other.sketch)  # type: ignore[union-attr]
+        self.n += other.n
+
+    def quantile(self, q: float) -> float:
+        if self.sketch is not None:
+            return self.sketch.quantile(q)
+        return exact_quantile(sorted(self.values or []), q)
+
+    @property
+    def rank_error(self) -> float:
+        return self.sketch.rank_error if self.sketch is not None else 0.0
+
+
+class DistinctCounter:
+    """Exact set up to `exact_limit` members, then HyperLogLog."""
+
+    def __init__(self, exact_limit: int = 5000, p: int = 12):
+        self.exact_limit = exact_limit
+        self.p = p
+        self.members: Optional[Set[Any]] = set()
+        self.hll: Optional[HyperLogLog] = None
+
+    @property
+    def approximate(self) -> bool:
+        return self.hll is not None
+
+    def _spill(self) -> None:
+        self.hll = HyperLogLog(self.p)
+        for v in self.members or ():
+            self.hll.add(v)
+        self.members = None
+
+    def add(self, value: Any) -> None:
+        if self.hll is not None:
+            self.hll.add(value)
+            return
+        self.members.add(value)  # type: ignore[union-attr]
+        if len(self.members) > self.exact_limit:  # type: ignore[arg-type]
+            self._spill()
+
+    def merge(self, other: "DistinctCounter") -> None:
+        if other.hll is None:
+            for v in other.members or ():
+                self.add(v)
+            return
+        if self.hll is None:
+            self._spill()
+        self.hll.merge(other.hll)  # type: ignore[union-attr]
+
+    def count(self) -> int:
+        return self.hll.count() if self.hll is not None else len(self.members or ())
+
+    @property
+    def relative_error(self) -> float:
+        return self.hll.relative_error if self.hll is not None else 0.0
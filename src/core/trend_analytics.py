@@ -0,0 +1,130 @@
+from __future__ import annotations
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_WINDOW = 5
+
+# Measure columns produced by the trend branches of the router, in lookup order
+VALUE_FIELDS = ("Annual_Rainfall_mm", "Rainfall_mm", "Yield_t_per_ha", "Production_tonnes", "Area_ha")
+GROUP_FIELDS = ("State", "Subdivision", "Crop")
+
+
+def _year(v: Any) -> Optional[int]:
+    # Plain years or crop-year labels like "2009-10"
+    try:
+        return int(str(v).split("-")[0])
+    except Exception:
+        return None
+
+
+def _value(v: Any) -> Optional[float]:
+    # Missing measures stay None so they don't pull means and fits towards zero
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fit(n: int, sx: float, sy: float, sxx: float, sxy: float, syy: float) -> Tuple[Optional[float], Optional[float]]:
+    """Least-squares slope and r^2 from sufficient statistics."""
+    vx = n * sxx - sx * sx
+    vy = n * syy - sy * sy
+    if n < 2 or vx <= 0:
+        return None, None
+    cov = n * sxy - sx * sy
+    slope = cov / vx
+    r2 = (cov * cov) / (vx * vy) if vy > 0 else None
+    return slope, r2
+
+
+_Groups = Dict[Tuple[Any, ...], List[Tuple[int, Dict[str, Any]]]]
+
+
+def _group(rows: List[Dict[str, Any]]) -> Tuple[Optional[str], List[str], _Groups]:
+    """(value field, group key fields, {group key: [(year, row)] sorted by year})."""
+    if not rows:
+        return None, [], {}
+    value_field = next((f for f in VALUE_FIELDS if f in rows[0]), None)
+    keys = [f for f in GROUP_FIELDS if f in rows[0]]
+    groups: _Groups = {}
+    for r in rows:
+        y = _year(r.get("Year"))
+        if y is not None:
+            groups.setdefault(tuple(r.get(k) for k in keys), []).append((y, r))
+    for items in groups.values():
+        items.sort(key=lambda it: it[0])
+    return value_field, keys, groups
+
+
+def series(rows: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Tuple[str, List[Tuple[float, float]]]]]:
+    """Trend rows as (label, [(year, value)]) per group, for charting."""
+    value_field, _, groups = _group(rows)
+    if value_field is None:
+        return None, []
+    out = []
+    for gkey, items in groups.items():
+        label = " / ".join(str(k) for k in gkey) or value_field
+        points = [(float(y), _value(r.get(value_field))) for y, r in items]
+        out.append((label, [(x, v) for x, v in points if v is not None]))
+    return value_field, out
+
+
+def annotate(rows: List[Dict[str, Any]], window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Add moving average, year-over-year change and anomaly columns to trend rows in place.
+
+    Rows are grouped by whichever of State/Subdivision/Crop they carry. Each
+    group is reduced to running sums once; the trailing moving average is a
+    difference of two prefix sums and the linear fit comes from the totals,
+    so the cost is linear in the number of rows. The moving average covers
+    `window` consecutive years: it is None when the series has a gap or a
+    missing value inside the window. Missing values are left out of the
+    mean, anomalies and fit. Returns one summary per group with mean, slope
+    per year and r^2.
+    """
+    value_field, keys, groups = _group(rows)
+    if value_field is None:
+        return []
+    w = max(1, window or DEFAULT_WINDOW)
+
+    summaries: List[Dict[str, Any]] = []
+    for gkey, items in groups.items():
+        vals = [_value(r.get(value_field)) for _, r in items]
+        # Prefix sums of the values and of how many are present
+        cy = [0.0, *accumulate(v or 0.0 for v in vals)]
+        cn = [0, *accumulate(v is not None for v in vals)]
+        obs = [(float(y), v) for (y, _), v in zip(items, vals) if v is not None]
+        n = len(obs)
+        mean = cy[-1] / n if n else None
+        for i, (y, r) in enumerate(items):
+            v = vals[i]
+            j = i + 1 - w  # first item of the trailing window
+            full = j >= 0 and y - items[j][0] == w - 1 and cn[i + 1] - cn[j] == w
+            r["Moving_avg"] = round((cy[i + 1] - cy[j]) / w, 4) if full else None
+            prev = vals[i - 1] if i and items[i - 1][0] == y - 1 else None
+            if v is not None and prev is not None:
+                r["YoY_change"] = round(v - prev, 4)
+                r["YoY_pct"] = round((v - prev) / prev * 100.0, 2) if prev else None
+            else:
+                r["YoY_change"] = r["YoY_pct"] = None
+            r["Anomaly"] = round(v - mean, 4) if v is not None and mean is not None else None
+        slope, r2 = _fit(
+            n,
+            sum(x for x, _ in obs),
+            cy[-1],
+            sum(x * x for x, _ in obs),
+            sum(x * y for x, y in obs),
+            sum(y * y for _, y in obs),
+        )
+        summary: Dict[str, Any] = dict(zip(keys, gkey))
+        summary.update({
+            "Metric": value_field,
+            "n": n,
+            "From": items[0][0],
+            "To": items[-1][0],
+            "Mean": round(mean, 4) if mean is not None else None,
+            "Window": w,
+            "Slope_per_year": round(slope, 4) if slope is not None else None,
+            "R2": round(r2, 4) if r2 is not None else None,
+        })
+        summaries.append(summary)
+    return summaries
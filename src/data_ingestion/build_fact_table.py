@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+"""
+Materialize the climate x agriculture fact table.
+
+Aligns every crop APY row (State, Year label, Crop) with:
+- State_Rainfall_mm: state annual rainfall for the label's start year
+- Subdivision_Rainfall_mm: mean annual rainfall of the IMD subdivisions the
+  state maps to in data/reference/state_subdivision_map.csv
+
+Output: data/processed/joined/crop_climate_fact.csv (+ .meta.json)
+
+Refresh is incremental. If no source changed since the last build, nothing
+is rewritten. Sources are compared by content digest, not mtime, so the
+committed metadata stays valid after a clone. Otherwise each state's inputs are fingerprinted, and only
+states whose crop rows, rainfall rows, mapped subdivisions or mapping
+changed are re-joined. Rows for the other states are reused as they are.
+
+Usage:
+  python -m src.data_ingestion.build_fact_table          # incremental
+  python -m src.data_ingestion.build_fact_table --full   # rebuild everything
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+PROC = ROOT / "data" / "processed"
+CROP_CSV = PROC / "agriculture" / "crop_apy_state_year.csv"
+STATE_RAIN_CSV = PROC / "climate" / "rainfall_state_year.csv"
+SUBDIV_RAIN_CSV = PROC / "climate" / "rainfall_subdivision_year.csv"
+MAPPING_CSV = ROOT / "data" / "reference" / "state_subdivision_map.csv"
+OUT_DIR = PROC / "joined"
+OUT_CSV = OUT_DIR / "crop_climate_fact.csv"
+META_JSON = OUT_DIR / "crop_climate_fact.meta.json"
+
+FIELDS = [
+    "State", "Year", "Year_start", "Crop",
+    "Area_ha", "Production_tonnes", "Yield_t_per_ha",
+    "State_Rainfall_mm", "Subdivision_Rainfall_mm",
+]
+SOURCES = [CROP_CSV, STATE_RAIN_CSV, SUBDIV_RAIN_CSV, MAPPING_CSV]
+
+
+def to_float(x) -> Optional[float]:
+    try:
+        return float(str(x).strip())
+    except Exception:
+        return None
+
+
+def start_year(label: str) -> Optional[int]:
+    try:
+        return int(str(label).split("-")[0])
+    except Exception:
+        return None
+
+
+def _read(path: Path) -> List[Dict[str, str]]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return list(csv.DictReader(f))
+
+
+def _fingerprint(path: Path) -> str:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def _digest(lines: List[str]) -> str:
+    h = hashlib.sha1()
+    for line in sorted(lines):
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _fmt(x: Optional[float]) -> str:
+    return f"{x:.3f}" if x is not None else ""
+
+
+def build(full: bool = False) -> int:
+    """Build or refresh the fact table; returns the number of states re-joined."""
+    sources = {str(p.relative_to(ROOT)): _fingerprint(p) for p in SOURCES}
+    meta: Dict = {}
+    if META_JSON.exists() and OUT_CSV.exists() and not full:
+        meta = json.loads(META_JSON.read_text(encoding="utf-8"))
+        if meta.get("sources") == sources:
+            print(f"Fact table up to date: {OUT_CSV}")
+            return 0
+
+    crop_rows = _read(CROP_CSV)
+    state_rain_rows = _read(STATE_RAIN_CSV)
+    subdiv_rows = _read(SUBDIV_RAIN_CSV)
+    mapping_rows = _read(MAPPING_CSV)
+
+    mapping: Dict[str, List[str]] = {}
+    for r in mapping_rows:
+        mapping.setdefault(r["State"], []).append(r["Subdivision"])
+
+    # Hash-indexed lookups plus raw lines per state/subdivision for fingerprints
+    state_rain: Dict[Tuple[str, int], float] = {}
+    state_rain_lines: Dict[str, List[str]] = {}
+    for r in state_rain_rows:
+        y, v = start_year(r.get("Year", "")), to_float(r.get("Annual_Rainfall_mm"))
+        state_rain_lines.setdefault(r["State"], []).append(f"{r.get('Year')},{r.get('Annual_Rainfall_mm')}")
+        # Zero annual rainfall marks a missing observation in the source
+        if y is not None and v:
+            state_rain[(r["State"], y)] = v
+    subdiv_rain: Dict[Tuple[str, int], float] = {}
+    subdiv_lines: Dict[str, List[str]] = {}
+    for r in subdiv_rows:
+        y, v = start_year(r.get("Year", "")), to_float(r.get("Annual_Rainfall_mm"))
+        subdiv_lines.setdefault(r["Subdivision"], []).append(f"{r.get('Year')},{r.get('Annual_Rainfall_mm')}")
+        if y is not None and v is not None:
+            subdiv_rain[(r["Subdivision"], y)] = v
+
+    crop_by_state: Dict[str, List[Dict[str, str]]] = {}
+    for r in crop_rows:
+        crop_by_state.setdefault(r.get("State", ""), []).append(r)
+
+    digests: Dict[str, str] = {}
+    for state, rows in crop_by_state.items():
+        lines = [",".join(r.get(k, "") for k in ("Year", "Crop", "Area_ha", "Production_tonnes", "Yield_t_per_ha")) for r in rows]
+        lines += [f"rain:{x}" for x in state_rain_lines.get(state, [])]
+        for sd in mapping.get(state, []):
+            lines.append(f"map:{sd}")
+            lines += [f"sub:{sd}:{x}" for x in subdiv_lines.get(sd, [])]
+        digests[state] = _digest(lines)
+
+    old_digests: Dict[str, str] = meta.get("state_digests", {})
+    reuse = {s for s, d in digests.items() if old_digests.get(s) == d}
+    kept: Dict[str, List[List[str]]] = {}
+    if reuse:
+        with open(OUT_CSV, "r", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header == FIELDS:
+                for row in reader:
+                    if row and row[0] in reuse:
+                        kept.setdefault(row[0], []).append(row)
+    rejoined = 0
+    out_rows: List[List[str]] = []
+    for state in sorted(crop_by_state):
+        if state in kept:
+            out_rows.extend(kept[state])
+            continue
+        rejoined += 1
+        subdivs = mapping.get(state, [])
+        for r in crop_by_state[state]:
+            label = r.get("Year", "")
+            y = start_year(r.get("Year_start") or label)
+            st_rain = state_rain.get((state, y)) if y is not None else None
+            vals = [subdiv_rain[(sd, y)] for sd in subdivs if (sd, y) in subdiv_rain] if y is not None else []
+            sd_rain = sum(vals) / len(vals) if vals else None
+            out_rows.append([
+                state, label, str(y) if y is not None else "", r.get("Crop", ""),
+                r.get("Area_ha", ""), r.get("Production_tonnes", ""), r.get("Yield_t_per_ha", ""),
+                _fmt(st_rain), _fmt(sd_rain),
+            ])
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = OUT_CSV.with_suffix(".csv.tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(FIELDS)
+        w.writerows(out_rows)
+    tmp.replace(OUT_CSV)
+    META_JSON.write_text(json.dumps({"sources": sources, "state_digests": digests}, indent=1, sort_keys=True), encoding="utf-8")
+    print(f"Saved fact table: {OUT_CSV} | rows: {len(out_rows)} | states re-joined: {rejoined}/{len(crop_by_state)}")
+    return rejoined
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the climate x agriculture fact table")
+    ap.add_argument("--full", action="store_true", help="Ignore previous build metadata and rebuild all states")
+    args = ap.parse_args()
+    build(full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+"""
+Bulk-import processed CSV datasets into MongoDB collections.
+
+Datasets, their column types, indexes and rollups come from the
+`processed_datasets` registry in data/datasets.manifest.yaml; every entry
+whose `backends` include `mongo` is loadable. Each dataset is loaded into a
+staging collection in batches, given the indexes it declares (and no
+others), and then renamed over the live collection so readers never see a
+half-loaded dataset. Declared aggregates are then materialized with `$out`
+into `<dataset>__<aggregate>` collections, indexed on their group keys.
+
+Usage:
+  python -m src.data_ingestion.load_mongo                 # all mongo datasets
+  python -m src.data_ingestion.load_mongo crop_apy_state_year
+"""
+
+import csv
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from ..core.dataset_registry import AggregateSpec, DatasetSpec, registry
+from ..db.mongo import get_db
+
+BATCH_SIZE = 5000
+
+# Aggregate op -> MongoDB $group accumulator
+_ACCUMULATORS = {"sum": "$sum", "mean": "$avg", "min": "$min", "max": "$max"}
+
+
+def mongo_datasets() -> List[str]:
+    return [s.name for s in registry() if "mongo" in s.backends]
+
+
+def iter_docs(path: Path, convert: Callable[[Dict[str, str]], Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for row in csv.DictReader(f):
+            yield convert(row)
+
+
+def aggregate_pipeline(agg: AggregateSpec, out: str) -> List[Dict[str, Any]]:
+    """$group/$project/$out pipeline producing the same rows as `AggregateSpec.compute`."""
+    group: Dict[str, Any] = {"_id": {c: f"${c}" for c in agg.group_by}}
+    for col, op in agg.metrics:
+        if op == "count":
+            group[f"{col}_count"] = {"$sum": {"$cond": [{"$ne": [f"${col}", None]}, 1, 0]}}
+        else:
+            group[f"{col}_{op}"] = {_ACCUMULATORS[op]: f"${col}"}
+    project: Dict[str, Any] = {"_id": 0}
+    project.update({c: f"$_id.{c}" for c in agg.group_by})
+    project.update({k: 1 for k in group if k != "_id"})
+    return [{"$group": group}, {"$project": project}, {"$out": out}]
+
+
+def build_aggregates(db, spec: DatasetSpec) -> int:
+    for agg in spec.aggregates:
+        out = f"{spec.name}__{agg.name}"
+        db[spec.name].aggregate(aggregate_pipeline(agg, out), allowDiskUse=True)
+        if agg.group_by:
+            db[out].create_index([(c, ASCENDING) for c in agg.group_by])
+    return len(spec.aggregates)
+
+
+def load_dataset(db, name: str, batch_size: int = BATCH_SIZE) -> int:
+    """Load one dataset into `db[name]` via a staging collection; returns rows inserted."""
+    spec = registry()[name]
+    path = spec.path
+    if not path.exists():
+        print(f"Skip: not found {path}")
+        return 0
+    staging = db[f"{name}__staging"]
+    staging.drop()
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for doc in iter_docs(path, spec.convert):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            staging.insert_many(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        staging.insert_many(batch, ordered=False)
+        total += len(batch)
+    for keys in spec.indexes:
+        staging.create_index([(c, ASCENDING) for c in keys])
+    staging.rename(name, dropTarget=True)
+    aggregates = build_aggregates(db, spec)
+    print(f"Loaded {name}: {total} rows, {len(spec.indexes)} indexes, {aggregates} aggregates")
+    return total
+
+
+def main(argv: List[str]) -> int:
+    loadable = mongo_datasets()
+    names = argv or loadable
+    unknown = [n for n in names if n not in loadable]
+    if unknown:
+        print(f"ERROR: unknown dataset(s): {', '.join(unknown)}; choose from {', '.join(loadable)}")
+        return 1
+    try:
+        db = get_db()
+        for name in names:
+            load_dataset(db, name)
+    except PyMongoError as e:
+        print(f"ERROR: MongoDB load failed: {e}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
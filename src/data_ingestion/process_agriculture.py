@@ -1,12 +1,18 @@
 from __future__ import annotations
 from pathlib import Path
 import csv
+from typing import Optional, Tuple
+
+from ..core.partitions import slug, write_partitioned
 
 ROOT = Path(__file__).resolve().parents[2]
 RAW = ROOT / "data" / "raw"
 PROCESSED = ROOT / "data" / "processed" / "agriculture"
 
 SOURCE_FILE = RAW / "agriculture_crop_production_state_year.csv"
+PARTITION_DIR = PROCESSED / "crop_apy_state_year"
+
+HEADER = ["State", "Year", "Year_start", "Year_end", "Crop", "Area_ha", "Production_tonnes", "Yield_t_per_ha"]
 
 
 def safe_float(value):
@@ -16,6 +22,23 @@ def safe_float(value):
         return 0.0
 
 
+def year_bounds(label: str) -> Tuple[Optional[int], Optional[int]]:
+    """Start and end year of a crop-year label: "2000-01" -> (2000, 2001), "2005" -> (2005, 2005)."""
+    parts = [p.strip() for p in str(label).split("-") if p.strip()]
+    try:
+        start = int(parts[0])
+    except (IndexError, ValueError):
+        return None, None
+    end = start
+    if len(parts) > 1 and parts[1].isdigit():
+        tail = parts[1]
+        # Two-digit tails continue the start century ("1999-00" ends in 2000)
+        end = int(tail) if len(tail) == 4 else (start // 100) * 100 + int(tail)
+        if end < start:
+            end += 100
+    return start, end
+
+
 def process_csv(csv_path: Path):
     if not csv_path.exists():
         raise FileNotFoundError(f"Source not found: {csv_path}")
@@ -50,17 +73,43 @@ def process_csv(csv_path: Path):
             agg[key][0] += area
             agg[key][1] += production
 
-    # Write processed CSV
+    # Write processed CSV ordered by start year, so readers can binary-search
+    # a year range instead of parsing every label
+    keyed = []
+    for (state, year, crop), sums in agg.items():
+        start, end = year_bounds(year)
+        if start is None:
+            continue
+        keyed.append(((start, state, crop), year, end, sums))
+    keyed.sort(key=lambda item: item[0])
+
+    out_rows = []
+    for (start, state, crop), year, end, (area_sum, prod_sum) in keyed:
+        yield_val = (prod_sum / area_sum) if area_sum > 0 else ""
+        out_rows.append([state, year, start, end, crop, f"{area_sum:.3f}", f"{prod_sum:.3f}", f"{yield_val:.6f}" if yield_val != "" else ""])
+
     PROCESSED.mkdir(parents=True, exist_ok=True)
     out_csv = PROCESSED / "crop_apy_state_year.csv"
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["State", "Year", "Crop", "Area_ha", "Production_tonnes", "Yield_t_per_ha"])
-        for (state, year, crop), (area_sum, prod_sum) in sorted(agg.items()):
-            yield_val = (prod_sum / area_sum) if area_sum > 0 else ""
-            writer.writerow([state, year, crop, f"{area_sum:.3f}", f"{prod_sum:.3f}", f"{yield_val:.6f}" if yield_val != "" else ""])
-
-    print(f"Saved processed CSV: {out_csv} | rows: {len(agg)}")
+        writer.writerow(HEADER)
+        writer.writerows(out_rows)
+    print(f"Saved processed CSV: {out_csv} | rows: {len(out_rows)}")
+    write_partitions(out_rows)
+
+
+def write_partitions(rows, out_dir: Path = PARTITION_DIR):
+    """One year-sorted file per State under crop_apy_state_year/, with a min/max manifest."""
+    manifest = write_partitioned(
+        out_dir,
+        "crop_apy_state_year",
+        HEADER,
+        rows,
+        ["State"],
+        lambda keys: f"state={slug(keys['State'])}.csv",
+        ["Year_start", "Year_end", "Crop", "Area_ha", "Production_tonnes", "Yield_t_per_ha"],
+    )
+    print(f"Saved partitions: {out_dir} | partitions: {len(manifest.partitions)}")
 
 
 def main():
@@ -2,6 +2,8 @@ from __future__ import annotations
 from pathlib import Path
 import csv
 
+from ..core.partitions import slug, write_partitioned
+
 ROOT = Path(__file__).resolve().parents[2]
 RAW = ROOT / "data" / "raw"
 PROC = ROOT / "data" / "processed" / "climate"
@@ -13,6 +15,9 @@ HISTORICAL_RAINFALL = RAW / "climate_rainfall_subdivision_historical.csv"
 MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
 MONTH_MAP = {m: i + 1 for i, m in enumerate(MONTHS)}
 
+LONG_HEADER = ["Subdivision", "Year", "Month", "Rainfall_mm"]
+LONG_PARTITION_DIR = PROC / "rainfall_subdivision_long"
+
 
 def to_float(x):
     try:
@@ -76,7 +81,8 @@ def process_recent_state_annual():
 def process_historical_subdivision_long():
     """Reshape wide subdivision rainfall (1901-2017) to long MONTH rows.
     Input columns: SUBDIVISION, YEAR, JAN..DEC, ANNUAL
-    Output: data/processed/climate/rainfall_subdivision_long.csv
+    Output: data/processed/climate/rainfall_subdivision_long.csv (also
+    partitioned by subdivision and decade under rainfall_subdivision_long/)
     and annual totals as rainfall_subdivision_year.csv
     """
     if not HISTORICAL_RAINFALL.exists():
@@ -92,7 +98,7 @@ def process_historical_subdivision_long():
          open(out_long, "w", newline="", encoding="utf-8") as f_out:
         r = csv.DictReader(f_in)
         w = csv.writer(f_out)
-        w.writerow(["Subdivision", "Year", "Month", "Rainfall_mm"])
+        w.writerow(LONG_HEADER)
         for row in r:
             sub = (row.get("SUBDIVISION") or row.get("Subdivision") or "").strip()
             year = (row.get("YEAR") or row.get("Year") or "").strip()
@@ -107,11 +113,14 @@ def process_historical_subdivision_long():
 
     # Annual table
     agg = {}
+    long_rows = []
     with open(out_long, "r", encoding="utf-8") as f:
         r = csv.DictReader(f)
         for row in r:
             key = (row["Subdivision"], row["Year"])
             agg[key] = agg.get(key, 0.0) + to_float(row["Rainfall_mm"])
+            long_rows.append([row[c] for c in LONG_HEADER])
+    write_long_partitions(long_rows)
 
     with open(out_annual, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
@@ -123,6 +132,27 @@ def process_historical_subdivision_long():
     print(f"Saved: {out_annual} | rows: {len(agg)}")
 
 
+def write_long_partitions(rows):
+    """Monthly rows split by Subdivision and decade, with a min/max manifest."""
+    keyed = []
+    for row in rows:
+        try:
+            decade = int(row[1]) // 10 * 10
+        except ValueError:
+            continue
+        keyed.append(row + [decade])
+    write_partitioned(
+        LONG_PARTITION_DIR,
+        "rainfall_subdivision_long",
+        LONG_HEADER + ["Decade"],
+        keyed,
+        ["Subdivision", "Decade"],
+        lambda keys: f"subdivision={slug(keys['Subdivision'])}/decade={keys['Decade']}.csv",
+        ["Year", "Month", "Rainfall_mm"],
+    )
+    print(f"Saved partitions: {LONG_PARTITION_DIR}")
+
+
 def main():
     process_recent_state_annual()
     process_historical_subdivision_long()
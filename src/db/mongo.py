@@ -1,20 +1,44 @@
-from typing import Optional
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from ..utils.config import settings
 
-_client: Optional[MongoClient] = None
+# pymongo and motor are imported on first use: the API only talks to Mongo
+# when caching, query logging or a mongo backend is enabled
+if TYPE_CHECKING:  # pragma: no cover
+    from pymongo import MongoClient
 
+_client: Optional["MongoClient"] = None
+_async_client: Optional[Any] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_client_injected: bool = False
 
-def get_client() -> MongoClient:
+
+def client_options() -> Dict[str, Any]:
+    """Pool, timeout and compression options shared by the sync and async clients."""
+    opts: Dict[str, Any] = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "socketTimeoutMS": settings.mongodb_socket_timeout_ms,
+    }
+    compressors = [c.strip() for c in settings.mongodb_compressors.split(",") if c.strip()]
+    if compressors:
+        opts["compressors"] = ",".join(compressors)
+    return opts
+
+
+def get_client() -> "MongoClient":
     global _client
     if _client is None:
-        _client = MongoClient(settings.mongodb_uri)
+        from pymongo import MongoClient
+        _client = MongoClient(settings.mongodb_uri, **client_options())
     return _client
 
 
 def ping() -> dict:
     """Ping MongoDB and return server info or error."""
+    from pymongo.errors import PyMongoError
     try:
         client = get_client()
         # The ping command is cheap and does not require auth beyond connection
@@ -34,3 +58,72 @@ def get_collection(name: str):
     """Get a collection handle by name from the configured database."""
     db = get_db()
     return db[name]
+
+
+# ---------- Async (Motor) access layer ----------
+
+def set_async_client(client: Optional[Any]) -> None:
+    """Install an async client (e.g. a mongomock-motor stand-in in tests); None resets it."""
+    global _async_client, _async_client_loop, _async_client_injected
+    _async_client = client
+    _async_client_loop = None
+    _async_client_injected = client is not None
+
+
+def get_async_client():
+    """Get the shared Motor client, creating it lazily on the running event loop.
+
+    Motor binds a client to the loop it was first used on, so a client created
+    on a different (e.g. already closed) loop is replaced rather than reused.
+    An injected client via `set_async_client` is always returned as-is.
+    """
+    global _async_client, _async_client_loop
+    if _async_client_injected:
+        return _async_client
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
+    except Exception:  # pragma: no cover - motor is listed in requirements, but keep sync path usable
+        raise RuntimeError("motor is not installed; async MongoDB access is unavailable")
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _async_client.close()
+        _async_client = AsyncIOMotorClient(settings.mongodb_uri, **client_options())
+        _async_client_loop = loop
+    return _async_client
+
+
+def close_async_client() -> None:
+    """Close the shared Motor client (no-op when none was created)."""
+    global _async_client, _async_client_loop, _async_client_injected
+    if _async_client is not None and not _async_client_injected:
+        _async_client.close()
+    _async_client = None
+    _async_client_loop = None
+    _async_client_injected = False
+
+
+async def ping_async() -> dict:
+    """Async variant of `ping` that does not block the event loop."""
+    from pymongo.errors import PyMongoError
+    try:
+        client = get_async_client()
+        await client.admin.command("ping")
+        return {"ok": True}
+    except (PyMongoError, RuntimeError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+def get_async_db():
+    """Get the configured database handle on the async client."""
+    client = get_async_client()
+    return client[settings.mongodb_db]
+
+
+def get_async_collection(name: str):
+    """Get an async collection handle by name from the configured database."""
+    db = get_async_db()
+    return db.get_collection(name)
@@ -1,19 +1,33 @@
 from __future__ import annotations
 
-"""
-One-time MongoDB setup helper for Atlas M0 (or local Mongo).
+r"""
+MongoDB provisioning tool for Atlas M0 (or local Mongo).
+
+Reads .env (if present), connects using MONGODB_URI/MONGODB_DB, and makes the
+live server match the collections and indexes declared below. The declared
+indexes follow how the API actually reads and writes:
+
+- cache: looked up by `_id` (always indexed) and expired by a TTL index on
+  `created_at`, so the server purges stale entries instead of the client.
+- queries: append-only log, optionally a capped or time-series collection,
+  read back newest-first by `created_at`.
 
-Reads .env (if present), connects using MONGODB_URI/MONGODB_DB, and ensures
-recommended collections and indexes exist. Safe to run multiple times.
+Safe to run multiple times: existing indexes are diffed against the
+declaration and only missing or changed ones are touched. Extra indexes are
+reported and dropped only with --prune.
 
 Usage (Windows PowerShell):
   .\.venv\Scripts\Activate.ps1
-  python .\src\db\setup_atlas.py
+  python .\src\db\setup_atlas.py              # apply
+  python .\src\db\setup_atlas.py --dry-run    # show the diff only
+  python .\src\db\setup_atlas.py --stats      # also print $indexStats usage
 """
 
+import argparse
 import os
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import PyMongoError
@@ -30,7 +44,155 @@ def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
     return v if v is not None and v != "" else default
 
 
-def main() -> int:
+def get_int_env(name: str, default: int) -> int:
+    v = get_env(name)
+    return int(v) if v and v.isdigit() else default
+
+
+Keys = Tuple[Tuple[str, Any], ...]
+
+
+@dataclass
+class IndexSpec:
+    name: str
+    keys: List[Tuple[str, Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class CollectionSpec:
+    name: str
+    kind: str = "standard"  # standard | capped | timeseries
+    options: Dict[str, Any] = field(default_factory=dict)
+    indexes: List[IndexSpec] = field(default_factory=list)
+
+
+def declared_collections() -> List[CollectionSpec]:
+    cache_name = get_env("CACHE_COLLECTION", "cache") or "cache"
+    queries_name = get_env("LOG_QUERIES_COLLECTION", "queries") or "queries"
+    cache_ttl = get_int_env("CACHE_TTL_SECONDS", 600)
+    kind = (get_env("QUERIES_COLLECTION_KIND", "standard") or "standard").lower()
+    retention = get_int_env("QUERIES_RETENTION_SECONDS", 0)
+
+    cache = CollectionSpec(
+        name=cache_name,
+        indexes=[IndexSpec("created_at_ttl", [("created_at", ASCENDING)], {"expireAfterSeconds": cache_ttl})],
+    )
+
+    queries = CollectionSpec(name=queries_name, kind=kind)
+    if kind == "capped":
+        # Fixed-size ring buffer: oldest log entries are overwritten, no TTL needed
+        queries.options = {"capped": True, "size": get_int_env("QUERIES_CAPPED_BYTES", 50 * 1024 * 1024)}
+        queries.indexes = [IndexSpec("created_at_desc", [("created_at", DESCENDING)])]
+    elif kind == "timeseries":
+        # Bucketed storage keyed on created_at; retention is a collection option
+        queries.options = {"timeseries": {"timeField": "created_at", "metaField": "answer_source", "granularity": "seconds"}}
+        if retention:
+            queries.options["expireAfterSeconds"] = retention
+    elif retention:
+        # TTL indexes must be ascending on a date field; they also serve newest-first scans
+        queries.indexes = [IndexSpec("created_at_ttl", [("created_at", ASCENDING)], {"expireAfterSeconds": retention})]
+    else:
+        queries.indexes = [IndexSpec("created_at_desc", [("created_at", DESCENDING)])]
+    return [cache, queries]
+
+
+def _keys(spec_keys) -> Keys:
+    return tuple((k, v) for k, v in spec_keys)
+
+
+def diff_indexes(live: Dict[str, Dict[str, Any]], declared: List[IndexSpec]) -> Dict[str, List[Any]]:
+    """Compare `collection.index_information()` with the declared indexes.
+
+    Indexes are matched on their key pattern (names may differ between runs or
+    older setups). Returns {"missing": [IndexSpec], "changed": [(live_name, IndexSpec)],
+    "extra": [live_name]}.
+    """
+    by_keys = {_keys(info["key"]): (name, info) for name, info in live.items() if name != "_id_"}
+    missing: List[IndexSpec] = []
+    changed: List[Tuple[str, IndexSpec]] = []
+    matched = set()
+    for spec in declared:
+        k = _keys(spec.keys)
+        if k not in by_keys:
+            missing.append(spec)
+            continue
+        name, info = by_keys[k]
+        matched.add(name)
+        if info.get("expireAfterSeconds") != spec.options.get("expireAfterSeconds"):
+            changed.append((name, spec))
+    extra = [name for name, _ in by_keys.values() if name not in matched]
+    return {"missing": missing, "changed": changed, "extra": extra}
+
+
+def ensure_collection(db, spec: CollectionSpec, dry_run: bool) -> None:
+    existing = {c["name"]: c for c in db.list_collections(filter={"name": spec.name})}
+    if spec.name not in existing:
+        print(f"[{spec.name}] create ({spec.kind})")
+        if not dry_run:
+            db.create_collection(spec.name, **spec.options)
+        return
+    options = existing[spec.name].get("options", {})
+    live_kind = "capped" if options.get("capped") else ("timeseries" if existing[spec.name].get("type") == "timeseries" else "standard")
+    if live_kind != spec.kind:
+        # Converting a collection type means rebuilding it; leave that to the operator
+        print(f"[{spec.name}] WARNING: live collection is {live_kind}, declared {spec.kind}; drop it to re-provision")
+    elif spec.kind == "timeseries" and options.get("expireAfterSeconds") != spec.options.get("expireAfterSeconds"):
+        print(f"[{spec.name}] set expireAfterSeconds={spec.options.get('expireAfterSeconds', 'off')}")
+        if not dry_run:
+            db.command("collMod", spec.name, expireAfterSeconds=spec.options.get("expireAfterSeconds", "off"))
+
+
+def ensure_indexes(db, spec: CollectionSpec, dry_run: bool, prune: bool) -> None:
+    col = db.get_collection(spec.name)
+    live = col.index_information() if spec.name in db.list_collection_names() else {}
+    d = diff_indexes(live, spec.indexes)
+    for idx in d["missing"]:
+        print(f"[{spec.name}] create index {idx.name} {idx.keys} {idx.options or ''}".rstrip())
+        if not dry_run:
+            col.create_index(idx.keys, name=idx.name, **idx.options)
+    for live_name, idx in d["changed"]:
+        ttl = idx.options.get("expireAfterSeconds")
+        print(f"[{spec.name}] update index {live_name}: expireAfterSeconds -> {ttl}")
+        if dry_run:
+            continue
+        if ttl is not None:
+            # TTL changes do not need a rebuild
+            db.command("collMod", spec.name, index={"keyPattern": dict(idx.keys), "expireAfterSeconds": ttl})
+        else:
+            col.drop_index(live_name)
+            col.create_index(idx.keys, name=idx.name, **idx.options)
+    for live_name in d["extra"]:
+        if prune:
+            print(f"[{spec.name}] drop undeclared index {live_name}")
+            if not dry_run:
+                col.drop_index(live_name)
+        else:
+            print(f"[{spec.name}] undeclared index {live_name} (use --prune to drop)")
+    if not any(d.values()):
+        print(f"[{spec.name}] indexes up to date")
+
+
+def print_index_stats(db, spec: CollectionSpec) -> None:
+    try:
+        stats = list(db.get_collection(spec.name).aggregate([{"$indexStats": {}}]))
+    except PyMongoError as e:
+        print(f"[{spec.name}] $indexStats unavailable: {e}")
+        return
+    for s in sorted(stats, key=lambda s: s.get("name", "")):
+        acc = s.get("accesses", {})
+        since = acc.get("since")
+        since_s = since.isoformat() if isinstance(since, datetime) else "-"
+        print(f"[{spec.name}] {s.get('name')}: ops={acc.get('ops', 0)} since={since_s}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Provision MongoDB collections and indexes for Project Samarth")
+    ap.add_argument("--dry-run", action="store_true", help="Report the diff without changing the server")
+    ap.add_argument("--prune", action="store_true", help="Drop indexes that are not declared")
+    ap.add_argument("--stats", action="store_true", help="Print $indexStats usage counters per index")
+    args = ap.parse_args(argv)
+
     uri = get_env("MONGODB_URI", "mongodb://localhost:27017")
     dbname = get_env("MONGODB_DB", "samarth")
     print(f"Connecting to MongoDB: {uri} (db={dbname})")
@@ -42,35 +204,32 @@ def main() -> int:
         return 1
 
     db = client[dbname]
-
-    # Ensure collections exist by referencing them
-    queries = db.get_collection("queries")
-    cache = db.get_collection("cache")
-
-    # Minimal indexes
+    specs = declared_collections()
     try:
-        # queries: basic indexes for typical lookups
-        queries.create_index([("created_at", DESCENDING)])
-        queries.create_index([("answer_source", ASCENDING)])
-        queries.create_index([("q", "text")])  # text search on question
-
-        # cache: index on created_at for maintenance; TTL optional
-        cache.create_index([("created_at", DESCENDING)])
-        ttl_env = get_env("CACHE_TTL_SECONDS")
-        if ttl_env and ttl_env.isdigit():
-            # TTL index requires an ascending index on a date field with expireAfterSeconds
-            cache.create_index([("created_at", ASCENDING)], expireAfterSeconds=int(ttl_env))
+        for spec in specs:
+            ensure_collection(db, spec, args.dry_run)
+            ensure_indexes(db, spec, args.dry_run, args.prune)
     except PyMongoError as e:
-        print(f"WARNING: Index creation issue: {e}")
+        print(f"ERROR: Provisioning failed: {e}")
+        return 2
+
+    if args.stats:
+        for spec in specs:
+            print_index_stats(db, spec)
+
+    if args.dry_run:
+        print("Dry run complete. No changes were made.")
+        return 0
 
-    # Touch a doc to confirm write perms (then delete)
+    # Touch a doc to confirm write perms (then delete); the cache is never capped
     try:
-        probe_id = queries.insert_one({
+        cache = db.get_collection(specs[0].name)
+        probe_id = cache.insert_one({
             "_type": "setup_probe",
             "created_at": datetime.utcnow(),
             "note": "ok to delete",
         }).inserted_id
-        queries.delete_one({"_id": probe_id})
+        cache.delete_one({"_id": probe_id})
         print("MongoDB setup complete. Collections and indexes ensured.")
         return 0
     except PyMongoError as e:
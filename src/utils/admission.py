@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from .metrics import SHED_REQUESTS
+
+# Paths that bypass admission control entirely (liveness and scraping must
+# answer even when the API is saturated)
+EXEMPT_PATHS = frozenset({"/", "/health", "/metrics"})
+# Expensive routes (parse + route + LLM) get their own, smaller budget so they
+# cannot starve the cheap read endpoints
+HEAVY_PATHS = frozenset({"/query", "/query/batch"})
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Admission class of a request: "query", "light", or None when exempt."""
+    if path in EXEMPT_PATHS:
+        return None
+    if method == "POST" and path in HEAVY_PATHS:
+        return "query"
+    return "light"
+
+
+class Limiter:
+    """Bounded in-flight slots with a short FIFO wait queue.
+
+    A request is admitted at once while a slot is free and nobody is
+    queued; otherwise it waits at most `max_wait` seconds in a queue of at
+    most `max_queue` entries. A released slot is handed straight to the
+    oldest waiter, so queued requests are never overtaken.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, max_wait: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """None once a slot is held, else why the request was shed ("queue_full" | "timeout")."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.max_wait)
+            return None
+        except asyncio.TimeoutError:
+            if fut.done():
+                return None  # a slot was handed over just as the deadline passed
+            self._abandon(fut)
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot it may already hold
+            if fut.done():
+                self.release()
+            else:
+                self._abandon(fut)
+            raise
+
+    def _abandon(self, fut: asyncio.Future) -> None:
+        fut.cancel()
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # slot moves to the waiter; in_flight unchanged
+                return
+        self.in_flight -= 1
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying per-class `Limiter`s and shedding with a fast 503.
+
+    Shed requests get `Retry-After` and are counted in
+    `samarth_shed_requests_total` by class and reason.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiters: Dict[str, Limiter],
+        retry_after: int = 1,
+        classify: Callable[[str, str], Optional[str]] = route_class,
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.retry_after = retry_after
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cls = self.classify(scope.get("method", ""), scope.get("path", ""))
+        limiter = self.limiters.get(cls) if cls else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        reason = await limiter.acquire()
+        if reason is not None:
+            SHED_REQUESTS.inc(route_class=cls, reason=reason)
+            response = JSONResponse(
+                {"detail": "Server is busy, retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
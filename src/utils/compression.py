@@ -0,0 +1,125 @@
+from __future__ import annotations
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - optional; gzip alone is served without it
+    brotli = None
+
+# Response bodies serialized and compressed once, then served as-is. A
+# body is stored raw plus gzip (and brotli when installed); the variant is
+# picked per request from Accept-Encoding.
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    identity: bytes
+    variants: Tuple[Tuple[str, bytes], ...] = ()  # (content-coding, bytes), preferred first
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.identity) + sum(len(b) for _, b in self.variants)
+
+    def select(self, accept_encoding: str) -> Tuple[str, bytes]:
+        """(content-coding, body) for an Accept-Encoding header; "identity" when nothing better is acceptable."""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best: Optional[Tuple[float, str, bytes]] = None
+        for coding, body in self.variants:
+            q = accepted.get(coding, wildcard)
+            if q > 0 and (best is None or q > best[0]):
+                best = (q, coding, body)
+        return ("identity", self.identity) if best is None else (best[1], best[2])
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            name, _, value = p.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        out[coding] = q
+    return out
+
+
+def offered_codings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def accepts_compressed(accept_encoding: str) -> bool:
+    """True when a compressed variant could be selected for this Accept-Encoding."""
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    return any(accepted.get(c, wildcard) > 0 for c in offered_codings())
+
+
+def dumps(data: Any) -> bytes:
+    # Same output as FastAPI's JSONResponse, so cached and uncached bodies are identical
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode(raw: bytes, min_bytes: int = 1024) -> EncodedBody:
+    """Raw body plus its brotli/gzip variants; bodies under `min_bytes` stay uncompressed."""
+    if len(raw) < min_bytes:
+        return EncodedBody(raw)
+    variants = []
+    if brotli is not None:
+        variants.append(("br", brotli.compress(raw, quality=BROTLI_QUALITY)))
+    # mtime=0 keeps the gzip bytes identical across runs for the same body
+    variants.append(("gzip", gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)))
+    return EncodedBody(raw, tuple(variants))
+
+
+def encode_json(data: Any, min_bytes: int = 1024) -> EncodedBody:
+    return encode(dumps(data), min_bytes)
+
+
+class BodyCache:
+    """LRU of encoded bodies bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, EncodedBody]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[EncodedBody]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: str, body: EncodedBody) -> None:
+        size = body.size_bytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size_bytes
+            self._items[key] = body
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= evicted.size_bytes
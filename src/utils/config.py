@@ -1,9 +1,24 @@
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv
+from pathlib import Path
+from typing import Optional
 
-# Load .env if present
-load_dotenv()
+
+def _find_dotenv() -> Optional[Path]:
+    # Same search as dotenv's find_dotenv(): this file's directory, then its parents
+    here = Path(__file__).resolve().parent
+    for d in (here, *here.parents):
+        if (d / ".env").is_file():
+            return d / ".env"
+    return None
+
+
+# Load .env if present; python-dotenv is only imported when there is one
+_dotenv_path = _find_dotenv()
+if _dotenv_path is not None:
+    from dotenv import load_dotenv
+
+    load_dotenv(_dotenv_path)
 
 
 def _getenv(name: str, default: str = "") -> str:
@@ -25,6 +40,13 @@ class Settings:
 
     mongodb_uri: str = _getenv("MONGODB_URI", "mongodb://localhost:27017")
     mongodb_db: str = _getenv("MONGODB_DB", "samarth")
+    # Connection pool, timeouts and wire compression (shared by sync and async clients)
+    mongodb_max_pool_size: int = int(_getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    mongodb_min_pool_size: int = int(_getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    mongodb_server_selection_timeout_ms: int = int(_getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+    mongodb_connect_timeout_ms: int = int(_getenv("MONGODB_CONNECT_TIMEOUT_MS", "3000"))
+    mongodb_socket_timeout_ms: int = int(_getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+    mongodb_compressors: str = _getenv("MONGODB_COMPRESSORS", "zlib")
 
     hf_api_token: str = _getenv("HF_API_TOKEN", "")
     data_gov_in_api_key: str = _getenv("DATA_GOV_IN_API_KEY", "")
@@ -36,6 +58,57 @@ class Settings:
     cache_enabled: bool = _getbool("CACHE_ENABLED", False)
     cache_ttl_seconds: int = int(_getenv("CACHE_TTL_SECONDS", "600"))
     cache_collection: str = _getenv("CACHE_COLLECTION", "cache")
+    # Probabilistic early refresh of cache entries nearing their TTL (XFetch);
+    # higher refreshes earlier, 0 disables
+    cache_early_refresh_beta: float = float(_getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
+
+    # Cache-Control max-age for dataset-backed GET responses (listings,
+    # /datasets, /stats); they also carry ETag/Last-Modified for revalidation
+    http_cache_max_age_seconds: int = int(_getenv("HTTP_CACHE_MAX_AGE_SECONDS", "300"))
+
+    # Listing and /query result pages are kept serialized and gzip/brotli
+    # compressed in memory (LRU, this many MB); smaller bodies are not compressed
+    response_cache_max_mb: int = int(_getenv("RESPONSE_CACHE_MAX_MB", "32"))
+    response_compress_min_bytes: int = int(_getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+    # Per-dataset query backend for /query routing: "csv" (default) or "mongo".
+    # Format: "crop_apy_state_year=mongo,rainfall_state_year=csv"; "*=mongo" sets the default.
+    dataset_backends: str = _getenv("DATASET_BACKENDS", "")
+
+    # Upper bound on questions accepted by POST /query/batch
+    batch_max_questions: int = int(_getenv("BATCH_MAX_QUESTIONS", "100"))
+
+    # Median/percentile/distinct-count groups larger than this switch from exact
+    # values to mergeable sketches (KLL / HyperLogLog) with bounded error
+    sketch_exact_limit: int = int(_getenv("SKETCH_EXACT_LIMIT", "5000"))
+
+    # Admission control: in-flight slots, wait-queue length and max queue wait
+    # per route class. "query" covers POST /query and /query/batch; "light"
+    # every other endpoint except /health and /metrics, which are never shed.
+    admission_enabled: bool = _getbool("ADMISSION_ENABLED", True)
+    admission_query_max_in_flight: int = int(_getenv("ADMISSION_QUERY_MAX_IN_FLIGHT", "8"))
+    admission_query_queue: int = int(_getenv("ADMISSION_QUERY_QUEUE", "16"))
+    admission_query_max_wait_ms: int = int(_getenv("ADMISSION_QUERY_MAX_WAIT_MS", "2000"))
+    admission_light_max_in_flight: int = int(_getenv("ADMISSION_LIGHT_MAX_IN_FLIGHT", "64"))
+    admission_light_queue: int = int(_getenv("ADMISSION_LIGHT_QUEUE", "128"))
+    admission_light_max_wait_ms: int = int(_getenv("ADMISSION_LIGHT_MAX_WAIT_MS", "500"))
+    # Retry-After (seconds) sent with 503 when a request is shed
+    admission_retry_after_seconds: int = int(_getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+    # Grouped crop aggregations scanning at least this many rows (manifest
+    # estimate) run per partition on a process pool; 0 workers = one per CPU
+    scan_workers: int = int(_getenv("SCAN_WORKERS", "0"))
+    parallel_scan_min_rows: int = int(_getenv("PARALLEL_SCAN_MIN_ROWS", "200000"))
+
+    # Misspelled/aliased state, subdivision and crop names are accepted at or
+    # above this similarity (1 - edit distance / length)
+    fuzzy_min_confidence: float = float(_getenv("FUZZY_MIN_CONFIDENCE", "0.8"))
+
+    # Full /query results are kept server-side for paging/charting via a handle
+    result_ttl_seconds: int = int(_getenv("RESULT_TTL_SECONDS", "900"))
+    result_store_max_entries: int = int(_getenv("RESULT_STORE_MAX_ENTRIES", "256"))
+    # LRU memory budget for stored results (estimated row size)
+    result_store_max_mb: int = int(_getenv("RESULT_STORE_MAX_MB", "64"))
 
     # Optional background logging of queries
     log_queries: bool = _getbool("LOG_QUERIES", False)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# HTTP validators for responses computed from processed dataset files. The
+# version of a dataset is its files' mtime and size, so a validator costs a
+# few stat() calls and a conditional request never reads the data.
+
+
+def dataset_version(paths: Iterable[Path]) -> Tuple[str, Optional[float]]:
+    """(version token, latest mtime) of the files behind a response; missing files count too."""
+    parts = []
+    latest: Optional[float] = None
+    for p in paths:
+        try:
+            st = p.stat()
+        except OSError:
+            parts.append(f"{p.name}:-")
+            continue
+        parts.append(f"{p.name}:{st.st_mtime_ns}:{st.st_size}")
+        latest = st.st_mtime if latest is None else max(latest, st.st_mtime)
+    return ";".join(parts), latest
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str  # strong, quoted
+    last_modified: Optional[float]  # epoch seconds
+
+    def matches(self, headers: Mapping[str, str]) -> bool:
+        """True when the request's conditional headers say the client copy is current.
+
+        If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2) and uses
+        the weak comparison, so a `W/` prefix added by a proxy still matches.
+        """
+        inm = headers.get("if-none-match")
+        if inm is not None:
+            tags = {t.strip()[2:] if t.strip().startswith("W/") else t.strip() for t in inm.split(",")}
+            return "*" in tags or self.etag in tags
+        ims = headers.get("if-modified-since")
+        if ims and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+    def headers(self, max_age: int) -> Dict[str, str]:
+        out = {
+            "ETag": self.etag,
+            # Shared caches may store it; at max-age 0 they must revalidate every time
+            "Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "public, no-cache",
+        }
+        if self.last_modified is not None:
+            out["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        return out
+
+
+def validators(endpoint: str, params: Dict[str, Any], paths: Iterable[Path]) -> Validators:
+    """Strong validators for `endpoint` called with `params` over the dataset files `paths`."""
+    version, latest = dataset_version(paths)
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if v is not None)
+    digest = hashlib.sha1(f"{endpoint}|{query}|{version}".encode("utf-8")).hexdigest()[:24]
+    return Validators(f'"{digest}"', latest)
@@ -0,0 +1,116 @@
+"""
+Per-module import cost of a module, measured in a fresh interpreter.
+
+Runs `python -X importtime -c "import <module>"` and reports the slowest
+modules, the cost per top-level package, and how much of the total is the
+web framework (which every deployment pays) versus everything else.
+
+Usage:
+  python -m src.utils.import_profile                  # src.api.main
+  python -m src.utils.import_profile src.core.data_router --top 30
+"""
+
+from __future__ import annotations
+import argparse
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Imported by any FastAPI app; excluded from the project's own import budget
+FRAMEWORK_PACKAGES = frozenset({"fastapi", "starlette", "pydantic", "pydantic_core", "anyio", "typing_extensions", "annotated_types"})
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+@dataclass(frozen=True)
+class ImportCost:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # nesting level in the import tree (0 = imported directly)
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".", 1)[0]
+
+
+def parse_importtime(text: str) -> List[ImportCost]:
+    """Entries of `-X importtime` output, in the order printed (children before their parent)."""
+    out: List[ImportCost] = []
+    for line in text.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append(ImportCost(m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return out
+
+
+def profile(module: str = "src.api.main", python: Optional[str] = None) -> List[ImportCost]:
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def total_us(costs: List[ImportCost], module: str) -> int:
+    return next((c.cumulative_us for c in costs if c.module == module), 0)
+
+
+def attributed_us(costs: List[ImportCost], packages: Iterable[str]) -> int:
+    """Cumulative time of import subtrees rooted in `packages` (nested roots counted once)."""
+    wanted = set(packages)
+    total = 0
+    inside: Optional[int] = None  # depth of the enclosing counted subtree
+    for c in reversed(costs):  # parents come before their children
+        if inside is not None and c.depth > inside:
+            continue
+        inside = None
+        if c.package in wanted:
+            total += c.cumulative_us
+            inside = c.depth
+    return total
+
+
+def by_package(costs: List[ImportCost]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for c in costs:
+        out[c.package] = out.get(c.package, 0) + c.self_us
+    return out
+
+
+def report(module: str, costs: List[ImportCost], top: int = 20) -> str:
+    total = total_us(costs, module)
+    framework = attributed_us(costs, FRAMEWORK_PACKAGES)
+    lines = [
+        f"import {module}: {total / 1000:.1f} ms "
+        f"(framework {framework / 1000:.1f} ms, rest {(total - framework) / 1000:.1f} ms)",
+        "",
+        f"{'cumulative ms':>14} {'self ms':>9}  module",
+    ]
+    for c in sorted(costs, key=lambda c: -c.cumulative_us)[:top]:
+        lines.append(f"{c.cumulative_us / 1000:>14.1f} {c.self_us / 1000:>9.1f}  {'  ' * c.depth}{c.module}")
+    lines += ["", f"{'self ms':>9}  package"]
+    for pkg, us in sorted(by_package(costs).items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{us / 1000:>9.1f}  {pkg}")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Report per-module import cost in a fresh interpreter")
+    ap.add_argument("module", nargs="?", default="src.api.main")
+    ap.add_argument("--top", type=int, default=20, help="Rows per table")
+    args = ap.parse_args()
+    print(report(args.module, profile(args.module), args.top))
+
+
+if __name__ == "__main__":
+    main()
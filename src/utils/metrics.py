@@ -0,0 +1,189 @@
+from __future__ import annotations
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Lightweight in-process metrics with Prometheus text exposition. Kept
+# dependency-free on purpose: the API ships to free-tier hosts where every
+# extra wheel counts, and we only need histograms and counters.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, List[float]] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[LabelKey, List[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            base = ",".join(f'{k}="{v}"' for k, v in key)
+            sep = "," if base else ""
+            for b, c in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{b:g}"}} {c:g}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]:g}')
+            lbl = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{lbl} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{lbl} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            base = ",".join(f'{k}="{val}"' for k, val in key)
+            lines.append(f"{self.name}{{{base}}} {v:g}" if base else f"{self.name} {v:g}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram("samarth_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram("samarth_stage_duration_seconds", "Hot-path stage latency (parse, route, llm, cache)", LATENCY_BUCKETS)
+QUERY_ROWS = Histogram("samarth_query_rows", "Rows produced by the router per /query", ROW_BUCKETS)
+CACHE_REQUESTS = Counter("samarth_cache_requests_total", "Cache lookups by result (hit|miss)")
+SHED_REQUESTS = Counter("samarth_shed_requests_total", "Requests rejected by admission control (503) by route class and reason")
+SCANS = Counter("samarth_scans_total", "Aggregating dataset scans by execution mode (serial|parallel)")
+COALESCED_REQUESTS = Counter("samarth_coalesced_requests_total", "Requests that joined an identical in-flight computation, by endpoint")
+
+# Per-request stage timings (stage -> seconds), installed by TimingMiddleware
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("samarth_request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_LATENCY.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator recording a function's wall time under `stage` (sync or async)."""
+    def deco(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record_stage(stage, time.perf_counter() - start)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - start)
+        return wrapper
+    return deco
+
+
+def record_cache(hit: bool) -> None:
+    CACHE_REQUESTS.inc(result="hit" if hit else "miss")
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{stage};dur={secs * 1000:.2f}" for stage, secs in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in (REQUEST_LATENCY, STAGE_LATENCY, QUERY_ROWS, CACHE_REQUESTS, SHED_REQUESTS, SCANS, COALESCED_REQUESTS):
+        lines.extend(metric.render())
+    hits = CACHE_REQUESTS.value(result="hit")
+    total = hits + CACHE_REQUESTS.value(result="miss")
+    lines.append("# HELP samarth_cache_hit_ratio Cache hits over lookups since start")
+    lines.append("# TYPE samarth_cache_hit_ratio gauge")
+    lines.append(f"samarth_cache_hit_ratio {hits / total if total else 0.0:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """ASGI middleware timing each HTTP request and emitting a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(timings, time.perf_counter() - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            # Label by route template ("/query/results/{result_id}/rows"), not the
+            # concrete URL, so ids in paths don't each create a series
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=scope.get("method", ""), path=path, status=str(status["code"]))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import asyncio
+import math
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import COALESCED_REQUESTS
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one computation.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    while it runs await that same task and get the same result (or
+    exception). The task is shielded, so a client disconnecting does not
+    cancel work other callers are waiting on. The key is forgotten as soon
+    as the task finishes; caching the result is up to `fn`.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            COALESCED_REQUESTS.inc(endpoint=label or key.split("|", 1)[0])
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an error nobody awaited is not reported as lost
+
+
+def refresh_early(age: float, ttl: float, compute_seconds: float, beta: float, rand: Optional[float] = None) -> bool:
+    """Probabilistic early expiration ("XFetch") for a cache entry still within its TTL.
+
+    True when this reader should recompute now: the chance rises as the
+    entry nears expiry and with how long it took to compute, so one reader
+    refreshes it ahead of time instead of every reader missing at once.
+    `beta` > 1 refreshes earlier, 0 disables.
+    """
+    if beta <= 0 or compute_seconds <= 0:
+        return False
+    r = 1.0 - (random.random() if rand is None else rand)  # (0, 1]
+    return age - compute_seconds * beta * math.log(r) >= ttl
@@ -0,0 +1,51 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from src.api.main import ADMISSION, app
+from src.utils.admission import Limiter, route_class
+from src.utils.metrics import SHED_REQUESTS
+
+client = TestClient(app)
+
+
+def test_route_classes():
+    assert route_class("GET", "/health") is None
+    assert route_class("GET", "/metrics") is None
+    assert route_class("POST", "/query") == "query"
+    assert route_class("POST", "/query/batch") == "query"
+    assert route_class("GET", "/query/results/abc/rows") == "light"
+    assert route_class("GET", "/datasets") == "light"
+
+
+def test_limiter_queue_deadline_and_handoff():
+    async def scenario():
+        lim = Limiter(max_in_flight=1, max_queue=1, max_wait=0.2)
+        assert await lim.acquire() is None
+        waiter = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0)
+        assert lim.queued == 1
+        assert await lim.acquire() == "queue_full"
+        lim.release()  # slot is handed to the queued request
+        assert await waiter is None
+        assert lim.in_flight == 1 and lim.queued == 0
+        lim.max_wait = 0.01
+        assert await lim.acquire() == "timeout"
+        assert lim.queued == 0
+        lim.release()
+        assert lim.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_saturated_query_is_shed_but_cheap_routes_answer(monkeypatch):
+    monkeypatch.setattr(ADMISSION["query"], "max_in_flight", 0)
+    monkeypatch.setattr(ADMISSION["query"], "max_queue", 0)
+    before = SHED_REQUESTS.value(route_class="query", reason="queue_full")
+    r = client.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"})
+    assert r.status_code == 503
+    assert int(r.headers["retry-after"]) > 0
+    assert SHED_REQUESTS.value(route_class="query", reason="queue_full") - before == 1
+    assert client.get("/health").status_code == 200
+    assert client.get("/datasets").status_code == 200
+    assert "samarth_shed_requests_total" in client.get("/metrics").text
@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.core import data_router
+
+client = TestClient(app)
+
+
+def test_batch_results_in_order_with_item_errors():
+    questions = [
+        "Top 5 states with highest rainfall in 2010",
+        "",
+        "Compare yield of Rice across states in 2001",
+    ]
+    r = client.post("/query/batch", json={"questions": questions})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [it["index"] for it in results] == [0, 1, 2]
+    assert results[0]["ok"] and "climate:rainfall_state_year" in results[0]["result"]["datasets"]
+    assert not results[1]["ok"] and results[1]["error"]
+    assert results[2]["ok"] and "Rice" in results[2]["result"]["parsed"]["crops"]
+
+
+def test_batch_reads_each_dataset_once(monkeypatch):
+    calls = []
+    real = data_router._read_csv
+
+    def counting(path):
+        calls.append(path.name)
+        return real(path)
+
+    monkeypatch.setattr(data_router, "_read_csv", counting)
+    questions = ["Average rainfall in Kerala over the last 5 years"] * 3 + ["Total wheat production in Punjab from 2012 to 2014"] * 2
+    r = client.post("/query/batch", json={"questions": questions})
+    assert r.status_code == 200
+    assert all(it["ok"] for it in r.json()["results"])
+    # Agriculture questions are served from the cached crop table, not a CSV read
+    assert calls == ["rainfall_state_year.csv"]
+
+
+def test_batch_rejects_oversized_request():
+    r = client.post("/query/batch", json={"questions": ["rain"] * 1000})
+    assert r.status_code == 413
@@ -0,0 +1,73 @@
+import gzip
+import json
+
+from fastapi.testclient import TestClient
+
+import src.api.main as api
+from src.utils import compression
+from src.utils.compression import BodyCache, EncodedBody, encode_json
+
+client = TestClient(api.app)
+
+
+def test_accept_encoding_negotiation():
+    body = EncodedBody(b"raw", (("br", b"B"), ("gzip", b"G")))
+    assert body.select("") == ("identity", b"raw")
+    assert body.select("gzip, deflate") == ("gzip", b"G")
+    assert body.select("gzip, br") == ("br", b"B")
+    assert body.select("br;q=0.5, gzip") == ("gzip", b"G")
+    assert body.select("gzip;q=0, br;q=0") == ("identity", b"raw")
+    assert body.select("*") == ("br", b"B")
+    assert EncodedBody(b"raw").select("gzip, br") == ("identity", b"raw")
+
+
+def test_encode_json_variants_round_trip():
+    data = [{"State": "Kerala", "Year": y, "Annual_Rainfall_mm": 3000.5} for y in range(200)]
+    body = encode_json(data)
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    assert body.identity == raw
+    variants = dict(body.variants)
+    assert gzip.decompress(variants["gzip"]) == raw
+    if compression.brotli is not None:
+        assert compression.brotli.decompress(variants["br"]) == raw
+    assert encode_json([{"a": 1}]).variants == ()  # too small to bother
+
+
+def test_body_cache_is_bounded_lru():
+    cache = BodyCache(max_bytes=10)
+    cache.put("a", EncodedBody(b"1234"))
+    cache.put("b", EncodedBody(b"1234"))
+    assert cache.get("a") is not None  # "b" is now least recent
+    cache.put("c", EncodedBody(b"1234"))
+    assert cache.get("b") is None and len(cache) == 2 and cache.bytes == 8
+    cache.put("huge", EncodedBody(b"x" * 11))
+    assert cache.get("huge") is None
+
+
+def test_hot_listing_page_is_served_precompressed(monkeypatch):
+    params = {"limit": 500}
+    plain = client.get("/climate/subdivision-annual", params=params, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+
+    # Later requests are served from the stored bytes: no scan, no re-encoding
+    monkeypatch.setattr(api, "_scan_subdivision_annual", lambda *_: 1 / 0)
+    monkeypatch.setattr(compression, "encode_json", lambda *_: 1 / 0)
+    zipped = client.get("/climate/subdivision-annual", params=params, headers={"Accept-Encoding": "gzip"})
+    assert zipped.status_code == 200
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == "W/" + plain.headers["etag"]
+    assert zipped.json() == plain.json()
+    assert int(zipped.headers["content-length"]) < len(plain.content)
+    revalidated = client.get("/climate/subdivision-annual", params=params, headers={"If-None-Match": zipped.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_result_pages_are_encoded_once():
+    r = client.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"})
+    rid = r.json()["result_id"]
+    first = client.get(f"/query/results/{rid}/rows", params={"limit": 3})
+    again = client.get(f"/query/results/{rid}/rows", params={"limit": 3})
+    assert first.status_code == again.status_code == 200
+    assert first.content == again.content
+    assert first.json()["result_id"] == rid and len(first.json()["rows"]) <= 3
@@ -0,0 +1,46 @@
+from src.core import correlation
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+
+
+def test_pearson_and_spearman():
+    xs = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert abs(correlation.pearson(xs, [2 * x + 1 for x in xs]) - 1.0) < 1e-9
+    assert abs(correlation.pearson(xs, [-x for x in xs]) + 1.0) < 1e-9
+    # Monotonic but non-linear: Spearman is exactly 1
+    assert correlation.spearman(xs, [x ** 3 for x in xs]) == 1.0
+    assert correlation.pearson([1.0, 2.0], [1.0, 2.0]) is None
+    assert correlation.pearson([1.0, 1.0, 1.0], [1.0, 2.0, 3.0]) is None
+
+
+def test_joined_table_is_cached():
+    assert correlation.joined_table() is correlation.joined_table()
+
+
+def test_route_correlation_per_state():
+    routed = route_query(parse_query("What is the correlation between rainfall and rice yield in Kerala and Punjab"))
+    assert routed.datasets == ["climate:rainfall_state_year", "agriculture:crop_apy_state_year"]
+    states = {r["State"] for r in routed.rows}
+    assert states <= {"Kerala", "Punjab"}
+    for r in routed.rows:
+        assert r["Metric"] == "Yield_t_per_ha"
+        assert r["pearson"] is None or -1.0 <= r["pearson"] <= 1.0
+
+
+def test_route_correlation_over_year_range():
+    # Every year in the window is joined, not just the two endpoints
+    routed = route_query(parse_query("Correlation between rainfall and rice yield in Punjab from 2009 to 2015"))
+    assert len(routed.rows) == 1
+    row = routed.rows[0]
+    assert row["State"] == "Punjab" and row["n"] == 7 and row["pearson"] is not None
+
+
+def test_route_correlation_without_crop_does_not_pool_crops():
+    routed = route_query(parse_query("Correlation of rainfall and yield in Punjab"))
+    assert len(routed.rows) > 1
+    pairs = [(r["State"], r["Crop"]) for r in routed.rows]
+    assert len(pairs) == len(set(pairs)) and {s for s, _ in pairs} == {"Punjab"}
+    # One observation per year: each row is a single crop's series
+    t = correlation.joined_table()
+    years = {y for s, y in zip(t.state, t.year) if s == "Punjab"}
+    assert max(r["n"] for r in routed.rows) <= len(years)
@@ -0,0 +1,70 @@
+import csv
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core import crop_table
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+from src.data_ingestion.process_agriculture import year_bounds
+
+client = TestClient(app)
+
+
+def test_year_bounds():
+    assert year_bounds("2000-01") == (2000, 2001)
+    assert year_bounds("1999-00") == (1999, 2000)
+    assert year_bounds("2005") == (2005, 2005)
+    assert year_bounds("Unknown") == (None, None)
+
+
+def test_table_is_year_sorted_and_spans_match_scan():
+    t = crop_table.crop_table()
+    assert t.year_start == sorted(t.year_start)
+    with open(crop_table.crop_path(), encoding="utf-8") as f:
+        expected = sum(
+            1 for r in csv.DictReader(f)
+            if r["State"] == "Punjab" and r["Crop"] == "Wheat" and 2005 <= crop_table.start_year(r["Year"]) <= 2010
+        )
+    ids = t.select(["Punjab"], ["Wheat"], [], (2005, 2010))
+    assert len(ids) == expected == 6
+    assert [t.year_start[i] for i in ids] == list(range(2005, 2011))
+
+
+def test_legacy_file_without_year_columns(tmp_path):
+    path = tmp_path / "crop.csv"
+    path.write_text("State,Year,Crop,Area_ha,Production_tonnes,Yield_t_per_ha\nA,2001-02,Rice,1,2,2\nA,2000-01,Rice,1,3,3\n")
+    t = crop_table.load_crop_table(path)
+    assert t.year_start == [2000, 2001] and t.year_end == [2000, 2001]
+    assert t.metrics["Production_tonnes"] == [3.0, 2.0]
+
+
+def test_range_query_covers_every_year():
+    # "from 2012 to 2014" also lists 2012 and 2014 as discrete years; the whole range must come back
+    routed = route_query(parse_query("Wheat production in Punjab from 2012 to 2014"))
+    assert [r["Year"] for r in routed.rows] == ["2012-13", "2013-14", "2014-15"]
+    # A discrete year matches the start year only, never the label's second half
+    routed = route_query(parse_query("Rice production in Punjab in 2001"))
+    assert [r["Year"] for r in routed.rows] == ["2001-02"]
+
+
+def test_agri_api_integer_year_range():
+    r = client.get("/agriculture/crop-apy-state-year", params={"state": "Punjab", "crop": "Rice", "year_from": 2003, "year_to": 2005})
+    assert r.status_code == 200
+    assert [(row["Year"], row["Year_start"], row["Year_end"]) for row in r.json()] == [
+        ("2003-04", 2003, 2004), ("2004-05", 2004, 2005), ("2005-06", 2005, 2006),
+    ]
+
+
+def test_router_follows_repointed_crop_data(monkeypatch, tmp_path, capsys):
+    from benchmarks.synthetic import generate_crop_apy, synthetic_manifest
+    from src.core import dataset_registry
+
+    rows = 2 * len(crop_table.crop_table().state)
+    generate_crop_apy(tmp_path, rows)
+    capsys.readouterr()
+    # Only the manifest changes: the crop table follows its declared paths
+    monkeypatch.setattr(dataset_registry, "MANIFEST_PATH", synthetic_manifest(tmp_path))
+    assert len(crop_table.crop_table().state) == rows
+    routed = route_query(parse_query("Top 5 rice-producing states in 2010"))
+    assert any(r["State"].endswith(" R1") for r in routed.rows)
@@ -0,0 +1,89 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core import dataset_registry
+from src.core.dataset_registry import AggregateSpec, Column, parse_spec
+from src.data_ingestion.load_mongo import aggregate_pipeline, mongo_datasets
+
+client = TestClient(app)
+
+
+def test_manifest_declares_processed_datasets():
+    reg = dataset_registry.registry()
+    assert {"crop_apy_state_year", "rainfall_state_year", "rainfall_subdivision_year"} <= set(reg.names())
+    assert "crop_apy_state_year" in mongo_datasets()
+    for spec in reg:
+        assert spec.path.exists(), spec.name
+
+
+def test_parse_spec_rejects_undeclared_columns_and_ops():
+    base = {"name": "ds", "path": "x.csv", "schema": {"State": "str", "Value": "float"}}
+    assert parse_spec({**base, "dimensions": ["State"], "metrics": ["Value"]}).column_names == ["State", "Value"]
+    with pytest.raises(ValueError, match="Year"):
+        parse_spec({**base, "indexes": [["State", "Year"]]})
+    with pytest.raises(ValueError, match="median"):
+        parse_spec({**base, "aggregates": [{"name": "a", "group_by": ["State"], "metrics": {"Value": "median"}}]})
+    with pytest.raises(ValueError, match="unknown type"):
+        parse_spec({**base, "schema": {"State": "date"}})
+
+
+def test_column_conversion():
+    assert Column("Year_start", "int", fallback="Year").convert({"Year_start": "", "Year": "2000-01"}) == 2000
+    assert Column("Rain", "float").convert({"Rain": ""}) == 0.0
+    assert Column("Rain", "float", nullable=True).convert({"Rain": "n/a"}) is None
+
+
+def test_aggregate_compute_and_mongo_pipeline():
+    agg = AggregateSpec("by_state", ("State",), (("Value", "mean"), ("Value", "count")))
+    rows = [{"State": "B", "Value": 1.0}, {"State": "A", "Value": 2.0}, {"State": "B", "Value": 3.0}, {"State": "B", "Value": None}]
+    assert agg.compute(rows) == [
+        {"State": "A", "Value_mean": 2.0, "Value_count": 1},
+        {"State": "B", "Value_mean": 2.0, "Value_count": 2},
+    ]
+    group, project, out = aggregate_pipeline(agg, "ds__by_state")
+    assert group["$group"]["_id"] == {"State": "$State"}
+    assert group["$group"]["Value_mean"] == {"$avg": "$Value"}
+    assert project["$project"]["State"] == "$_id.State"
+    assert out == {"$out": "ds__by_state"}
+
+
+def test_rows_endpoint_filters_on_dimensions(monkeypatch):
+    spec = dataset_registry.registry()["rainfall_subdivision_long"]
+    files = spec.files({"Subdivision": {"Kerala"}}, (2005, 2007))
+    assert 0 < len(files) < len(spec.files({}, None))  # partitions pruned
+
+    params = {"Subdivision": "Kerala", "Month": 7, "year_from": 2005, "year_to": 2007}
+    r = client.get("/datasets/rainfall_subdivision_long/rows", params=params)
+    assert r.status_code == 200
+    assert [(row["Year"], row["Month"]) for row in r.json()] == [(2005, 7), (2006, 7), (2007, 7)]
+    assert all(row["Subdivision"] == "Kerala" for row in r.json())
+    assert client.get("/datasets/rainfall_subdivision_long/rows", params=params, headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+
+def test_rows_endpoint_errors():
+    assert client.get("/datasets/nope/rows").status_code == 404
+    r = client.get("/datasets/rainfall_state_year/rows", params={"Annual_Rainfall_mm": 1})
+    assert r.status_code == 400 and "State" in r.json()["detail"]
+
+
+def test_dataset_info_and_aggregates():
+    info = client.get("/datasets/rainfall_state_year").json()
+    assert info["year_field"] == "Year" and info["aggregates"]
+    agg = info["aggregates"][0]
+    r = client.get(f"/datasets/rainfall_state_year/aggregates/{agg['name']}", params={"limit": 3})
+    assert r.status_code == 200 and 0 < len(r.json()) <= 3
+    assert set(agg["group_by"]) <= set(r.json()[0])
+    assert client.get("/datasets/rainfall_state_year/aggregates/nope").status_code == 404
+
+
+def test_repeated_and_comma_filters_are_cached_apart():
+    path = "/datasets/rainfall_state_year/rows"
+    literal = client.get(path, params={"State": "Goa,Kerala", "year_from": 2010, "year_to": 2010})
+    repeated = client.get(path, params=[("State", "Goa"), ("State", "Kerala"), ("year_from", 2010), ("year_to", 2010)])
+    assert literal.status_code == repeated.status_code == 200
+    assert literal.json() == []
+    assert {r["State"] for r in repeated.json()} == {"Goa", "Kerala"}
+    assert literal.headers["etag"] != repeated.headers["etag"]
+    reordered = client.get(path, params=[("State", "Kerala"), ("State", "Goa"), ("year_from", 2010), ("year_to", 2010)])
+    assert reordered.headers["etag"] == repeated.headers["etag"]
@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 from src.api.main import app
+from src.core import dataset_registry
 
 client = TestClient(app)
 
@@ -9,8 +10,9 @@ def test_datasets_endpoint():
     assert r.status_code == 200
     data = r.json()
     assert isinstance(data, list)
-    # Expect at least one dataset present
-    assert any(d["id"].startswith("climate:") or d["id"].startswith("agriculture:") for d in data)
+    # One entry per dataset declared in the manifest
+    assert [d["id"] for d in data] == [s.dataset_id for s in dataset_registry.registry()]
+    assert any(d["id"] == "joined:crop_climate_fact" and d["rows"] > 0 for d in data)
 
 
 def test_stats_endpoint():
@@ -18,4 +20,5 @@ def test_stats_endpoint():
     assert r.status_code == 200
     data = r.json()
     assert "climate" in data and "agriculture" in data
-    assert isinstance(data["climate"].get("state_annual_rows", 0), int)
+    assert data["climate"]["rainfall_state_year_rows"] > 0
+    assert data["agriculture"]["crop_apy_state_year_rows"] > 0
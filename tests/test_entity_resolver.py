@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core.entity_resolver import EntityResolver, normalize
+from src.core.query_parser import parse_query
+
+client = TestClient(app)
+
+
+def _resolver():
+    return EntityResolver(
+        {"state": ["Maharashtra", "Tamil Nadu", "Jammu And Kashmir", "Odisha"], "crop": ["Rice", "Ragi"]},
+        [("state", "Orissa", "Odisha"), ("crop", "Paddy", "Rice"), ("crop", "Millet", "Unknown")],
+        {"in", "of", "rain"},
+    )
+
+
+def test_normalize_spells_out_ampersand():
+    assert normalize("Jammu & Kashmir") == normalize("jammu and kashmir") == ["jammu", "and", "kashmir"]
+
+
+def test_resolver_exact_alias_and_fuzzy():
+    r = _resolver()
+    found = {(m.kind, m.value, m.method) for m in r.resolve("paddy in Orissa, Tamilnadu and Maharastra")}
+    assert found == {
+        ("crop", "Rice", "alias"),
+        ("state", "Odisha", "alias"),
+        ("state", "Tamil Nadu", "normalized"),
+        ("state", "Maharashtra", "fuzzy"),
+    }
+    (m,) = r.resolve("Maharastra")
+    assert 0.8 <= m.confidence < 1.0
+    # Aliases pointing outside the catalog are ignored; skip words never match
+    assert r.resolve("millet rain") == []
+    # Tokens already matched exactly are not fuzzed into a different name
+    assert r.resolve("ragl", exact_tokens={"ragl"}) == []
+
+
+def test_parse_reports_fuzzy_entities():
+    pq = parse_query("Rice yield in Maharastra and Jammu & Kashmir 2010-2014")
+    assert pq.states == ["Jammu And Kashmir", "Maharashtra"]
+    methods = {m["value"]: m["method"] for m in pq.entity_matches}
+    assert methods == {"Maharashtra": "fuzzy", "Jammu And Kashmir": "normalized"}
+
+    pq = parse_query("Paddy production in Punjab")
+    assert pq.crops == ["Rice"] and pq.states == ["Punjab"]
+    assert pq.entity_matches == [{"text": "paddy", "kind": "crop", "value": "Rice", "confidence": 1.0, "method": "alias"}]
+
+
+def test_query_api_exposes_entity_matches():
+    r = client.post("/query", json={"q": "Average rainfall in Karnatka over the last 5 years"})
+    assert r.status_code == 200
+    parsed = r.json()["parsed"]
+    assert parsed["states"] == ["Karnataka"]
+    assert parsed["entity_matches"][0]["method"] == "fuzzy"
@@ -0,0 +1,67 @@
+import csv
+import os
+import shutil
+
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+from src.data_ingestion import build_fact_table as bft
+
+
+def _isolate(monkeypatch, tmp_path):
+    for name in ("CROP_CSV", "STATE_RAIN_CSV", "SUBDIV_RAIN_CSV", "MAPPING_CSV"):
+        src = getattr(bft, name)
+        dst = tmp_path / src.name
+        shutil.copy(src, dst)
+        monkeypatch.setattr(bft, name, dst)
+    monkeypatch.setattr(bft, "ROOT", tmp_path)
+    monkeypatch.setattr(bft, "SOURCES", [bft.CROP_CSV, bft.STATE_RAIN_CSV, bft.SUBDIV_RAIN_CSV, bft.MAPPING_CSV])
+    monkeypatch.setattr(bft, "OUT_DIR", tmp_path / "joined")
+    monkeypatch.setattr(bft, "OUT_CSV", tmp_path / "joined" / "fact.csv")
+    monkeypatch.setattr(bft, "META_JSON", tmp_path / "joined" / "fact.meta.json")
+
+
+def test_incremental_refresh_rejoins_only_changed_states(monkeypatch, tmp_path):
+    _isolate(monkeypatch, tmp_path)
+    total_states = bft.build()
+    assert total_states > 1
+    assert bft.build() == 0  # nothing changed
+    meta = bft.META_JSON.read_text(encoding="utf-8")
+    # A fresh checkout changes mtimes but not content: still up to date
+    os.utime(bft.CROP_CSV, (1, 1))
+    assert bft.build() == 0 and bft.META_JSON.read_text(encoding="utf-8") == meta
+
+    with open(bft.CROP_CSV, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["Kerala", "2020-21", "2020", "2021", "Synthetic", "1.0", "2.0", "2.0"])
+    assert bft.build() == 1
+    with open(bft.OUT_CSV, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert any(r["Crop"] == "Synthetic" and r["State"] == "Kerala" for r in rows)
+    # Full rebuild produces the same table as the incremental one
+    before = bft.OUT_CSV.read_text(encoding="utf-8")
+    bft.build(full=True)
+    assert bft.OUT_CSV.read_text(encoding="utf-8") == before
+
+
+def test_route_low_rainfall_years():
+    pq = parse_query("Rice yield in low-rainfall years in Punjab")
+    assert pq.rainfall_condition == "low"
+    routed = route_query(pq)
+    assert routed.datasets == ["joined:crop_climate_fact"]
+    for r in routed.rows:
+        assert r["State"] == "Punjab"
+        assert r["Condition"] == "low_rainfall"
+        assert r["Years"]
+
+
+def test_route_low_rainfall_years_over_range():
+    routed = route_query(parse_query("Rice yield in Punjab in low rainfall years from 2000 to 2010"))
+    assert len(routed.rows) == 1
+    years = routed.rows[0]["Years"]
+    assert years and all(2000 <= y <= 2010 for y in years)
+
+
+def test_rainfall_only_drought_question_stays_on_climate():
+    for q in ("Which states had low rainfall in 2015", "Show drought years in Rajasthan rainfall"):
+        routed = route_query(parse_query(q))
+        assert routed.datasets == ["climate:rainfall_state_year"]
+        assert routed.rows and all("Annual_Rainfall_mm" in r for r in routed.rows)
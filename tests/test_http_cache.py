@@ -0,0 +1,76 @@
+from email.utils import formatdate
+
+from fastapi.testclient import TestClient
+
+import src.api.main as api
+from src.utils.http_cache import Validators, validators
+
+client = TestClient(api.app)
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def test_validator_matching():
+    v = Validators('"abc"', 1_000_000.0)
+    assert v.matches({"if-none-match": '"abc"'})
+    assert v.matches({"if-none-match": 'W/"abc", "other"'})
+    assert v.matches({"if-none-match": "*"})
+    assert not v.matches({"if-none-match": '"other"'})
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not v.matches({"if-none-match": '"other"', "if-modified-since": formatdate(2_000_000, usegmt=True)})
+    assert v.matches({"if-modified-since": formatdate(1_000_000, usegmt=True)})
+    assert not v.matches({"if-modified-since": formatdate(999_999, usegmt=True)})
+    assert not v.matches({"if-modified-since": "not a date"})
+    assert v.headers(0)["Cache-Control"] == "public, no-cache"
+
+
+def test_etag_depends_on_params_and_file_version(tmp_path):
+    f = tmp_path / "d.csv"
+    f.write_text("a\n1\n")
+    a = validators("/x", {"state": "Kerala", "limit": 10}, [f])
+    assert a == validators("/x", {"limit": 10, "state": "Kerala", "year": None}, [f])
+    assert a.etag != validators("/x", {"state": "Goa", "limit": 10}, [f]).etag
+    f.write_text("a\n1\n2\n")
+    assert a.etag != validators("/x", {"state": "Kerala", "limit": 10}, [f]).etag
+
+
+def test_listing_revalidates_with_304_without_reading_data(monkeypatch):
+    params = {"state": "Kerala", "limit": 5}
+    r = client.get("/climate/state-annual", params=params, headers=IDENTITY)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert etag.startswith('"') and "max-age" in r.headers["cache-control"]
+    assert "last-modified" in r.headers
+    other = client.get("/climate/state-annual", params={"state": "Kerala", "limit": 6}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    def boom(*_args):
+        raise AssertionError("data read on a conditional hit")
+
+    monkeypatch.setattr(api, "_scan_state_annual", boom)
+    r2 = client.get("/climate/state-annual", params=params, headers={**IDENTITY, "If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["etag"] == etag and not r2.content
+
+
+def test_datasets_and_crop_listing_conditional():
+    r = client.get("/datasets")
+    assert r.status_code == 200
+    assert client.get("/datasets", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    assert client.get("/datasets", headers={"If-Modified-Since": r.headers["last-modified"]}).status_code == 304
+
+    r = client.get("/agriculture/crop-apy-state-year", params={"state": "Punjab", "limit": 3})
+    assert r.status_code == 200
+    again = client.get("/agriculture/crop-apy-state-year", params={"state": "Punjab", "limit": 3}, headers={"If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_304_repeats_the_weak_etag_of_a_compressed_200():
+    params = {"state": "Kerala", "limit": 2}
+    for accept in ("gzip", "gzip, br"):
+        r = client.get("/climate/state-annual", params=params, headers={"Accept-Encoding": accept})
+        assert r.headers["etag"].startswith('W/"')
+        again = client.get("/climate/state-annual", params=params, headers={"Accept-Encoding": accept, "If-None-Match": r.headers["etag"]})
+        assert again.status_code == 304 and again.headers["etag"] == r.headers["etag"]
+    plain = client.get("/climate/state-annual", params=params, headers=IDENTITY)
+    assert plain.headers["etag"] == r.headers["etag"][2:]
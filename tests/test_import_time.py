@@ -0,0 +1,32 @@
+from src.utils.import_profile import FRAMEWORK_PACKAGES, attributed_us, parse_importtime, profile, total_us
+
+# Cost of importing the API module beyond FastAPI/pydantic themselves, which
+# every deployment pays; about 70 ms locally, ~280 ms before lazy imports
+IMPORT_BUDGET_MS = 150
+
+# Optional subsystems that must only load on first use
+LAZY_PACKAGES = {"huggingface_hub", "pymongo", "motor", "bson", "requests", "multiprocessing"}
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:        10 |         10 |     b.inner
+import time:        20 |         30 |   b
+import time:         5 |          5 |   c
+import time:       100 |        135 | a
+"""
+
+
+def test_parse_and_attribute():
+    costs = parse_importtime(SAMPLE)
+    assert [(c.module, c.depth) for c in costs] == [("b.inner", 2), ("b", 1), ("c", 1), ("a", 0)]
+    assert total_us(costs, "a") == 135
+    assert attributed_us(costs, {"b"}) == 30  # b.inner is inside b's subtree
+    assert attributed_us(costs, {"a", "b"}) == 135
+
+
+def test_api_import_budget_and_lazy_subsystems():
+    costs = profile("src.api.main")
+    loaded = {c.package for c in costs}
+    assert not LAZY_PACKAGES & loaded
+    own_ms = (total_us(costs, "src.api.main") - attributed_us(costs, FRAMEWORK_PACKAGES)) / 1000
+    assert own_ms < IMPORT_BUDGET_MS, f"src.api.main import costs {own_ms:.0f} ms beyond the framework"
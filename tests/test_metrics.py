@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from src.api.main import app
+
+client = TestClient(app)
+
+
+def test_query_sets_server_timing_header():
+    r = client.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"})
+    assert r.status_code == 200
+    header = r.headers.get("server-timing", "")
+    stages = {part.split(";")[0].strip() for part in header.split(",")}
+    assert {"parse", "route", "llm", "total"} <= stages
+
+
+def test_metrics_endpoint_prometheus_format():
+    client.get("/climate/state-annual", params={"limit": 1})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert "# TYPE samarth_request_duration_seconds histogram" in body
+    assert 'samarth_request_duration_seconds_count{method="GET",path="/climate/state-annual",status="200"}' in body
+    assert "samarth_cache_hit_ratio" in body
+
+
+def test_latency_labels_use_route_templates():
+    client.get("/query/results/first-id/rows")
+    client.get("/query/results/second-id/rows")
+    client.get("/no/such/path")
+    body = client.get("/metrics").text
+    assert 'path="/query/results/{result_id}/rows"' in body
+    assert "first-id" not in body and "second-id" not in body
+    assert 'path="<unmatched>",status="404"' in body
@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.db import mongo
+from src.utils.config import settings
+
+client = TestClient(app)
+
+
+class _FakeAsyncCollection:
+    """Minimal async stand-in for a Motor collection (only what the API uses)."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, flt):
+        return self.docs.get(flt["_id"])
+
+    async def replace_one(self, flt, doc, upsert=False):
+        self.docs[flt["_id"]] = doc
+
+    async def delete_one(self, flt):
+        self.docs.pop(flt["_id"], None)
+
+    async def insert_one(self, doc):
+        self.docs[len(self.docs)] = doc
+
+
+class _FakeAsyncClient:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, dbname):
+        # Database handle: indexing it again yields a collection
+        return self
+
+    def get_collection(self, name):
+        return self.collections.setdefault(name, _FakeAsyncCollection())
+
+    def close(self):
+        pass
+
+
+def test_client_options_from_settings():
+    opts = mongo.client_options()
+    assert opts["maxPoolSize"] == settings.mongodb_max_pool_size
+    assert opts["serverSelectionTimeoutMS"] == settings.mongodb_server_selection_timeout_ms
+    assert opts["socketTimeoutMS"] == settings.mongodb_socket_timeout_ms
+
+
+def test_cache_roundtrip_with_async_stand_in(monkeypatch):
+    fake = _FakeAsyncClient()
+    mongo.set_async_client(fake)
+    monkeypatch.setattr(settings, "cache_enabled", True)
+    try:
+        r1 = client.get("/climate/state-annual", params={"limit": 3})
+        assert r1.status_code == 200
+        cache = fake.collections[settings.cache_collection]
+        assert len(cache.docs) == 1
+        r2 = client.get("/climate/state-annual", params={"limit": 3})
+        assert r2.json() == r1.json()
+    finally:
+        mongo.set_async_client(None)
+
+
+def test_query_logging_uses_async_collection(monkeypatch):
+    fake = _FakeAsyncClient()
+    mongo.set_async_client(fake)
+    monkeypatch.setattr(settings, "log_queries", True)
+    try:
+        r = client.post("/query", json={"q": "Show trend of rainfall in Kerala from 2009 to 2010"})
+        assert r.status_code == 200
+        logged = list(fake.collections[settings.log_queries_collection].docs.values())
+        assert logged and logged[0]["q"].startswith("Show trend")
+    finally:
+        mongo.set_async_client(None)
@@ -0,0 +1,34 @@
+from src.core import mongo_backend
+from src.core.query_parser import ParsedQuery
+from src.utils.config import settings
+
+
+def test_backend_for_parses_settings(monkeypatch):
+    monkeypatch.setattr(settings, "dataset_backends", "crop_apy_state_year=mongo, *=csv")
+    assert mongo_backend.backend_for("crop_apy_state_year") == "mongo"
+    assert mongo_backend.backend_for("rainfall_state_year") == "csv"
+    monkeypatch.setattr(settings, "dataset_backends", "")
+    assert mongo_backend.backend_for("crop_apy_state_year") == "csv"
+
+
+def test_rainfall_ranking_pipeline():
+    pq = ParsedQuery(text="", intent="ranking", top_k=5, aggregation="avg")
+    pipe = mongo_backend.rainfall_pipeline(pq, [2010], None, "state")
+    assert pipe[0] == {"$match": {"Year": {"$in": [2010]}}}
+    assert pipe[1]["$group"]["Value"] == {"$avg": "$Annual_Rainfall_mm"}
+    assert pipe[-1] == {"$limit": 5}
+
+
+def test_rainfall_trend_pipeline_sorts_series():
+    pq = ParsedQuery(text="", intent="trend", states=["Kerala"])
+    pipe = mongo_backend.rainfall_pipeline(pq, [], (2009, 2012), "year")
+    assert pipe[0]["$match"] == {"State": {"$in": ["Kerala"]}, "Year": {"$gte": 2009, "$lte": 2012}}
+    assert pipe[-1] == {"$sort": {"State": 1, "Year": 1}}
+
+
+def test_crop_pipeline_defaults_to_avg_for_yield():
+    pq = ParsedQuery(text="", intent="comparison", crops=["Rice"])
+    pipe = mongo_backend.crop_pipeline(pq, [2001], None, "state", "Yield_t_per_ha")
+    assert pipe[0]["$match"] == {"Crop": {"$in": ["Rice"]}, "Year_start": {"$in": [2001]}}
+    assert pipe[1]["$group"]["Value"] == {"$avg": "$Yield_t_per_ha"}
+    assert pipe[2]["$project"]["Metric"] == "Yield_t_per_ha"
@@ -0,0 +1,54 @@
+import pytest
+
+from src.core import parallel_scan
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+from src.utils.config import settings
+from src.utils.metrics import SCANS
+
+QUESTIONS = [
+    "Compare average yield of rice across states",
+    "Top 5 states by total wheat production since 2010",
+    "Lowest minimum area by crop in Punjab",
+    "Median yield of rice by state",
+    "How many crops in Kerala",
+]
+
+
+def _values(rows):
+    return {tuple(v for k, v in r.items() if k not in ("Value", "Error_bound")): r["Value"] for r in rows}
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(settings, "scan_workers", 2)
+    monkeypatch.setattr(settings, "parallel_scan_min_rows", 0)
+    yield
+    parallel_scan.shutdown()
+
+
+def test_parallel_matches_serial(monkeypatch, parallel):
+    serial = {}
+    with monkeypatch.context() as m:
+        m.setattr(settings, "scan_workers", 1)
+        for q in QUESTIONS:
+            serial[q] = route_query(parse_query(q)).rows
+    before = SCANS.value(mode="parallel")
+    for q in QUESTIONS:
+        rows = route_query(parse_query(q)).rows
+        assert rows, q
+        got, want = _values(rows), _values(serial[q])
+        assert got.keys() == want.keys(), q
+        for k in want:
+            assert got[k] == pytest.approx(want[k]), (q, k)
+    # Questions naming a state prune to one partition, which always stays in-process
+    assert SCANS.value(mode="parallel") - before == len(QUESTIONS) - 2
+
+
+def test_small_scans_stay_serial(monkeypatch):
+    monkeypatch.setattr(settings, "scan_workers", 4)
+    monkeypatch.setattr(settings, "parallel_scan_min_rows", 10**9)
+    before = SCANS.value(mode="serial")
+    route_query(parse_query("Compare average yield of rice across states"))
+    assert SCANS.value(mode="serial") - before == 1
+    assert parallel_scan._lanes == []
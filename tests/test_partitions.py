@@ -0,0 +1,66 @@
+from src.core import crop_table, partitions, rainfall_series
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+
+
+def _write(tmp_path):
+    header = ["State", "Year_start", "Crop", "Value"]
+    rows = [
+        ["Punjab", 2001, "Rice", 1],
+        ["Punjab", 2005, "Wheat", 2],
+        ["Jammu & Kashmir", 2010, "Rice", 3],
+    ]
+    return partitions.write_partitioned(
+        tmp_path / "ds", "ds", header, rows, ["State"], lambda k: f"state={partitions.slug(k['State'])}.csv", ["Year_start", "Crop"]
+    )
+
+
+def test_manifest_roundtrip_and_pruning(tmp_path):
+    written = _write(tmp_path)
+    m = partitions.read_manifest(tmp_path / "ds")
+    assert m is not None and m.rows == 3
+    assert [p.path.name for p in m.partitions] == [p.path.name for p in written.partitions] == [
+        "state=Jammu_Kashmir.csv", "state=Punjab.csv",
+    ]
+    punjab = m.partitions[1]
+    assert punjab.keys == {"State": "Punjab"} and punjab.stats["Year_start"] == (2001, 2005)
+    assert m.bounds("Year_start") == (2001, 2010)
+    # Key equality, min/max ranges and min/max membership all prune
+    assert [p.keys["State"] for p in m.prune({"State": {"Punjab"}})] == ["Punjab"]
+    assert [p.keys["State"] for p in m.prune(ranges={"Year_start": [(2008, 2012)]})] == ["Jammu & Kashmir"]
+    assert [p.keys["State"] for p in m.prune({"Crop": {"Wheat"}})] == ["Punjab"]
+    assert m.prune({"State": {"Punjab"}}, {"Year_start": [(2006, 2009)]}) == []
+    assert not (tmp_path / "ds.tmp").exists()
+
+
+def test_router_opens_only_matching_partitions(monkeypatch):
+    opened = []
+    real = crop_table.load_crop_table
+
+    def counting(path):
+        opened.append(path.name)
+        return real(path)
+
+    monkeypatch.setattr(crop_table, "load_crop_table", counting)
+    monkeypatch.setattr(crop_table, "_partition_cache", {})
+    routed = route_query(parse_query("Rice production in Punjab 2012-2014"))
+    assert opened == ["state=Punjab.csv"]
+    assert [r["Year"] for r in routed.rows] == ["2012-13", "2013-14", "2014-15"]
+
+
+def test_seasonal_reads_only_needed_decades(monkeypatch):
+    read = []
+    real = rainfall_series._load
+
+    def counting(paths):
+        read.extend(f"{p.parent.name}/{p.name}" for p in paths)
+        return real(paths)
+
+    monkeypatch.setattr(rainfall_series, "_load", counting)
+    monkeypatch.setattr(rainfall_series, "_part_cache", {})
+    routed = route_query(parse_query("Monsoon rainfall in Kerala from 2005 to 2012"))
+    assert read == ["subdivision=Kerala/decade=2000.csv", "subdivision=Kerala/decade=2010.csv"]
+    (row,) = routed.rows
+    full = rainfall_series.series()["Kerala"].range_total(rainfall_series.SEASONS["jjas"], 2005, 2012)
+    assert (row["From"], row["To"], row["Years"]) == (2005, 2012, 8)
+    assert abs(row["Total_mm"] - round(full[0], 3)) < 1e-6
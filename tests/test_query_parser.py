@@ -0,0 +1,37 @@
+from src.core.query_parser import parse_query
+
+
+def test_parse_trend_with_range():
+    pq = parse_query("Show trend of rainfall in Kerala from 2009 to 2012")
+    assert pq.intent == "trend"
+    assert pq.states == ["Kerala"]
+    assert pq.year_range == (2009, 2012)
+    assert pq.metrics == ["rainfall"]
+    assert pq.group_by == "year"
+    assert pq.domain == "climate"
+
+
+def test_parse_keyword_priorities():
+    pq = parse_query("Compare the highest average rice production by crop vs area")
+    # trend > correlation > comparison > ranking; avg > sum > min > max
+    assert pq.intent == "comparison"
+    assert pq.aggregation == "avg"
+    assert pq.metrics == ["area", "production"]
+    assert pq.group_by == "crop"
+    assert pq.domain == "agriculture"
+
+
+def test_parse_topk_relative_years_and_which():
+    pq = parse_query("Top 3 rice-producing states in the last 5 years")
+    assert pq.top_k == 3
+    assert pq.last_n_years == 5
+    assert "Rice" in pq.crops
+    pq = parse_query("Which state had the highest rainfall since 2005")
+    assert pq.top_k == 1
+    assert pq.since_year == 2005
+    assert pq.intent == "ranking"
+
+
+def test_parse_correlation_beats_between():
+    pq = parse_query("What is the correlation between rainfall and rice yield")
+    assert pq.intent == "correlation"
@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.core.downsample import lttb
+from src.core.result_store import ResultStore, StoredResult, estimate_size
+
+client = TestClient(app)
+
+
+def test_large_result_is_paged_through_handle():
+    body = client.post("/query", json={"q": "Show trend of monsoon rainfall over time"}).json()
+    assert body["result_id"] and body["total_rows"] > len(body["rows"]) == 100
+
+    rid = body["result_id"]
+    page = client.get(f"/query/results/{rid}/rows", params={"offset": 100, "limit": 50}).json()
+    assert page["total_rows"] == body["total_rows"]
+    assert len(page["rows"]) == 50
+    assert page["rows"][0] != body["rows"][-1]
+
+    series = client.get(f"/query/results/{rid}/series", params={"points": 10}).json()
+    assert series["metric"] == "Rainfall_mm"
+    assert all(len(s["points"]) <= 10 < s["original_points"] for s in series["series"])
+
+
+def test_small_result_is_stored_and_sortable():
+    body = client.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"}).json()
+    rid = body["result_id"]
+    assert rid and body["total_rows"] == len(body["rows"]) == 5
+
+    info = client.get(f"/query/results/{rid}").json()
+    assert info["columns"] == ["State", "Value"] and info["parsed"]["top_k"] == 5
+    page = client.get(f"/query/results/{rid}/rows", params={"sort_by": "Value", "order": "asc"}).json()
+    values = [r["Value"] for r in page["rows"]]
+    assert values == sorted(values)
+    assert client.get(f"/query/results/{rid}/rows", params={"sort_by": "nope"}).status_code == 400
+
+
+def test_unknown_handle_is_404():
+    assert client.get("/query/results/missing/rows").status_code == 404
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    pts = [(float(i), 100.0 if i == 37 else 0.0) for i in range(200)]
+    out = lttb(pts, 12)
+    assert len(out) == 12
+    assert out[0] == pts[0] and out[-1] == pts[-1]
+    assert (37.0, 100.0) in out
+
+
+def test_store_evicts_least_recently_used_within_budget():
+    rows = [{"State": "X", "Year": i, "Value": float(i)} for i in range(100)]
+    size = estimate_size(rows)
+    store = ResultStore(ttl=60, max_entries=10, max_bytes=int(size * 2.5))
+    a = store.put(StoredResult(rows=list(rows), datasets=[], citations=[], parsed={}))
+    b = store.put(StoredResult(rows=list(rows), datasets=[], citations=[], parsed={}))
+    assert store.get(a) is not None  # a is now most recently used
+    c = store.put(StoredResult(rows=list(rows), datasets=[], citations=[], parsed={}))
+    assert store.get(b) is None and store.get(a) is not None and store.get(c) is not None
+    assert store.bytes <= store.max_bytes and store.evictions == 1
+    # A result bigger than the whole budget is not stored
+    assert store.put(StoredResult(rows=rows * 3, datasets=[], citations=[], parsed={})) is None
+
+
+def test_store_expires_entries():
+    store = ResultStore(ttl=0, max_entries=10)
+    rid = store.put(StoredResult(rows=[{"a": 1}], datasets=[], citations=[], parsed={}))
+    assert store.get(rid) is None and store.bytes == 0
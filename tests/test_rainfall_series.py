@@ -0,0 +1,50 @@
+import csv
+
+from src.core import rainfall_series
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+
+
+def _scan_total(sub, months, start, end):
+    total, years = 0.0, {}
+    with open(rainfall_series.long_path(), encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            y, m = int(row["Year"]), int(row["Month"])
+            if row["Subdivision"] == sub and start <= y <= end and m in months:
+                total += float(row["Rainfall_mm"])
+                years[y] = years.get(y, 0) + 1
+    return total, sum(1 for n in years.values() if n == len(months))
+
+
+def test_prefix_sums_match_scan():
+    table = rainfall_series.series()
+    months = rainfall_series.SEASONS["jjas"]
+    total, n = table["Kerala"].range_total(months, 1950, 2000)
+    exp_total, exp_n = _scan_total("Kerala", months, 1950, 2000)
+    assert n == exp_n == 51
+    assert abs(total - exp_total) < 1e-6
+    assert table["Kerala"].range_total(months, 3000, 3010) == (0.0, 0)
+
+
+def test_parse_seasons_and_months():
+    pq = parse_query("Pre-monsoon rainfall in Coastal Karnataka since 1990")
+    assert pq.season == "mam"
+    assert pq.subdivisions == ["Coastal Karnataka"]
+    pq = parse_query("July and Aug rainfall in Punjab")
+    assert pq.season is None and pq.months == [7, 8]
+    assert parse_query("What may be the rainfall in Kerala").months == []
+
+
+def test_route_seasonal_window():
+    routed = route_query(parse_query("JJAS rainfall in Kerala 1950-2000"))
+    assert routed.datasets == ["climate:rainfall_subdivision_long"]
+    (row,) = routed.rows
+    assert (row["Subdivision"], row["From"], row["To"], row["Years"]) == ("Kerala", 1950, 2000, 51)
+    assert row["Value"] == row["Mean_mm"]
+
+
+def test_route_seasonal_trend_expands_state():
+    routed = route_query(parse_query("Show trend of monsoon rainfall in Karnataka from 2009 to 2012"))
+    subs = {r["Subdivision"] for r in routed.rows}
+    assert subs == {"Coastal Karnataka", "North Interior Karnataka", "South Interior Karnataka"}
+    assert len(routed.rows) == 12
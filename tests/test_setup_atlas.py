@@ -0,0 +1,28 @@
+from src.db.setup_atlas import IndexSpec, declared_collections, diff_indexes
+
+
+def test_diff_indexes_matches_on_key_pattern():
+    live = {
+        "_id_": {"key": [("_id", 1)]},
+        "created_at_1": {"key": [("created_at", 1)], "expireAfterSeconds": 300},
+        "q_text": {"key": [("_fts", "text"), ("_ftsx", 1)]},
+    }
+    declared = [
+        IndexSpec("created_at_ttl", [("created_at", 1)], {"expireAfterSeconds": 600}),
+        IndexSpec("answer_source", [("answer_source", 1)]),
+    ]
+    d = diff_indexes(live, declared)
+    assert [i.name for i in d["missing"]] == ["answer_source"]
+    assert [(name, i.name) for name, i in d["changed"]] == [("created_at_1", "created_at_ttl")]
+    assert d["extra"] == ["q_text"]
+
+
+def test_declared_queries_kind(monkeypatch):
+    monkeypatch.setenv("QUERIES_COLLECTION_KIND", "timeseries")
+    monkeypatch.setenv("QUERIES_RETENTION_SECONDS", "86400")
+    _, queries = declared_collections()
+    assert queries.options["timeseries"]["timeField"] == "created_at"
+    assert queries.options["expireAfterSeconds"] == 86400
+    monkeypatch.setenv("QUERIES_COLLECTION_KIND", "capped")
+    _, queries = declared_collections()
+    assert queries.options["capped"] is True
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+import src.api.main as api
+from src.utils.metrics import COALESCED_REQUESTS
+from src.utils.singleflight import SingleFlight, refresh_early
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"rows": [1, 2]}
+
+    async def scenario():
+        sf = SingleFlight()
+        results = await asyncio.gather(*(sf.do("k", compute) for _ in range(5)))
+        assert sf.in_flight == 0
+        await sf.do("k", compute)  # finished keys are not reused
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(r is results[0] for r in results)
+
+
+def test_errors_reach_every_waiter_and_caller_cancel_does_not_stop_others():
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise ValueError("boom")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def scenario():
+        sf = SingleFlight()
+        out = await asyncio.gather(sf.do("e", failing), sf.do("e", failing), return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in out)
+        first = asyncio.ensure_future(sf.do("s", slow))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(sf.do("s", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 42
+
+    asyncio.run(scenario())
+
+
+def test_refresh_early_probability():
+    # Fresh entry, or no recorded compute time: never refreshed early
+    assert not refresh_early(0.0, 600, 0.5, 1.0, rand=0.5)
+    assert not refresh_early(599.0, 600, 0.0, 1.0, rand=0.999)
+    assert not refresh_early(599.0, 600, 2.0, 0.0, rand=0.999)
+    # Near expiry a slow-to-compute entry is refreshed for most draws
+    assert refresh_early(599.0, 600, 2.0, 1.0, rand=0.5)
+    draws = [i / 100 for i in range(100)]
+    near = sum(refresh_early(595.0, 600, 2.0, 1.0, rand=r) for r in draws)
+    far = sum(refresh_early(300.0, 600, 2.0, 1.0, rand=r) for r in draws)
+    assert far == 0 < near < 100
+
+
+def test_identical_concurrent_queries_are_coalesced(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+    original = api._answer_query
+
+    def slow_answer(q):
+        with lock:
+            calls.append(q)
+        time.sleep(0.2)
+        return original(q)
+
+    monkeypatch.setattr(api, "_answer_query", slow_answer)
+    before = COALESCED_REQUESTS.value(endpoint="/query")
+
+    async def scenario():
+        async with httpx.AsyncClient(app=api.app, base_url="http://test") as ac:
+            return await asyncio.gather(
+                ac.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"}),
+                ac.post("/query", json={"q": "Top 5 states  with highest rainfall in 2010"}),
+                ac.post("/query", json={"q": "Top 5 states with highest rainfall in 2010"}),
+                ac.post("/query", json={"q": "Top 3 states with highest rainfall in 2010"}),
+            )
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len(calls) == 2  # one per distinct (whitespace-normalized) question
+    bodies = [r.json() for r in responses]
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert bodies[3]["result_id"] != bodies[0]["result_id"]
+    assert COALESCED_REQUESTS.value(endpoint="/query") - before == 2
@@ -0,0 +1,72 @@
+import bisect
+import random
+
+from src.core import sketches
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+from src.core.mongo_backend import crop_pipeline
+from src.utils.config import settings
+
+
+def _rank(sorted_vals, v):
+    return bisect.bisect(sorted_vals, v) / len(sorted_vals)
+
+
+def test_kll_quantiles_within_bound_and_mergeable():
+    rng = random.Random(7)
+    xs = [rng.expovariate(1.0) for _ in range(50000)]
+    ordered = sorted(xs)
+    a, b = sketches.KLLSketch(), sketches.KLLSketch(seed=1)
+    for x in xs[:20000]:
+        a.update(x)
+    for x in xs[20000:]:
+        b.update(x)
+    a.merge(b)
+    assert a.n == len(xs)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        assert abs(_rank(ordered, a.quantile(q)) - q) <= 2 * a.rank_error
+
+
+def test_hyperloglog_merge_counts_union():
+    a, b = sketches.HyperLogLog(), sketches.HyperLogLog()
+    for i in range(30000):
+        a.add(i)
+    for i in range(20000, 60000):
+        b.add(i)
+    a.merge(b)
+    assert abs(a.count() - 60000) / 60000 < 3 * a.relative_error
+
+
+def test_summaries_stay_exact_below_limit():
+    s = sketches.QuantileSummary(exact_limit=10)
+    s.extend([1.0, 2.0, 3.0, 4.0])
+    assert not s.approximate and s.quantile(0.5) == 2.5
+    s.extend(range(20))
+    assert s.approximate and s.n == 24
+    d = sketches.DistinctCounter(exact_limit=3)
+    for v in "aabb":
+        d.add(v)
+    assert d.count() == 2 and not d.approximate
+
+
+def test_route_median_and_distinct(monkeypatch):
+    pq = parse_query("Median rice yield across states")
+    assert (pq.aggregation, pq.percentile) == ("median", 50.0)
+    rows = route_query(pq).rows
+    assert rows and all(not r["Approximate"] for r in rows)
+    assert rows == sorted(rows, key=lambda r: r["Value"], reverse=True)
+
+    # Force the sketch path: result is flagged approximate with its error bound
+    monkeypatch.setattr(settings, "sketch_exact_limit", 5)
+    (row,) = route_query(parse_query("Median rice yield")).rows
+    assert row["Approximate"] and row["Error_bound"] > 0
+
+    (row,) = route_query(parse_query("How many crops are grown in Punjab")).rows
+    assert row["Metric"] == "distinct_Crop" and row["Value"] > 1
+
+
+def test_mongo_percentile_stage():
+    pq = parse_query("90th percentile of rice yield by state")
+    pipe = crop_pipeline(pq, [], None, "state", "Yield_t_per_ha")
+    group = next(s["$group"] for s in pipe if "$group" in s)
+    assert group["Value"] == {"$percentile": {"input": "$Yield_t_per_ha", "p": [0.9], "method": "approximate"}}
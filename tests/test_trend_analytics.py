@@ -0,0 +1,43 @@
+from src.core.data_router import route_query
+from src.core.query_parser import parse_query
+from src.core.trend_analytics import annotate
+
+
+def test_annotate_moving_average_yoy_and_slope():
+    rows = [{"State": "X", "Year": y, "Annual_Rainfall_mm": v} for y, v in [(2001, 10.0), (2002, 12.0), (2003, 14.0), (2005, 18.0)]]
+    (summary,) = annotate(rows, window=2)
+    # Windows and YoY are only defined over consecutive years
+    assert [r["Moving_avg"] for r in rows] == [None, 11.0, 13.0, None]
+    assert [r["YoY_change"] for r in rows] == [None, 2.0, 2.0, None]
+    assert rows[0]["Anomaly"] == -3.5
+    assert summary["Slope_per_year"] == 2.0 and summary["R2"] == 1.0
+    assert (summary["From"], summary["To"], summary["n"]) == (2001, 2005, 4)
+
+
+def test_annotate_skips_missing_values():
+    vals = [(2001, 10.0), (2002, None), (2003, 14.0), (2004, 16.0), (2005, "")]
+    rows = [{"State": "X", "Year": y, "Annual_Rainfall_mm": v} for y, v in vals]
+    (summary,) = annotate(rows, window=2)
+    assert [r["Moving_avg"] for r in rows] == [None, None, None, 15.0, None]
+    assert [r["YoY_change"] for r in rows] == [None, None, None, 2.0, None]
+    assert [r["Anomaly"] for r in rows] == [-3.3333, None, 0.6667, 2.6667, None]
+    assert summary["n"] == 3 and summary["Mean"] == 13.3333
+    assert summary["R2"] == 1.0 and summary["Slope_per_year"] == 2.0
+
+
+def test_annotate_groups_crop_labels():
+    rows = [
+        {"State": "A", "Year": "2009-10", "Crop": "Rice", "Yield_t_per_ha": 1.0},
+        {"State": "A", "Year": "2010-11", "Crop": "Rice", "Yield_t_per_ha": 2.0},
+        {"State": "A", "Year": "2009-10", "Crop": "Wheat", "Yield_t_per_ha": 5.0},
+    ]
+    summaries = annotate(rows)
+    assert [(s["Crop"], s["Slope_per_year"]) for s in summaries] == [("Rice", 1.0), ("Wheat", None)]
+
+
+def test_trend_query_returns_analytics():
+    pq = parse_query("3-year moving average of wheat yield in Punjab")
+    assert pq.intent == "trend" and pq.window == 3
+    routed = route_query(pq)
+    assert routed.analytics and routed.analytics[0]["Window"] == 3
+    assert "Moving_avg" in routed.rows[-1] and routed.rows[-1]["Moving_avg"] is not None
@@ -1,11 +1,37 @@
 from __future__ import annotations
 
+import math
 import os
+import threading
 import time
-from typing import Any, Dict, List
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+
+# Seconds a /query answer is reused for the same (API URL, question)
+QUERY_CACHE_TTL = int(os.getenv("UI_QUERY_CACHE_TTL", "300"))
+# Answers and result pages kept at most; least recently used go first
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("UI_QUERY_CACHE_MAX_ENTRIES", "256"))
+
+SAMPLE_QUESTIONS = [
+    # Trend
+    "Show trend of rainfall in Kerala from 2009 to 2012",
+    "Show wheat yield trend in Maharashtra since 2005",
+    # Comparison
+    "Compare rainfall in Karnataka vs Kerala between 2012 and 2016",
+    "Compare rice yield across states in 2009",
+    # Ranking / Top-K
+    "Top 5 states with highest rainfall in 2010",
+    "Top 5 rice-producing states in 2015",
+    "Which state had the highest rainfall in 2010",
+    # Aggregations
+    "Average rainfall in Kerala over the last 5 years",
+    "Total wheat production in Punjab from 2012 to 2014",
+]
 
 
 def get_api_base_url() -> str:
@@ -46,13 +72,165 @@ def get_api_base_url() -> str:
     return url
 
 
-def call_query_api(base_url: str, q: str, timeout: int = 20) -> Dict[str, Any]:
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Keep-alive session shared by every rerun, so calls skip the TCP/TLS handshake."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class QueryCache:
+    """TTL cache of /query results keyed by (API URL, question).
+
+    An LRU bounded by `max_entries`; expired entries are dropped on every
+    lookup, so the process-wide cache does not grow with each page read.
+    Thread-safe so background prefetches and the script thread share it; a
+    question already being fetched is awaited rather than requested twice.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._prefetched: Dict[str, float] = {}
+
+    def get_or_fetch(self, key: Tuple[str, str], fetch: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (value, from_cache); only successful fetches are stored."""
+        with self._lock:
+            self._expire(time.monotonic())
+            hit = self._data.get(key)
+            if hit is not None:
+                self._data.move_to_end(key)
+                return hit[1], True
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            return fut.result(), True  # type: ignore[union-attr]
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)  # type: ignore[union-attr]
+            raise
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._inflight.pop(key, None)
+        fut.set_result(value)  # type: ignore[union-attr]
+        return value, False
+
+    def _expire(self, now: float) -> None:
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+        for url in [u for u, until in self._prefetched.items() if until <= now]:
+            del self._prefetched[url]
+
+    def claim_prefetch(self, base_url: str) -> bool:
+        # At most one prefetch round per API URL per TTL, even if the API is down
+        with self._lock:
+            now = time.monotonic()
+            if self._prefetched.get(base_url, 0.0) > now:
+                return False
+            self._prefetched[base_url] = now + self.ttl
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._prefetched.clear()
+
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    return QueryCache(QUERY_CACHE_TTL)
+
+
+@st.cache_resource
+def get_prefetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="samarth-prefetch")
+
+
+def call_query_api(base_url: str, q: str, timeout: int = 20, session: Optional[requests.Session] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """POST /query; returns the JSON body and the server's per-stage timings (ms)."""
     url = base_url.rstrip("/") + "/query"
-    resp = requests.post(url, json={"q": q}, timeout=timeout)
+    resp = (session or requests).post(url, json={"q": q}, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json(), parse_server_timing(resp.headers.get("Server-Timing", ""))
+
+
+def cached_query(base_url: str, q: str) -> Tuple[Dict[str, Any], Dict[str, float], bool]:
+    """/query through the shared session and TTL cache; the flag is True for cache hits."""
+    (data, timings), hit = get_query_cache().get_or_fetch(
+        (base_url.rstrip("/"), q),
+        lambda: call_query_api(base_url, q, session=get_http_session()),
+    )
+    return data, timings, hit
+
+
+def _get_json(base_url: str, path: str, params: Dict[str, Any], timeout: int = 20) -> Dict[str, Any]:
+    resp = get_http_session().get(base_url.rstrip("/") + path, params=params, timeout=timeout)
     resp.raise_for_status()
     return resp.json()
 
 
+def fetch_result_page(base_url: str, result_id: str, offset: int, limit: int, sort_by: Optional[str] = None, order: str = "asc") -> Dict[str, Any]:
+    """One window of a server-side result (only the visible rows are downloaded)."""
+    params: Dict[str, Any] = {"offset": offset, "limit": limit}
+    if sort_by:
+        params.update(sort_by=sort_by, order=order)
+    page, _ = get_query_cache().get_or_fetch(
+        (base_url.rstrip("/"), f"rows:{result_id}:{offset}:{limit}:{sort_by}:{order}"),
+        lambda: _get_json(base_url, f"/query/results/{result_id}/rows", params),
+    )
+    return page
+
+
+def fetch_result_series(base_url: str, result_id: str, points: int = 200) -> Dict[str, Any]:
+    """Per-group trend series, downsampled by the server to about `points` each."""
+    series, _ = get_query_cache().get_or_fetch(
+        (base_url.rstrip("/"), f"series:{result_id}:{points}"),
+        lambda: _get_json(base_url, f"/query/results/{result_id}/series", {"points": points}),
+    )
+    return series
+
+
+def prefetch_samples(base_url: str, questions: List[str]) -> None:
+    """Warm the cache with the sample questions in background threads."""
+    cache = get_query_cache()
+    if not cache.claim_prefetch(base_url.rstrip("/")):
+        return
+    pool = get_prefetch_pool()
+    for q in questions:
+        # Errors are dropped here; the same question asked later is simply fetched again
+        pool.submit(cached_query, base_url, q)
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    # e.g. "parse;dur=0.41, route;dur=12.30, llm;dur=0.05, total;dur=13.10"
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        bits = [b.strip() for b in part.split(";")]
+        if not bits[0]:
+            continue
+        for b in bits[1:]:
+            if b.startswith("dur="):
+                try:
+                    out[bits[0]] = float(b[4:])
+                except ValueError:
+                    pass
+    return out
+
+
 def parse_answer_citations(answer_text: str) -> List[str]:
     # Expect a trailing line like: "Citations: ds1, ds2"
     lines = [l.strip() for l in answer_text.splitlines() if l.strip()]
@@ -65,7 +243,7 @@ def parse_answer_citations(answer_text: str) -> List[str]:
     return []
 
 
-def render_result(data: Dict[str, Any]):
+def render_result(data: Dict[str, Any], base_url: str):
     # Top: natural-language answer
     st.subheader("Answer")
     st.markdown(data.get("answer", "_No answer returned._"))
@@ -84,7 +262,7 @@ def render_result(data: Dict[str, Any]):
     c1, c2, c3 = st.columns(3)
     c1.metric("Answer source", data.get("answer_source", "-"))
     c2.metric("Datasets", len(data.get("datasets", [])))
-    c3.metric("Rows returned", len(data.get("rows", [])))
+    c3.metric("Rows returned", data.get("total_rows") or len(data.get("rows", [])))
 
     with st.expander("Parsed query"):
         st.json(data.get("parsed", {}))
@@ -96,12 +274,64 @@ def render_result(data: Dict[str, Any]):
         else:
             st.write("(none)")
 
-    with st.expander("Rows (preview)"):
-        rows = data.get("rows", [])
-        if rows:
-            st.dataframe(rows, use_container_width=True, hide_index=True)
-        else:
-            st.write("No rows.")
+    if data.get("analytics"):
+        with st.expander("Trend analytics", expanded=True):
+            st.dataframe(data["analytics"], use_container_width=True, hide_index=True)
+
+    result_id = data.get("result_id")
+    if result_id and data.get("parsed", {}).get("intent") == "trend":
+        render_trend_chart(base_url, result_id)
+
+    with st.expander("Rows", expanded=True):
+        render_rows(base_url, data)
+
+
+def render_trend_chart(base_url: str, result_id: str):
+    try:
+        payload = fetch_result_series(base_url, result_id)
+    except requests.exceptions.RequestException:
+        st.caption("Trend chart unavailable (result expired on the server).")
+        return
+    lines = payload.get("series", [])
+    if not lines:
+        return
+    # Wide table: one column per group, indexed by year
+    chart: Dict[str, Dict[float, float]] = {ln["name"]: {x: y for x, y in ln["points"]} for ln in lines[:20]}
+    st.subheader(f"Trend: {payload.get('metric') or ''}")
+    st.line_chart(chart)
+    if len(lines) > 20:
+        st.caption(f"Showing 20 of {len(lines)} series.")
+
+
+def render_rows(base_url: str, data: Dict[str, Any]):
+    rows = data.get("rows", [])
+    total = data.get("total_rows") or len(rows)
+    result_id = data.get("result_id")
+    if not rows:
+        st.write("No rows.")
+        return
+    if not result_id or total <= len(rows):
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        return
+    # Page through the server-side result; inline rows cover the first unsorted window
+    c1, c2, c3, c4 = st.columns(4)
+    page_size = c1.selectbox("Rows per page", [50, 100, 250, 500], index=1, key=f"page_size_{result_id}")
+    pages = max(1, math.ceil(total / page_size))
+    page = int(c2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=f"page_{result_id}"))
+    sort_by = c3.selectbox("Sort by", ["(server order)"] + list(rows[0]), key=f"sort_{result_id}")
+    order = c4.selectbox("Order", ["asc", "desc"], key=f"order_{result_id}")
+    sort_col = None if sort_by == "(server order)" else sort_by
+    offset = (page - 1) * page_size
+    if sort_col is None and offset + page_size <= len(rows):
+        window = rows[offset: offset + page_size]
+    else:
+        try:
+            window = fetch_result_page(base_url, result_id, offset, page_size, sort_col, order).get("rows", [])
+        except requests.exceptions.RequestException:
+            st.warning("This result expired on the server; ask the question again to page through it.")
+            return
+    st.caption(f"Rows {offset + 1}-{min(offset + page_size, total)} of {total}")
+    st.dataframe(window, use_container_width=True, hide_index=True)
 
 
 def main():
@@ -120,21 +350,7 @@ def main():
 
         st.markdown("---")
         st.header("Samples")
-        samples = [
-            # Trend
-            "Show trend of rainfall in Kerala from 2009 to 2012",
-            "Show wheat yield trend in Maharashtra since 2005",
-            # Comparison
-            "Compare rainfall in Karnataka vs Kerala between 2012 and 2016",
-            "Compare rice yield across states in 2009",
-            # Ranking / Top-K
-            "Top 5 states with highest rainfall in 2010",
-            "Top 5 rice-producing states in 2015",
-            "Which state had the highest rainfall in 2010",
-            # Aggregations
-            "Average rainfall in Kerala over the last 5 years",
-            "Total wheat production in Punjab from 2012 to 2014",
-        ]
+        samples = SAMPLE_QUESTIONS
         sample_q = st.selectbox("Pick a sample question", options=["(none)"] + samples, index=0)
         if sample_q != "(none)":
             st.session_state.input_q = sample_q
@@ -150,6 +366,8 @@ def main():
                 - Grouping hints: “across states/by state”, “across crops/by crop”.
                 """
             )
+        if st.button("Clear cached answers"):
+            get_query_cache().clear()
         st.markdown("---")
         st.header("History")
         history: List[Dict[str, Any]] = st.session_state.get("history", [])
@@ -159,6 +377,9 @@ def main():
         else:
             st.caption("No history yet.")
 
+    # Answers to the samples are usually wanted next; fetch them while the user reads
+    prefetch_samples(base_url.strip() or "http://127.0.0.1:8000", samples)
+
     # Main input area
     # Display resolved API URL without requiring session state
     st.caption(f"API: {base_url.strip() or 'http://127.0.0.1:8000'}")
@@ -174,6 +395,7 @@ def main():
 
     if clear:
         st.session_state.pop("input_q", None)
+        st.session_state.pop("last_result", None)
         st.experimental_rerun()
 
     if ask:
@@ -183,19 +405,31 @@ def main():
         try:
             with st.spinner("Asking API..."):
                 start = time.time()
-                data = call_query_api(base_url.strip() or "http://127.0.0.1:8000", q.strip())
+                data, timings, hit = cached_query(base_url.strip() or "http://127.0.0.1:8000", q.strip())
                 dur_ms = int((time.time() - start) * 1000)
-            st.success(f"Done in {dur_ms} ms")
-            render_result(data)
+            breakdown = " · ".join(f"{k} {v:.0f} ms" for k, v in timings.items() if k != "total")
+            if hit:
+                status = f"Done in {dur_ms} ms (cached answer)"
+            else:
+                status = f"Done in {dur_ms} ms" + (f" (server: {breakdown})" if breakdown else "")
+            # Kept across reruns so paging widgets can re-render the result
+            st.session_state.last_result = {"data": data, "status": status}
             # Append to history
             history = st.session_state.get("history", [])
             history.append({"q": q.strip(), "ts": time.strftime("%H:%M:%S")})
             st.session_state.history = history
         except requests.exceptions.RequestException as e:
+            st.session_state.pop("last_result", None)
             st.error(f"API request failed: {e}")
         except Exception as e:
+            st.session_state.pop("last_result", None)
             st.exception(e)
 
+    last = st.session_state.get("last_result")
+    if last:
+        st.success(last["status"])
+        render_result(last["data"], base_url.strip() or "http://127.0.0.1:8000")
+
 
 if __name__ == "__main__":
     main()